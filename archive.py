@@ -0,0 +1,305 @@
+"""
+Archive engine behind the Zip Creator / Zip Extractor tools and the download button.
+
+Creation:
+    Members are compressed in parallel on a thread pool (zlib releases the GIL, so threads
+    use all cores without pickling file contents to worker processes). Already-compressed
+    assets such as images, fonts and archives take a ZIP_STORED fast path, and any member
+    that deflate doesn't shrink is stored as well. The archive is produced as a stream of
+    byte chunks in member order and written straight to its destination file (the job's
+    artifact that the download button serves) without a temp file.
+
+    Archives that would need ZIP64 (more than 65535 members or members/offsets beyond 4 GiB)
+    fall back to the standard library's sequential writer, which copies members in chunks
+    straight into the destination file (or, for 'stream_zip()', into a small buffer drained
+    after every chunk), so even these archives are never held in memory.
+
+Extraction:
+    Members are validated and extracted one at a time with streamed reads. Absolute paths,
+    '..' components and symlinks are rejected, and the total size, member count and
+    per-member compression ratio (for members over 1 MiB) are capped so a zip bomb is stopped while it inflates.
+"""
+import io
+import os
+import stat
+import struct
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Extensions whose contents are already compressed; deflating them again only burns CPU.
+STORED_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".otf", ".ttf",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".br", ".zst", ".7z",
+    ".mp3", ".mp4", ".webm", ".ogg", ".pdf",
+})
+
+COMPRESSION_LEVEL = 6
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Extraction limits (override per call).
+MAX_EXTRACT_BYTES = 512 * 1024 * 1024
+MAX_EXTRACT_MEMBERS = 10_000
+MAX_COMPRESSION_RATIO = 100
+# Small members (e.g. a repetitive HTML page) may legitimately compress very well;
+# the ratio cap only applies once a member inflates beyond this size.
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_MAX_MEMBERS = 0xFFFF
+_UTF8_FLAG = 0x800
+
+
+class UnsafeArchiveError(ValueError):
+    """Raised when an archive member violates the extraction limits."""
+
+
+# --- Creation ---
+
+def collect_members(source_path: str) -> list:
+    """
+    Lists '(file_path, arcname)' pairs for a file or directory.
+
+    Directory members keep the directory's own name as their top-level folder, matching
+    the behaviour of the original Zip Creator tool.
+
+    Raises:
+        FileNotFoundError: If 'source_path' is neither a file nor a directory.
+    """
+    if os.path.isfile(source_path):
+        return [(source_path, os.path.basename(source_path))]
+    if not os.path.isdir(source_path):
+        raise FileNotFoundError(f"Source path '{source_path}' does not exist or is not a file/directory.")
+    base = os.path.dirname(os.path.normpath(source_path)) or "."
+    members = []
+    for root, dirs, files in os.walk(source_path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            members.append((file_path, os.path.relpath(file_path, base).replace(os.sep, "/")))
+    return members
+
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(timestamp)
+    year = min(max(t.tm_year, 1980), 2107)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _compress_member(file_path: str, level: int):
+    """Reads and compresses one member. Runs on the worker pool."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    crc = zlib.crc32(data)
+    method = zipfile.ZIP_STORED
+    payload = data
+    if os.path.splitext(file_path)[1].lower() not in STORED_EXTENSIONS and data:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        deflated = compressor.compress(data) + compressor.flush()
+        if len(deflated) < len(data):
+            method, payload = zipfile.ZIP_DEFLATED, deflated
+    file_stat = os.stat(file_path)
+    return method, crc, len(data), payload, file_stat.st_mtime, file_stat.st_mode
+
+
+def _needs_zip64(members: list) -> bool:
+    if len(members) >= _MAX_MEMBERS:
+        return True
+    # Local headers add ~30 bytes + name per member; 1 KiB of slack keeps the estimate safe.
+    return sum(os.path.getsize(path) + 1024 for path, _arcname in members) >= _ZIP64_LIMIT
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object keeping what zipfile writes into it until it is taken."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _write_with_zipfile(members: list, level: int, fileobj):
+    """
+    Sequential ZIP64-capable fallback using the standard library, writing into 'fileobj'.
+
+    Members are copied in READ_CHUNK_SIZE pieces; the generator yields after each piece
+    (and once more after the central directory), so a caller streaming from an in-memory
+    'fileobj' can drain it as it goes.
+    """
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED, compresslevel=level, allowZip64=True) as zipf:
+        for file_path, arcname in members:
+            info = zipfile.ZipInfo.from_file(file_path, arcname)  # Known size, so ZIP64 is chosen up front
+            stored = os.path.splitext(file_path)[1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            info._compresslevel = level  # What ZipFile.write() sets; open() doesn't take a level
+            with open(file_path, "rb") as source, zipf.open(info, "w") as destination:
+                for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b""):
+                    destination.write(chunk)
+                    yield
+    yield
+
+
+def _stream_with_zipfile(members: list, level: int):
+    """Streams '_write_with_zipfile()' output as it is produced."""
+    sink = _ChunkSink()
+    for _ in _write_with_zipfile(members, level, sink):
+        data = sink.take()
+        if data:
+            yield data
+
+
+def stream_zip(source_path: str, level: int = COMPRESSION_LEVEL, max_workers: int = None):
+    """
+    Yields the bytes of a ZIP archive of 'source_path', compressing members in parallel.
+
+    At most '2 * max_workers' members are held in memory at a time.
+
+    Args:
+        source_path (str): File or directory to archive.
+        level (int): zlib compression level for deflated members.
+        max_workers (int): Compression threads; defaults to the CPU count.
+    Yields:
+        bytes: Consecutive chunks of the archive.
+    """
+    members = collect_members(source_path)
+    if _needs_zip64(members):
+        yield from _stream_with_zipfile(members, level)
+    else:
+        yield from _stream_in_parallel(members, level, max_workers)
+
+
+def _stream_in_parallel(members: list, level: int, max_workers: int):
+    max_workers = max_workers or os.cpu_count() or 1
+    window = 2 * max_workers
+    central_directory = []
+    offset = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zip") as pool:
+        pending = []
+        next_member = 0
+        while next_member < len(members) or pending:
+            while next_member < len(members) and len(pending) < window:
+                file_path, arcname = members[next_member]
+                pending.append((arcname, pool.submit(_compress_member, file_path, level)))
+                next_member += 1
+            arcname, future = pending.pop(0)
+            method, crc, size, payload, mtime, mode = future.result()
+            name = arcname.encode("utf-8")
+            dos_time, dos_date = _dos_datetime(mtime)
+            header = struct.pack(
+                "<4sHHHHHIIIHH", b"PK\x03\x04", 20, _UTF8_FLAG, method, dos_time, dos_date,
+                crc, len(payload), size, len(name), 0,
+            )
+            central_directory.append(struct.pack(
+                "<4sHHHHHHIIIHHHHHII", b"PK\x01\x02", 20 | (3 << 8), 20, _UTF8_FLAG, method, dos_time, dos_date,
+                crc, len(payload), size, len(name), 0, 0, 0, 0, (mode & 0xFFFF) << 16, offset,
+            ) + name)
+            yield header + name
+            yield payload
+            offset += len(header) + len(name) + len(payload)
+
+    directory = b"".join(central_directory)
+    yield directory
+    yield struct.pack("<4sHHHHIIH", b"PK\x05\x06", 0, 0, len(central_directory), len(central_directory),
+                      len(directory), offset, 0)
+
+
+def write_zip(source_path: str, output_zip_file: str, level: int = COMPRESSION_LEVEL, max_workers: int = None) -> int:
+    """
+    Writes a ZIP archive of 'source_path' to 'output_zip_file'.
+
+    Returns:
+        int: Size of the archive in bytes.
+    """
+    directory = os.path.dirname(output_zip_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    members = collect_members(source_path)
+    with open(output_zip_file, "wb") as f:
+        if _needs_zip64(members):
+            for _ in _write_with_zipfile(members, level, f):
+                pass
+        else:
+            for chunk in _stream_in_parallel(members, level, max_workers):
+                f.write(chunk)
+        return f.tell()
+
+
+# --- Extraction ---
+
+def _safe_target(extract_to: str, member_name: str) -> str:
+    normalized = member_name.replace("\\", "/")
+    parts = [part for part in normalized.split("/") if part not in ("", ".")]
+    if normalized.startswith("/") or (parts and ":" in parts[0]) or ".." in parts:
+        raise UnsafeArchiveError(f"Refusing to extract '{member_name}': path escapes the target directory.")
+    root = os.path.realpath(extract_to)
+    target = os.path.realpath(os.path.join(root, *parts))
+    if target != root and not target.startswith(root + os.sep):
+        raise UnsafeArchiveError(f"Refusing to extract '{member_name}': path escapes the target directory.")
+    return target
+
+
+def safe_extract(zip_file_path: str, extract_to_path: str, max_total_bytes: int = MAX_EXTRACT_BYTES,
+                 max_members: int = MAX_EXTRACT_MEMBERS, max_ratio: float = MAX_COMPRESSION_RATIO) -> dict:
+    """
+    Extracts an archive member by member, enforcing path and size limits.
+
+    The uncompressed size is counted while streaming, so forged header sizes can't be
+    used to get past the limits. A member that fails a check aborts the extraction;
+    members extracted before it are kept.
+
+    Args:
+        zip_file_path (str): Archive to extract.
+        extract_to_path (str): Destination directory (created if missing).
+        max_total_bytes (int): Cap on the total uncompressed size.
+        max_members (int): Cap on the number of members.
+        max_ratio (float): Cap on a member's uncompressed/compressed size ratio.
+    Returns:
+        dict: {'files', 'bytes'} extracted.
+    Raises:
+        UnsafeArchiveError: If a limit is exceeded or a member is unsafe.
+        zipfile.BadZipFile: If the file isn't a valid archive.
+    """
+    os.makedirs(extract_to_path, exist_ok=True)
+    extracted_files = 0
+    extracted_bytes = 0
+    with zipfile.ZipFile(zip_file_path, "r") as zipf:
+        infos = zipf.infolist()
+        if len(infos) > max_members:
+            raise UnsafeArchiveError(f"Archive has {len(infos)} members (limit {max_members}).")
+        for info in infos:
+            target = _safe_target(extract_to_path, info.filename)
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise UnsafeArchiveError(f"Refusing to extract symlink '{info.filename}'.")
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            member_limit = max(max_ratio * info.compress_size, RATIO_CHECK_MIN_BYTES)
+            if info.file_size > member_limit:
+                raise UnsafeArchiveError(f"Member '{info.filename}' has a suspicious compression ratio.")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            member_bytes = 0
+            with zipf.open(info) as source, open(target, "wb") as destination:
+                for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b""):
+                    member_bytes += len(chunk)
+                    extracted_bytes += len(chunk)
+                    if extracted_bytes > max_total_bytes:
+                        raise UnsafeArchiveError(f"Archive expands beyond the {max_total_bytes} byte limit.")
+                    if member_bytes > member_limit:
+                        raise UnsafeArchiveError(f"Member '{info.filename}' has a suspicious compression ratio.")
+                    destination.write(chunk)
+            extracted_files += 1
+    return {"files": extracted_files, "bytes": extracted_bytes}
+
@@ -0,0 +1,217 @@
+"""
+Headless batch builds: generate one site per prompt from a JSONL or CSV file.
+
+    python -m batch prompts.jsonl --out batch_output --concurrency 4 --rate openai=300 --rate serper=60
+
+Input: JSONL lines like {"id": "fitness-mirror", "prompt": "..."} or a CSV with a 'prompt'
+column (and optionally 'id'). Without an id, one is derived from the prompt text, so the
+same prompt always maps to the same output directory.
+
+Each prompt is built with 'builder.run_website_build()' into '<out>/<id>/' (autosite/index.html,
+autosite_package.zip and result.json). Builds run concurrently on threads; each thread
+builds its own agent registry once (crewai agents keep per-run state, so concurrent builds
+must not share them) and reuses it for every build it runs. Every OpenAI/Serper/EXA/Firecrawl
+call goes through the process-wide rate limits in rate_limits.py, so the concurrency setting
+can't exceed an API quota.
+
+Progress is appended to '<out>/batch_state.jsonl' after every build. Re-running the same
+command after a crash or Ctrl+C skips the prompts that already succeeded and retries the rest,
+reusing the tasks a failed build had already finished (see checkpoints.py).
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import sqlite_compat  # noqa: F401  (before crewai/chromadb)
+from environment import load_environment
+from progress import BuildCancelled, ProgressBus
+from rate_limits import APIS, configure_rate_limit
+
+STATE_FILENAME = "batch_state.jsonl"
+RESULT_FILENAME = "result.json"
+
+
+def prompt_id(prompt: str) -> str:
+    """Stable, filesystem-safe id for a prompt: a short slug plus a content hash."""
+    slug = re.sub(r"[^a-z0-9]+", "-", prompt.lower()).strip("-")[:40].rstrip("-")
+    digest = hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()[:10]
+    return f"{slug}-{digest}" if slug else digest
+
+
+def read_prompts(path: str) -> list:
+    """
+    Reads '{"id", "prompt"}' entries from a .jsonl or .csv file.
+
+    Raises:
+        ValueError: On an unsupported file type or an entry without a prompt.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    elif path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Unsupported prompt file '{path}': expected .jsonl or .csv.")
+
+    entries, seen = [], set()
+    for number, row in enumerate(rows, start=1):
+        prompt = (row.get("prompt") or "").strip()
+        if not prompt:
+            raise ValueError(f"{path}: entry {number} has no 'prompt'.")
+        entry_id = re.sub(r"[^A-Za-z0-9._-]+", "-", str(row.get("id") or "")).strip("-.") or prompt_id(prompt)
+        if entry_id in seen:
+            continue  # The same prompt (or id) listed twice is built once
+        seen.add(entry_id)
+        entries.append({"id": entry_id, "prompt": prompt})
+    return entries
+
+
+class BatchState:
+    """Append-only progress log; the last record per id wins."""
+
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.path = os.path.join(out_dir, STATE_FILENAME)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        state = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A torn last line from a crash
+                    state[record["id"]] = record
+        return state
+
+    def record(self, **record):
+        record["timestamp"] = time.time()
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class _CancelBus(ProgressBus):
+    """Bus used only for cancellation; progress events are dropped instead of queued."""
+
+    def emit(self, kind: str, task: str, text: str):
+        pass
+
+
+def run_batch(entries: list, out_dir: str, concurrency: int = 2, log=print) -> dict:
+    """
+    Builds every entry that hasn't succeeded in a previous run of this batch.
+
+    Args:
+        entries (list): '{"id", "prompt"}' dicts (see 'read_prompts()').
+        out_dir (str): Batch output directory; each entry gets '<out_dir>/<id>/'.
+        concurrency (int): Number of builds running at the same time.
+        log: Callable receiving one progress line per finished build.
+    Returns:
+        dict: Counts of 'succeeded', 'failed' and 'skipped' entries.
+    """
+    from builder import run_website_build
+    from crew import new_registry
+
+    state = BatchState(out_dir)
+    done = {entry_id for entry_id, record in state.load().items() if record["status"] == "succeeded"}
+    pending = [entry for entry in entries if entry["id"] not in done]
+    counts = {"succeeded": 0, "failed": 0, "skipped": len(entries) - len(pending)}
+    if counts["skipped"]:
+        log(f"Resuming: {counts['skipped']} of {len(entries)} prompts already built.")
+
+    local = threading.local()  # One registry per build thread, reused by its later builds
+    buses = {}
+
+    def build(entry):
+        entry_dir = os.path.join(out_dir, entry["id"])
+        started = time.perf_counter()
+        if getattr(local, "registry", None) is None:
+            local.registry = new_registry()
+        # Keyed on the entry's directory, so re-running this batch resumes a failed build.
+        result = run_website_build(entry["prompt"], output_dir=entry_dir, bus=buses[entry["id"]],
+                                   registry=local.registry, resume_key=f"batch:{os.path.abspath(entry_dir)}")
+        with open(os.path.join(entry_dir, RESULT_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-build") as pool:
+        running = {}
+        queue = iter(pending)
+
+        def submit_next():
+            # Submitted lazily so an interrupted batch doesn't leave thousands of queued futures.
+            for entry in queue:
+                buses[entry["id"]] = _CancelBus()
+                running[pool.submit(build, entry)] = entry
+                return
+
+        for _ in range(max(1, concurrency)):
+            submit_next()
+        try:
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = running.pop(future)
+                    buses.pop(entry["id"])
+                    try:
+                        seconds = future.result()
+                    except BaseException as exc:
+                        counts["failed"] += 1
+                        state.record(id=entry["id"], status="failed", error=f"{type(exc).__name__}: {exc}"[:500])
+                        log(f"[failed] {entry['id']}: {type(exc).__name__}: {exc}")
+                    else:
+                        counts["succeeded"] += 1
+                        state.record(id=entry["id"], status="succeeded", seconds=round(seconds, 2))
+                        progress = counts["succeeded"] + counts["failed"]
+                        log(f"[{progress}/{len(pending)}] {entry['id']} built in {seconds:.1f}s")
+                    submit_next()
+        except KeyboardInterrupt:
+            log("Interrupted: cancelling running builds (progress so far is kept).")
+            for bus in buses.values():
+                bus.cancel()
+            raise
+    return counts
+
+
+def _parse_rate(value: str) -> tuple:
+    api, _, rpm = value.partition("=")
+    if api not in APIS or not rpm:
+        raise argparse.ArgumentTypeError(f"expected API=REQUESTS_PER_MINUTE with API one of {', '.join(APIS)}")
+    return api, float(rpm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one website per prompt from a JSONL/CSV file.")
+    parser.add_argument("prompts", help="Prompt file (.jsonl with 'prompt'/'id' fields, or .csv with those columns).")
+    parser.add_argument("--out", default="batch_output", help="Output directory (default: batch_output).")
+    parser.add_argument("--concurrency", type=int, default=2, help="Builds running at the same time (default: 2).")
+    parser.add_argument("--rate", type=_parse_rate, action="append", default=[], metavar="API=RPM",
+                        help="Requests per minute for one API across all builds, e.g. --rate openai=300. Repeatable.")
+    args = parser.parse_args()
+
+    load_environment()
+    for api, rpm in args.rate:
+        configure_rate_limit(api, rpm)
+    entries = read_prompts(args.prompts)
+    try:
+        counts = run_batch(entries, args.out, concurrency=args.concurrency)
+    except (KeyboardInterrupt, BuildCancelled):
+        raise SystemExit(130)
+    print(f"Done: {counts['succeeded']} built, {counts['failed']} failed, {counts['skipped']} skipped "
+          f"(state in {os.path.join(args.out, STATE_FILENAME)}).")
+    raise SystemExit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the archive engine against the original sequential zipfile loop.
+
+Generates a multi-MB site tree (HTML/CSS/JS text plus incompressible "images" and
+"fonts") in a temp directory, then times:
+    - baseline: zipfile.ZipFile(..., ZIP_DEFLATED) writing members one by one,
+    - parallel: archive.write_zip() (thread-pool deflate + ZIP_STORED fast path),
+    - extract:  archive.safe_extract() of the parallel archive.
+Both archives are verified with zipfile.testzip().
+
+Usage (from the repository root):
+    python -m benchmarks.bench_archive [--pages 200] [--images 60] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+
+from archive import safe_extract, write_zip
+
+WORDS = "responsive hero section call to action pricing features testimonial footer brand".split()
+
+
+def generate_site(root: str, pages: int, images: int, image_kib: int = 96) -> int:
+    """Writes a synthetic site tree under 'root' and returns its total size in bytes."""
+    rng = random.Random(42)
+    site = os.path.join(root, "autosite")
+    for sub in ("pages", "css", "js", "img", "fonts"):
+        os.makedirs(os.path.join(site, sub), exist_ok=True)
+    for index in range(pages):
+        body = " ".join(rng.choice(WORDS) for _ in range(6000))
+        with open(os.path.join(site, "pages", f"page{index}.html"), "w") as f:
+            f.write(f"<!DOCTYPE html><html><body><section><p>{body}</p></section></body></html>")
+        with open(os.path.join(site, "css", f"style{index}.css"), "w") as f:
+            f.write("".join(f".c{index}-{n} {{ margin: {n}px; color: #{n:06x}; }}\n" for n in range(800)))
+        with open(os.path.join(site, "js", f"app{index}.js"), "w") as f:
+            f.write("".join(f"function f{n}() {{ return {n} * {index}; }}\n" for n in range(600)))
+    for index in range(images):
+        with open(os.path.join(site, "img", f"photo{index}.jpg"), "wb") as f:
+            f.write(os.urandom(image_kib * 1024))
+        with open(os.path.join(site, "fonts", f"font{index}.woff2"), "wb") as f:
+            f.write(os.urandom(image_kib * 256))
+    return sum(os.path.getsize(os.path.join(d, name)) for d, _dirs, files in os.walk(site) for name in files)
+
+
+def baseline_zip(source_path: str, output_zip_file: str):
+    """The original Zip Creator loop: sequential ZIP_DEFLATED for every member."""
+    with zipfile.ZipFile(output_zip_file, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for root, _dirs, files in os.walk(source_path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                zipf.write(file_path, os.path.relpath(file_path, os.path.dirname(source_path)))
+
+
+def timed(function, *args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--images", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-archive-")
+    try:
+        total = generate_site(workdir, args.pages, args.images)
+        site = os.path.join(workdir, "autosite")
+        baseline_path = os.path.join(workdir, "baseline.zip")
+        parallel_path = os.path.join(workdir, "parallel.zip")
+        extract_path = os.path.join(workdir, "extracted")
+
+        baseline = timed(baseline_zip, site, baseline_path, repeat=args.repeat)
+        parallel = timed(write_zip, site, parallel_path, repeat=args.repeat)
+        extract = timed(lambda: (shutil.rmtree(extract_path, ignore_errors=True), safe_extract(parallel_path, extract_path)),
+                        repeat=args.repeat)
+        for path in (baseline_path, parallel_path):
+            with zipfile.ZipFile(path) as zipf:
+                assert zipf.testzip() is None, f"{path} failed verification"
+
+        print(f"site tree: {total / (1024 * 1024):.1f} MiB, {os.cpu_count()} CPUs")
+        print(f"baseline zip: {baseline * 1000:8.1f} ms -> {os.path.getsize(baseline_path) / (1024 * 1024):.2f} MiB")
+        print(f"parallel zip: {parallel * 1000:8.1f} ms -> {os.path.getsize(parallel_path) / (1024 * 1024):.2f} MiB "
+              f"({baseline / parallel:.1f}x faster)")
+        print(f"safe extract: {extract * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
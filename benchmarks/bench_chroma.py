@@ -0,0 +1,79 @@
+"""
+Benchmark of Chroma query latency and disk usage under churn, before and after maintenance.
+
+Simulates months of uploads in a temp store: every round adds a batch of chunks and
+evicts the oldest batch, so the live record count stays constant while the HNSW index
+keeps accumulating deleted elements. Then it runs maintenance.rebuild_collection(),
+removes orphaned segments and VACUUMs, and compares:
+    - median/p95 query latency (stored embeddings as queries),
+    - index and total disk size.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chroma [--rounds 20] [--batch 2000] [--live 4000] [--dim 384]
+"""
+import sqlite_compat  # noqa: F401  (must run before chromadb is imported)
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import chromadb
+
+from maintenance import _directory_bytes, _segment_directories, rebuild_collection, remove_orphaned_segments, vacuum
+
+
+def latencies(collection, queries: list, repeat: int = 3) -> list:
+    durations = []
+    for _ in range(repeat):
+        for embedding in queries:
+            started = time.perf_counter()
+            collection.query(query_embeddings=[embedding], n_results=5)
+            durations.append(time.perf_counter() - started)
+    return sorted(durations)
+
+
+def report(name: str, durations: list, path: str, collection_name: str):
+    index_bytes = sum(_directory_bytes(directory) for directory in _segment_directories(path).get(collection_name, []))
+    p95 = durations[int(len(durations) * 0.95)]
+    print(f"{name:<8} median {statistics.median(durations) * 1000:>6.2f}ms   p95 {p95 * 1000:>6.2f}ms   "
+          f"index {index_bytes / 1e6:>7.1f} MB   total {_directory_bytes(path) / 1e6:>7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--live", type=int, default=4000)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "db")
+        client = chromadb.PersistentClient(path=path)
+        collection = client.create_collection("uploads", metadata={"hnsw:space": "cosine"})
+        batches = []
+        for round_index in range(args.rounds):
+            ids = [f"r{round_index}:{index}" for index in range(args.batch)]
+            collection.add(ids=ids, embeddings=[[rng.random() for _ in range(args.dim)] for _ in ids],
+                           documents=["chunk"] * len(ids), metadatas=[{"round": round_index}] * len(ids))
+            batches.append(ids)
+            while sum(len(batch) for batch in batches) > args.live:
+                collection.delete(ids=batches.pop(0))
+        print(f"{args.rounds * args.batch} records inserted, {collection.count()} live")
+
+        queries = [[rng.random() for _ in range(args.dim)] for _ in range(50)]
+        report("before", latencies(collection, queries), path, "uploads")
+        started = time.perf_counter()
+        rebuild_collection(client, "uploads")
+        remove_orphaned_segments(path)
+        vacuum(path)
+        print(f"maintenance took {time.perf_counter() - started:.1f}s")
+        report("after", latencies(client.get_collection("uploads"), queries), path, "uploads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the feedback store's aggregate tables against raw GROUP BY scans.
+
+Fills a temporary SQLite store with generated feedback (feedback.generate_feedback()),
+then times the analyst's questions both ways:
+    - aggregates: FeedbackStore.top_topics() / category_breakdown(),
+    - raw scan:   the same answers computed with GROUP BY over 'user_feedback'.
+Both must return the same counts.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_feedback [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import func, select
+
+from feedback import FeedbackStore, load_generated, user_feedback
+
+
+def raw_top_topics(store: FeedbackStore, kind: str, limit: int = 10) -> list:
+    count = func.count().label("count")
+    query = (select(user_feedback.c.category, user_feedback.c.topic, count)
+             .where(user_feedback.c.kind == kind)
+             .group_by(user_feedback.c.category, user_feedback.c.topic)
+             .order_by(count.desc()).limit(limit))
+    with store.engine.connect() as connection:
+        return [dict(row._mapping) for row in connection.execute(query)]
+
+
+def raw_category_breakdown(store: FeedbackStore) -> list:
+    count = func.count().label("count")
+    query = (select(user_feedback.c.kind, user_feedback.c.category, count)
+             .group_by(user_feedback.c.kind, user_feedback.c.category).order_by(count.desc()))
+    with store.engine.connect() as connection:
+        return [dict(row._mapping) for row in connection.execute(query)]
+
+
+def timed(function, repeat: int):
+    durations, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeedbackStore(f"sqlite:///{os.path.join(root, 'feedback.sqlite3')}")
+        seconds = load_generated(store, args.rows)
+        print(f"Inserted {args.rows} rows (with incremental aggregates) in {seconds:.1f}s "
+              f"({args.rows / seconds:,.0f} rows/s)")
+
+        questions = [
+            ("top requests", lambda: store.top_topics("request"), lambda: raw_top_topics(store, "request")),
+            ("top complaints", lambda: store.top_topics("complaint"), lambda: raw_top_topics(store, "complaint")),
+            ("category breakdown", store.category_breakdown, lambda: raw_category_breakdown(store)),
+        ]
+        print(f"{'question':<20} {'aggregates':>12} {'raw scan':>12} {'speedup':>9}")
+        for name, aggregated, raw in questions:
+            aggregated_seconds, aggregated_rows = timed(aggregated, args.repeat)
+            raw_seconds, raw_rows = timed(raw, max(1, args.repeat // 10))
+            if sorted(row["count"] for row in aggregated_rows) != sorted(row["count"] for row in raw_rows):
+                raise SystemExit(f"Mismatch for '{name}': aggregates and raw scan disagree.")
+            print(f"{name:<20} {aggregated_seconds * 1000:>10.2f}ms {raw_seconds * 1000:>10.2f}ms "
+                  f"{raw_seconds / aggregated_seconds:>8.0f}x")
+        store.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
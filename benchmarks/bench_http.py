@@ -0,0 +1,117 @@
+"""
+Benchmark and behaviour check of the shared HTTP client against a local mock server.
+
+Starts a threaded HTTP server on 127.0.0.1 that answers after a fixed latency, replies
+429 (with 'Retry-After: 0') to a configurable share of requests, and counts the TCP
+connections and requests it sees. Then times:
+    - baseline: plain 'requests.get()' per call (a new connection every time, 429s fail),
+    - shared:   http_client.HttpClient (keep-alive pool, retries, coalescing).
+Both send the same mix of unique and duplicated concurrent URLs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_http [--requests 200] [--unique 50] [--threads 16] [--error-rate 0.1]
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_client import HttpClient
+
+
+class MockState:
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(7)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.requests = 0
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def do_GET(self):
+            with state.lock:
+                state.requests += 1
+                throttled = state.rng.random() < state.error_rate
+            time.sleep(state.latency)
+            body = b"rate limited" if throttled else (f"<html><body>{self.path}</body></html>" * 20).encode()
+            self.send_response(429 if throttled else 200)
+            if throttled:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run_load(get, base_url: str, paths: list, threads: int) -> tuple:
+    """Sends every path through 'get' on 'threads' threads; returns (seconds, failures)."""
+    def fetch(path):
+        try:
+            return get(base_url + path).status_code != 200
+        except requests.RequestException:
+            return True
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        failures = sum(pool.map(fetch, paths))
+    return time.perf_counter() - started, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=50, help="Distinct URLs among the requests.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="Server think time per request (s).")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Share of requests answered with 429.")
+    args = parser.parse_args()
+
+    state = MockState(args.latency, args.error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    rng = random.Random(1)
+    paths = [f"/page/{rng.randrange(args.unique)}" for _ in range(args.requests)]
+
+    print(f"{args.requests} GETs over {args.unique} URLs, {args.threads} threads, "
+          f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} 429s")
+    print(f"{'client':<10}{'seconds':>10}{'failures':>10}{'server reqs':>13}{'connections':>13}")
+
+    state.reset()
+    seconds, failures = run_load(requests.get, base_url, paths, args.threads)
+    print(f"{'baseline':<10}{seconds:>10.2f}{failures:>10}{state.requests:>13}{state.connections:>13}")
+
+    state.reset()
+    client = HttpClient(max_per_host=args.threads, backoff_base=0.05)
+    seconds, failures = run_load(lambda url: client.request("GET", url), base_url, paths, args.threads)
+    print(f"{'shared':<10}{seconds:>10.2f}{failures:>10}{state.requests:>13}{state.connections:>13}")
+    print(f"shared client stats: {client.stats}")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
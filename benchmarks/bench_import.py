@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark for 'tools.py'.
+
+Each measurement runs in a fresh interpreter so nothing is shared through sys.modules:
+    - lazy:  'import tools' (what the app pays now; tools are LazyTool proxies)
+    - eager: 'import tools' followed by constructing every lazy tool (what every import
+             used to pay when all tools were instantiated at module level)
+
+The eager mode needs the same environment as a real build: the API keys in '.env'
+(OPENAI_API_KEY for the RAG tools, SERPER_API_KEY, EXA_API_KEY, FIRECRAWL_API_KEY,
+GITHUB_TOKEN, ...) and the './docs' directory. Tools that can't be constructed here
+are skipped and listed, so the eager figure is then a lower bound.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_import [--repeat 5]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+EAGER = """
+import sys
+import tools
+for name, value in list(vars(tools).items()):
+    if isinstance(value, tools.LazyTool):
+        try:
+            value.materialize()
+        except Exception as e:
+            print(f"skipped {name}: {type(e).__name__}: {str(e)[:120]}", file=sys.stderr)
+"""
+
+SNIPPETS = {
+    "lazy": "import tools",
+    "eager": EAGER,
+}
+
+TIMER = """
+import time
+_t = time.perf_counter()
+{snippet}
+print(time.perf_counter() - _t)
+"""
+
+
+def measure(snippet: str, repeat: int) -> list:
+    """Runs 'snippet' in 'repeat' fresh interpreters and returns the wall times in seconds."""
+    timings = []
+    for index in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", TIMER.format(snippet=snippet)],
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            sys.exit(f"Benchmark snippet failed:\n{completed.stderr.strip()}")
+        if index == 0 and completed.stderr.strip():
+            print(completed.stderr.strip())
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement.")
+    args = parser.parse_args()
+
+    results = {name: statistics.median(measure(snippet, args.repeat)) for name, snippet in SNIPPETS.items()}
+    for name, seconds in results.items():
+        print(f"{name:>6}: {seconds * 1000:9.1f} ms (median of {args.repeat})")
+    print(f"cold-start saving: {(results['eager'] - results['lazy']) * 1000:.1f} ms "
+          f"({results['eager'] / results['lazy']:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the pooled code interpreter against a fresh interpreter per call.
+
+Times the same small analysis snippet (JSON + statistics, as the analyst runs) with:
+    - baseline: 'python -c' in a new process per call (what an unpooled local run
+      costs; a Docker container per call adds its own startup on top),
+    - pool:     sandbox.SandboxPool.run() on pre-warmed workers.
+Also checks that the limits hold: a busy loop is stopped by the wall-clock limit and
+the pool keeps serving afterwards.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_sandbox [--calls 50] [--workers 2]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from sandbox import SandboxPool
+
+SNIPPET = """
+import json, statistics
+ratings = [(i * 7) % 5 + 1 for i in range(2000)]
+print(json.dumps({"mean": statistics.mean(ratings), "median": statistics.median(ratings)}))
+"""
+
+
+def timed_calls(function, calls: int) -> list:
+    durations = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def report(name: str, durations: list):
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(f"{name:<10} median {statistics.median(durations) * 1000:>8.1f}ms   p95 {p95 * 1000:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    baseline = timed_calls(lambda: subprocess.run([sys.executable, "-c", SNIPPET], check=True, capture_output=True),
+                           max(1, args.calls // 5))
+    report("baseline", baseline)
+
+    pool = SandboxPool(workers=args.workers, max_runs=max(args.calls, 1), timeout=2.0).start()
+    try:
+        started = time.perf_counter()
+        pool.run("print('warm')")
+        print(f"first call (includes worker startup): {(time.perf_counter() - started) * 1000:.0f}ms")
+        durations = timed_calls(lambda: pool.run(SNIPPET), args.calls)
+        report("pool", durations)
+        print(f"speedup: {statistics.median(baseline) / statistics.median(durations):.0f}x")
+
+        result = pool.run("while True: pass")
+        print(f"busy loop: timed_out={result.timed_out}; next call ok={pool.run('print(1)').ok}; stats={pool.stats}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
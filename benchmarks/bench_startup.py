@@ -0,0 +1,101 @@
+"""
+Regression benchmark of cold start time and resident memory, with budgets.
+
+Each run starts a fresh interpreter (so nothing is in sys.modules or warm in-process
+caches) and measures wall time from process start to the end of the target, plus peak
+RSS. Two targets:
+    - app:    executes main.py's first run, the same script 'streamlit run' loads
+              (job workers disabled, so only the server's own startup is measured;
+              Streamlit widgets return defaults outside a session),
+    - worker: imports builder and builds the agent registry with get_registry(), which
+              is what a job worker does before its first build can start. It runs
+              with LLM_PROVIDER=fake, so no API key or network is needed and the
+              figure is the import and construction cost of the agents and tools.
+The median of --runs runs is compared with the budget of each target. The exit status is
+1 when any budget is exceeded, so the benchmark can gate CI; the import breakdown of a
+slow target is available from 'python -m startup_profile' or STARTUP_PROFILE=1.
+
+Budgets can also be set with STARTUP_BUDGET_APP_MS, STARTUP_BUDGET_APP_MB,
+STARTUP_BUDGET_WORKER_MS and STARTUP_BUDGET_WORKER_MB.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [--targets app,worker] [--runs 5] [--app-ms 1500] [--app-mb 120]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Runs in the child: executes the target, then reports its peak RSS.
+CHILD = """
+import json, resource, runpy, sys
+sys.path.insert(0, ".")
+target = sys.argv[1]
+if target == "app":
+    runpy.run_path("main.py", run_name="__main__")
+else:
+    import builder
+    builder.get_registry()
+try:
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_kb = peak_kb // 1024 if sys.platform == "darwin" else peak_kb
+print("\\nSTARTUP " + json.dumps({"peak_kb": peak_kb}))
+"""
+
+DEFAULT_BUDGETS = {
+    "app": (1500, 120),
+    "worker": (4000, 250),
+}
+
+
+def measure(target: str) -> tuple:
+    env = dict(os.environ, JOB_WORKERS="0", STARTUP_PROFILE="0")
+    if target == "worker":
+        env["LLM_PROVIDER"] = "fake"
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", CHILD, target], env=env, capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    marker = [line for line in completed.stdout.splitlines() if line.startswith("STARTUP ")]
+    if completed.returncode != 0 or not marker:
+        raise RuntimeError(f"{target} failed to start:\n{completed.stderr.strip()[-2000:]}")
+    return elapsed_ms, json.loads(marker[-1][len("STARTUP "):])["peak_kb"] / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="app,worker")
+    parser.add_argument("--runs", type=int, default=5)
+    for target, (budget_ms, budget_mb) in DEFAULT_BUDGETS.items():
+        prefix = f"STARTUP_BUDGET_{target.upper()}"
+        parser.add_argument(f"--{target}-ms", type=float, default=float(os.getenv(f"{prefix}_MS", budget_ms)))
+        parser.add_argument(f"--{target}-mb", type=float, default=float(os.getenv(f"{prefix}_MB", budget_mb)))
+    args = parser.parse_args()
+
+    failed = False
+    for target in [target.strip() for target in args.targets.split(",") if target.strip()]:
+        if target not in DEFAULT_BUDGETS:
+            parser.error(f"unknown target {target!r} (expected one of {', '.join(DEFAULT_BUDGETS)})")
+        budget_ms, budget_mb = getattr(args, f"{target}_ms"), getattr(args, f"{target}_mb")
+        try:
+            samples = [measure(target) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{target:<7} FAILED  {e}")
+            failed = True
+            continue
+        wall_ms = statistics.median(sample[0] for sample in samples)
+        peak_mb = statistics.median(sample[1] for sample in samples)
+        over = wall_ms > budget_ms or peak_mb > budget_mb
+        failed = failed or over
+        print(f"{target:<7} cold start {wall_ms:>7.0f}ms (budget {budget_ms:.0f})   "
+              f"peak RSS {peak_mb:>6.1f} MB (budget {budget_mb:.0f})   {'OVER BUDGET' if over else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Headless website build: one prompt in, 'autosite/index.html' and a ZIP package out.
+
+This is the part of the old Streamlit button handler that doesn't touch the UI, so the
+same build can run inline, on a job-queue worker (jobs.py) or from the batch CLI.
+Everything the UI needs to show afterwards is returned as a JSON-serializable dict.
+"""
+import os
+from collections import Counter
+
+from archive import write_zip
+from cache import counted_execute, get_web_cache
+from checkpoints import Checkpointer, checkpoint_keys, get_checkpoint_store
+from compaction import ContextCompactor, extract_artifact
+from components import harvest_sections, with_component_references
+from crew import build_task_graph, get_registry
+from instrumentation import RunTrace, instrumented_execute
+from pipeline import execute_task, run_task_dag
+from postprocess import optimize_site
+from progress import tracked_execute
+from sandbox import get_sandbox_pool, pool_enabled, with_site_dir
+
+PLACEHOLDER_HTML = "<html><body><h1>Generated Website (Placeholder)</h1><p>The AI agent did not produce the expected HTML output.</p></body></html>"
+ZIP_FILENAME = "autosite_package.zip"
+
+
+def run_website_build(prompt: str, output_dir: str = ".", bus=None, trace: RunTrace = None, registry=None,
+                      resume_key: str = None) -> dict:
+    """
+    Runs the task DAG for 'prompt' and packages the generated site.
+
+    Args:
+        prompt (str): The website idea.
+        output_dir (str): Where 'autosite/index.html' and the ZIP package are written.
+        bus (progress.ProgressBus): Optional bus receiving live progress events.
+        trace (RunTrace): Optional trace to record into; a new one is created otherwise.
+        registry (crew.AgentRegistry): Defaults to the process-wide registry.
+        resume_key (str): Identifies this build across retries (e.g. 'job:<id>'). Task outputs
+                          are checkpointed under it, and a retry with the same key reuses
+                          the tasks that already succeeded (see checkpoints.py). Without
+                          one, nothing is checkpointed.
+    Returns:
+        dict: Task outputs, timings, cache statistics, run profile and artifact paths.
+    Raises:
+        progress.BuildCancelled: If 'bus' was cancelled.
+    """
+    registry = registry or get_registry()
+    if pool_enabled():
+        get_sandbox_pool()  # Starts the code-interpreter workers now, so they are warm once an agent needs them
+    site_dir = os.path.join(output_dir, "autosite")
+    os.makedirs(site_dir, exist_ok=True)
+
+    task_graph = build_task_graph(prompt, registry, site_dir=site_dir)
+    trace = trace or RunTrace()
+    execute = execute_task
+    checkpointer = None
+    store = get_checkpoint_store() if resume_key else None
+    if store is not None:
+        from feedback import get_feedback_store
+        from ingest import indexed_content_hashes
+
+        # New feedback rows change what the analyst can see, just like new uploads do.
+        data_versions = indexed_content_hashes() + [get_feedback_store().data_version()]
+        checkpointer = Checkpointer(store, checkpoint_keys(task_graph, prompt, data_versions, resume_key))
+        execute = checkpointer.wrap(execute)
+    execute = with_site_dir(site_dir, execute)  # Where the code interpreter may write (see sandbox.py)
+    execute = instrumented_execute(trace, execute)
+    web_cache = Counter(hits=0, misses=0)
+    execute = counted_execute(get_web_cache(), web_cache, execute)
+    if bus is not None:
+        execute = tracked_execute(bus, execute)
+    # Downstream agents get compact JSON artifacts within a token budget instead of the
+    # full upstream transcripts (see compaction.py).
+    compactor = ContextCompactor() if os.getenv("CONTEXT_COMPACTION", "on") != "off" else None
+    build_context = compactor.build_context if compactor is not None else None
+    use_components = os.getenv("COMPONENT_LIBRARY", "on") != "off"
+    if use_components:
+        # The developer also gets the closest stored sections of earlier sites (see components.py).
+        build_context = with_component_references(build_context)
+    try:
+        dag_result = run_task_dag(task_graph, execute=execute, build_context=build_context)
+    finally:
+        trace.write_jsonl()
+
+    html_path = os.path.join(site_dir, "index.html")
+    html_generated = os.path.exists(html_path) and os.path.getsize(html_path) > 0
+    if not html_generated:
+        # Provide a placeholder if generation failed
+        with open(html_path, "w") as f:
+            f.write(PLACEHOLDER_HTML)
+    harvested = 0
+    if html_generated and use_components:
+        # Harvest before optimization, while every section still carries its own CSS
+        # (harvest_sections() repairs the markup the same way the optimizer will).
+        try:
+            with open(html_path, "r", encoding="utf-8", errors="replace") as f:
+                harvested = harvest_sections(
+                    f.read(),
+                    design_tokens=extract_artifact("designer", dag_result.outputs.get("designer", "")),
+                    brand_brief=extract_artifact("briefing", dag_result.outputs.get("briefing", "")),
+                )
+        except Exception:
+            harvested = 0  # The library is an optimization; never fail the build over it
+    optimization = None
+    if os.getenv("SITE_OPTIMIZE", "on") != "off":
+        # Repair the HTML, split/minify CSS, shrink images and pre-compress (see postprocess.py).
+        # An optimizer failure leaves the page as generated rather than failing the build.
+        try:
+            optimization = optimize_site(site_dir)
+        except Exception as e:
+            optimization = {"error": f"{type(e).__name__}: {e}"}
+    zip_path = os.path.join(output_dir, ZIP_FILENAME)
+    write_zip(site_dir, zip_path)
+
+    return {
+        "run_id": trace.run_id,
+        "prompt": prompt,
+        "outputs": dag_result.outputs,
+        "order": dag_result.order,
+        "wall_time": dag_result.wall_time,
+        "critical_path": dag_result.critical_path,
+        "resumed": checkpointer.resumed if checkpointer is not None else [],
+        "timing_rows": dag_result.timing_rows(),
+        "web_cache": dict(web_cache),
+        "llm_cache": registry.completion_cache.stats() if registry.completion_cache is not None else None,
+        "context_rows": compactor.rows() if compactor is not None else [],
+        "profile_rows": trace.summary_rows(),
+        "timeline": trace.timeline(),
+        "html_path": html_path,
+        "html_generated": html_generated,
+        "optimization": optimization,
+        "components_harvested": harvested,
+        "zip_path": zip_path,
+    }
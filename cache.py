@@ -0,0 +1,273 @@
+"""
+Persistent, content-addressed cache for tool results.
+
+Web search and scrape tools tend to be called with the same queries and URLs on every
+build. Results are stored in a small SQLite database next to the Chroma store in 'db/',
+keyed by the tool name plus its normalized arguments, so repeated builds skip the network
+round-trip (and the paid API call).
+
+Eviction:
+    - TTL: entries older than 'ttl_seconds' are treated as misses and deleted.
+    - LRU: when the cache exceeds 'max_bytes' or 'max_entries', the least recently
+      used entries are removed first.
+
+Empty results and error text are never stored: crewai tools usually report failures as
+a string ("Error: ...") instead of raising, and a transient failure must not be replayed
+for the whole TTL.
+
+Configuration (via .env):
+    TOOL_CACHE_PATH      Database file (default: db/tool_cache.sqlite3)
+    TOOL_CACHE_TTL       Time-to-live in seconds (default: 7 days)
+    TOOL_CACHE_MAX_MB    Size budget in megabytes (default: 256)
+    TOOL_CACHE_OFFLINE   If set to 1, a miss raises CacheMissError instead of calling the tool.
+                         Useful for running against a pre-warmed cache without network access.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_CACHE_PATH = os.path.join("db", "tool_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 100_000
+
+_WHITESPACE = re.compile(r"\s+")
+_ERROR_TEXT = re.compile(r"\s*(error\b|an error occurred|failed to\b|exception\b|traceback \(most recent call last\))",
+                         re.IGNORECASE)
+
+
+# ResultCache -> Counter of the build running on this thread (see 'counted_execute()').
+_build_counters = contextvars.ContextVar("result_cache_build_counters", default=None)
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a result isn't in the cache."""
+
+
+def _normalize_url(value: str) -> str:
+    parts = urlsplit(value)
+    path = parts.path.rstrip("/") or "/"
+    # Scheme and host are case-insensitive; the fragment never reaches the server.
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        value = _WHITESPACE.sub(" ", value.strip())
+        if value.lower().startswith(("http://", "https://")):
+            return _normalize_url(value)
+        return value
+    if isinstance(value, dict):
+        return {str(key): _normalize_value(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(item) for item in value]
+    return value
+
+
+def is_cacheable(value) -> bool:
+    """False for results that shouldn't be replayed: None, empty values and error text."""
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return bool(value.strip()) and not _ERROR_TEXT.match(value)
+    if isinstance(value, (list, tuple, dict)):
+        return bool(value)
+    return True
+
+
+def make_key(namespace: str, *args, **kwargs) -> str:
+    """
+    Builds a content-addressed cache key.
+
+    Strings are trimmed and whitespace-collapsed, URLs are normalized, None-valued keyword
+    arguments are dropped and keyword order doesn't matter.
+
+    Args:
+        namespace (str): Usually the tool name.
+    Returns:
+        str: A sha256 hex digest.
+    """
+    payload = json.dumps(
+        {"namespace": namespace, "args": _normalize_value(list(args)), "kwargs": _normalize_value(kwargs)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite-backed key/value cache with TTL and LRU size eviction.
+
+    Values are stored as JSON, so anything json-serializable can be cached.
+    A single connection is shared behind a lock, which makes the cache safe to use
+    from the parallel task threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 offline: bool = False):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.offline = offline
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY,"
+                " namespace TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed)")
+        return self._connection
+
+    def get(self, key: str, namespace: str = "", default=None):
+        """Returns the cached value for 'key', or 'default' on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value, created FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                connection.commit()
+                row = None
+            build_counts = (_build_counters.get() or {}).get(self)
+            if row is None:
+                self.misses[namespace] += 1
+                if build_counts is not None:
+                    build_counts["misses"] += 1
+                return default
+            connection.execute("UPDATE cache_entries SET accessed = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits[namespace] += 1
+            if build_counts is not None:
+                build_counts["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value, namespace: str = ""):
+        """Stores 'value' under 'key' and evicts least recently used entries if over budget."""
+        encoded = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, namespace, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, encoded, len(encoded.encode("utf-8")), now, now),
+            )
+            self._evict(connection)
+            connection.commit()
+
+    def _evict(self, connection):
+        count, total = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        freed_count, freed_bytes = 0, 0
+        doomed = []
+        for key, size in connection.execute("SELECT key, size FROM cache_entries ORDER BY accessed ASC"):
+            if count - freed_count <= self.max_entries and total - freed_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed_count += 1
+            freed_bytes += size
+        connection.executemany("DELETE FROM cache_entries WHERE key = ?", doomed)
+
+    def get_or_compute(self, namespace: str, compute, *args, **kwargs):
+        """
+        Returns the cached result of 'compute(*args, **kwargs)', computing and storing it on a miss.
+
+        Results rejected by 'is_cacheable()' (empty or error text) are returned but not stored.
+
+        Raises:
+            CacheMissError: On a miss while the cache is in offline mode.
+        """
+        key = make_key(namespace, *args, **kwargs)
+        sentinel = object()
+        value = self.get(key, namespace, default=sentinel)
+        if value is not sentinel:
+            return value
+        if self.offline:
+            raise CacheMissError(f"No cached result for '{namespace}' with arguments {kwargs or args} (offline mode).")
+        value = compute(*args, **kwargs)
+        if is_cacheable(value):
+            self.set(key, value, namespace)
+        return value
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM cache_entries")
+            connection.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters per namespace plus the current size of the store."""
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "by_namespace": {name: {"hits": self.hits[name], "misses": self.misses[name]} for name in namespaces},
+        }
+
+
+def counted_execute(cache: ResultCache, counts: Counter, execute):
+    """
+    Wraps a DAG 'execute(task, context)' callable so the hits and misses its tasks get from
+    'cache' are also counted in 'counts' ('hits'/'misses').
+
+    The cache's own counters are process-wide, so with several builds running at once
+    (see batch.py) they can't tell which build a hit belongs to.
+    """
+    def run(task, context):
+        token = _build_counters.set({**(_build_counters.get() or {}), cache: counts})
+        try:
+            return execute(task, context)
+        finally:
+            _build_counters.reset(token)
+
+    return run
+
+
+_web_cache = None
+_web_cache_lock = threading.Lock()
+
+
+def get_web_cache() -> ResultCache:
+    """Returns the process-wide cache used by the web search/scrape tools (configured from .env)."""
+    global _web_cache
+    with _web_cache_lock:
+        if _web_cache is None:
+            _web_cache = ResultCache(
+                path=os.getenv("TOOL_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("TOOL_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                max_bytes=int(float(os.getenv("TOOL_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+                offline=os.getenv("TOOL_CACHE_OFFLINE") == "1",
+            )
+        return _web_cache
@@ -0,0 +1,130 @@
+"""
+Task-level checkpoints, so a failed build resumes where it broke instead of from scratch.
+
+Checkpoints belong to one logical build, identified by its resume key: the job id for a
+job-queue build (a retry keeps the id) or the output directory of a batch entry. A new
+build never reads another build's checkpoints, so they can't turn into a result cache
+that serves stale outputs to a fresh build of the same prompt; builds without a resume
+key aren't checkpointed at all.
+
+After a task of the DAG succeeds, its output is stored in 'db/checkpoints.sqlite3' under a
+key derived from:
+
+    - the resume key,
+    - the prompt,
+    - the content hashes of the indexed uploads and the version of the feedback store
+      (what the search and feedback tools can see),
+    - the task definition (description, expected output, agent role/goal/backstory,
+      tool names and model),
+    - the checkpoint keys of the tasks it depends on.
+
+Because a key includes its dependencies' keys, editing the briefing task (or uploading a
+new file) invalidates the briefing and everything downstream, while an unchanged analyst
+branch is still reused. When the build is retried, every task whose key is stored returns
+the stored output immediately; the first failed or invalidated task and everything after
+it run normally.
+
+Nodes created with 'checkpoint=False' (the developer, whose real output is the
+index.html file it writes) always run.
+
+Configuration (via .env):
+    CHECKPOINTS          'on' (default) or 'off'
+    CHECKPOINT_PATH      Database file (default: db/checkpoints.sqlite3)
+    CHECKPOINT_TTL       Time-to-live in seconds (default: 7 days, how long a failed build can be resumed)
+"""
+import os
+import threading
+
+from cache import ResultCache, make_key
+from pipeline import current_task_name, topological_order
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("db", "checkpoints.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Bump when the stored format or the meaning of a task output changes.
+CHECKPOINT_VERSION = 1
+
+
+def task_definition(task) -> dict:
+    """The parts of a crewai Task (and its agent) that determine its output."""
+    agent = getattr(task, "agent", None)
+    llm = getattr(agent, "llm", None)
+    return {
+        "description": getattr(task, "description", ""),
+        "expected_output": getattr(task, "expected_output", ""),
+        "role": getattr(agent, "role", ""),
+        "goal": getattr(agent, "goal", ""),
+        "backstory": getattr(agent, "backstory", ""),
+        "tools": sorted(tool.name for tool in (getattr(agent, "tools", None) or [])),
+        "model": getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__,
+    }
+
+
+def checkpoint_keys(nodes: list, prompt: str, upload_hashes: list = (), resume_key: str = "") -> dict:
+    """
+    Computes the checkpoint key of every node that can be checkpointed.
+
+    Args:
+        resume_key (str): Identifies the build the checkpoints belong to (e.g. 'job:<id>').
+
+    Returns:
+        dict: node name -> key. Nodes with 'checkpoint=False' are left out.
+    """
+    by_name = {node.name: node for node in nodes}
+    chained = {}
+    for name in topological_order(nodes):
+        node = by_name[name]
+        chained[name] = make_key(
+            "checkpoint", CHECKPOINT_VERSION, resume_key, prompt, list(upload_hashes), task_definition(node.task),
+            [chained[dependency] for dependency in node.depends_on],
+        )
+    return {name: key for name, key in chained.items() if getattr(by_name[name], "checkpoint", True)}
+
+
+class Checkpointer:
+    """
+    Wraps a DAG 'execute(task, context)' callable with checkpoint lookup and storage.
+
+    Attributes:
+        resumed (list): Names of the tasks answered from a checkpoint in this run.
+    """
+
+    def __init__(self, store: ResultCache, keys: dict):
+        self.store = store
+        self.keys = keys
+        self.resumed = []
+        self._lock = threading.Lock()
+
+    def wrap(self, execute):
+        def run(task, context):
+            name = current_task_name.get()
+            key = self.keys.get(name)
+            if key is None:
+                return execute(task, context)
+            stored = self.store.get(key, namespace="checkpoint")
+            if stored is not None:
+                with self._lock:
+                    self.resumed.append(name)
+                return stored
+            output = execute(task, context)
+            self.store.set(key, output, namespace="checkpoint")
+            return output
+
+        return run
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """Returns the process-wide checkpoint store, or None if CHECKPOINTS=off."""
+    global _store
+    if os.getenv("CHECKPOINTS", "on") == "off":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultCache(
+                path=os.getenv("CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH),
+                ttl_seconds=float(os.getenv("CHECKPOINT_TTL", DEFAULT_TTL_SECONDS)),
+            )
+        return _store
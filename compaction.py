@@ -0,0 +1,322 @@
+"""
+Context compaction between tasks.
+
+By default a task receives the full text output of every task it depends on (see
+'pipeline.concatenate_outputs()'), so the prompt of each later agent grows with every stage.
+Instead, the upstream tasks are asked to answer with a JSON artifact, and the compactor
+turns each output into that artifact before it is handed on:
+
+    briefing   -> brand_brief        (brand, audience, value proposition, tone, messages, ...)
+    designer   -> design_tokens      (colors, fonts, spacing, ordered sections, style notes)
+    copywriter -> section_copy       (section -> {headline, body, cta, ...})
+    analyst    -> feedback_insights  (insights, recommendations)
+
+Parsed artifacts are validated against the pydantic models below, which drops
+everything that isn't part of the artifact. LLMs don't keep to the example's exact shape
+(numbers for spacing, nested color objects, lists of features, sections as a list of
+objects), so the models only fix the top-level structure: token maps and section copy
+take any JSON values, prose fields accept lists and objects (flattened to text), and a
+field that still doesn't fit is dropped on its own rather than taking the whole artifact
+with it. Anything that can't be parsed is kept as plain text. Each receiving agent then has a token budget (CONTEXT_BUDGETS) for its
+metadata inputs. An artifact over budget is trimmed by repeatedly shortening its largest
+list or string; plain text is cut at the end.
+
+The copywriter's section_copy is the text that ends up on the page, so it is never
+trimmed (UNTRIMMED_TASKS): it is passed on whole (re-serialized without whitespace) and
+the budget that is left is split evenly over the other inputs, each getting at least
+MIN_INPUT_BUDGET tokens.
+
+Per-task raw vs. compacted token counts are kept in 'ContextCompactor.rows()', so each
+run reports the tokens it saved.
+"""
+import json
+import re
+import threading
+from typing import Annotated, Any, Dict, List
+
+from pydantic import BaseModel, BeforeValidator, ValidationError
+
+# Prompt-token budget for the context each agent receives (an untrimmed section_copy may exceed it).
+CONTEXT_BUDGETS = {
+    "designer": 600,
+    "copywriter": 600,
+    "developer": 2000,
+}
+DEFAULT_BUDGET = 1500
+MIN_INPUT_BUDGET = 200
+# Outputs that are content rather than metadata; they are compacted but never cut.
+UNTRIMMED_TASKS = {"copywriter"}
+
+
+def _as_text(value) -> str:
+    """Flattens a JSON value into prose (e.g. a list of audiences into one line)."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "; ".join(text for text in map(_as_text, value) if text)
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {_as_text(item)}" for key, item in value.items())
+    return str(value)
+
+
+def _as_list(value) -> list:
+    if isinstance(value, (str, int, float)):
+        return [value]
+    if isinstance(value, dict):
+        return [f"{key}: {_as_text(item)}" for key, item in value.items()]
+    return value
+
+
+_NAME_KEYS = ("name", "id", "section", "type", "title")
+
+
+def _name_key(item: dict):
+    """The key naming a section given as an object ({"name": "hero", ...}), or None."""
+    return next((key for key in _NAME_KEYS if isinstance(item.get(key), str)), None)
+
+
+def _section_names(value):
+    """Planned sections given as objects, or as a map of section -> details, become their names."""
+    if isinstance(value, dict):
+        return list(value)
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(",") if name.strip()]
+    if isinstance(value, list):
+        return [item[_name_key(item)] if isinstance(item, dict) and _name_key(item) else item for item in value]
+    return value
+
+
+def _section_map(value):
+    """Section copy given as a list of objects is keyed by each object's name; plain text becomes {"text": ...}."""
+    if isinstance(value, list):
+        mapped = {}
+        for index, item in enumerate(value, start=1):
+            key = _name_key(item) if isinstance(item, dict) else None
+            if key is None:
+                mapped[f"section{index}"] = item
+            else:
+                mapped[item[key]] = {field: text for field, text in item.items() if field != key}
+        value = mapped
+    if isinstance(value, dict):
+        return {name: item if isinstance(item, dict) else {"text": item} for name, item in value.items()}
+    return value
+
+
+Text = Annotated[str, BeforeValidator(_as_text)]
+TextList = Annotated[List[Text], BeforeValidator(_as_list)]
+
+
+class BrandBrief(BaseModel):
+    brand_name: Text = ""
+    audience: Text = ""
+    value_proposition: Text = ""
+    tone: Text = ""
+    key_messages: TextList = []
+    competitors: TextList = []
+    trends: TextList = []
+
+
+class DesignTokens(BaseModel):
+    colors: Dict[str, Any] = {}
+    fonts: Dict[str, Any] = {}
+    spacing: Dict[str, Any] = {}
+    sections: Annotated[List[Text], BeforeValidator(_section_names)] = []
+    style_notes: Text = ""
+
+
+class SectionCopy(BaseModel):
+    sections: Annotated[Dict[str, Dict[str, Any]], BeforeValidator(_section_map)] = {}
+
+
+class FeedbackInsights(BaseModel):
+    insights: List[str] = []
+    recommendations: List[str] = []
+
+
+# Task name -> (artifact name, model, example shown to the producing agent)
+ARTIFACTS = {
+    "briefing": ("brand_brief", BrandBrief, {
+        "brand_name": "...", "audience": "...", "value_proposition": "...", "tone": "...",
+        "key_messages": ["..."], "competitors": ["..."], "trends": ["..."],
+    }),
+    "designer": ("design_tokens", DesignTokens, {
+        "colors": {"primary": "#hex", "background": "#hex", "text": "#hex"},
+        "fonts": {"heading": "...", "body": "..."},
+        "spacing": {"section": "...", "gap": "..."},
+        "sections": ["header", "hero", "features", "cta", "footer"],
+        "style_notes": "...",
+    }),
+    "copywriter": ("section_copy", SectionCopy, {
+        "sections": {"hero": {"headline": "...", "subtext": "...", "cta": "..."}, "footer": {"text": "..."}},
+    }),
+    "analyst": ("feedback_insights", FeedbackInsights, {
+        "insights": ["..."], "recommendations": ["..."],
+    }),
+}
+
+
+def json_output_instructions(task_name: str) -> str:
+    """Sentence appended to a task's expected output asking for its JSON artifact."""
+    _artifact, _model, example = ARTIFACTS[task_name]
+    return (" Your final answer must be a single JSON object (no prose around it) with this structure: "
+            + json.dumps(example))
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken (gpt-4o encoding), or estimates 4 characters per token without it."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:  # tiktoken missing, or its encoding file can't be downloaded
+                    _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _parse_json_object(text: str):
+    """Returns the first JSON object in 'text' (also inside ```json fences), or None."""
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _end = json.JSONDecoder().raw_decode(text[start:])
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def extract_artifact(task_name: str, output: str):
+    """
+    Parses a task output into its artifact.
+
+    Returns:
+        dict | None: The validated artifact (empty and invalid fields dropped), or None if the
+        task has no artifact or its output has no usable JSON for it.
+    """
+    if task_name not in ARTIFACTS:
+        return None
+    _artifact, model, _example = ARTIFACTS[task_name]
+    parsed = _parse_json_object(output)
+    if parsed is None:
+        return None
+    try:
+        artifact = model.model_validate(parsed).model_dump(exclude_defaults=True)
+    except ValidationError as e:
+        # Drop only the fields that don't fit; the rest of the artifact is still worth passing on.
+        invalid = {error["loc"][0] for error in e.errors() if error["loc"]}
+        try:
+            artifact = model.model_validate(
+                {key: value for key, value in parsed.items() if key not in invalid}
+            ).model_dump(exclude_defaults=True)
+        except ValidationError:
+            return None
+    return artifact or None
+
+
+def _trim_step(value) -> bool:
+    """Shrinks the largest list or string inside 'value' by roughly a third. Returns False if nothing is left to trim."""
+    largest, largest_size, parent, slot = None, 0, None, None
+
+    def visit(item, holder, key):
+        nonlocal largest, largest_size, parent, slot
+        size = len(json.dumps(item))
+        if isinstance(item, (list, str)) and size > largest_size and len(item) > 1:
+            largest, largest_size, parent, slot = item, size, holder, key
+        if isinstance(item, dict):
+            for child_key, child in item.items():
+                visit(child, item, child_key)
+        elif isinstance(item, list):
+            for index, child in enumerate(item):
+                visit(child, item, index)
+
+    visit(value, None, None)
+    if parent is None:
+        return False
+    keep = max(1, len(largest) * 2 // 3)
+    parent[slot] = largest[:keep] if isinstance(largest, list) else re.sub(r"\s+\S*$", "", largest[:keep]) + "…"
+    return True
+
+
+def fit_to_budget(text_or_artifact, budget: int) -> str:
+    """Serializes an artifact (or plain text) so it fits in 'budget' tokens."""
+    if isinstance(text_or_artifact, str):
+        text = text_or_artifact
+        while count_tokens(text) > budget and len(text) > 1:
+            text = text[: len(text) * 4 // 5]
+        return text
+    artifact = json.loads(json.dumps(text_or_artifact))  # Deep copy
+    text = json.dumps(artifact, ensure_ascii=False, separators=(",", ":"))
+    while count_tokens(text) > budget and _trim_step(artifact):
+        text = json.dumps(artifact, ensure_ascii=False, separators=(",", ":"))
+    return fit_to_budget(text, budget) if count_tokens(text) > budget else text
+
+
+class ContextCompactor:
+    """
+    Builds compact task contexts for 'pipeline.run_task_dag(..., build_context=...)'.
+
+    Args:
+        budgets (dict): Receiving task name -> token budget for its whole context.
+    """
+
+    def __init__(self, budgets: dict = None):
+        self.budgets = CONTEXT_BUDGETS if budgets is None else budgets
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def build_context(self, node, outputs: dict) -> str:
+        if not node.depends_on:
+            return ""
+        raw = "\n\n".join(f"## Output of '{dependency}'\n{outputs[dependency]}" for dependency in node.depends_on)
+        artifacts = {dependency: extract_artifact(dependency, outputs[dependency]) for dependency in node.depends_on}
+        untrimmed = {
+            dependency: json.dumps(artifacts[dependency], ensure_ascii=False, separators=(",", ":"))
+            if artifacts[dependency] is not None else outputs[dependency]
+            for dependency in node.depends_on if dependency in UNTRIMMED_TASKS
+        }
+        trimmed = [dependency for dependency in node.depends_on if dependency not in untrimmed]
+        remaining = self.budgets.get(node.name, DEFAULT_BUDGET) - sum(count_tokens(text) for text in untrimmed.values())
+        budget_per_input = max(remaining // max(len(trimmed), 1), MIN_INPUT_BUDGET)
+        parts = []
+        for dependency in node.depends_on:
+            artifact = artifacts[dependency]
+            text = untrimmed.get(dependency)
+            if text is None:
+                text = fit_to_budget(artifact if artifact is not None else outputs[dependency], budget_per_input)
+            if artifact is not None:
+                parts.append(f"## {ARTIFACTS[dependency][0]} (from '{dependency}', JSON)\n{text}")
+            else:
+                parts.append(f"## Output of '{dependency}'\n{text}")
+        compact = "\n\n".join(parts)
+        raw_tokens, compact_tokens = count_tokens(raw), count_tokens(compact)
+        with self._lock:
+            self._rows.append({
+                "task": node.name,
+                "inputs": ", ".join(node.depends_on),
+                "raw tokens": raw_tokens,
+                "compact tokens": compact_tokens,
+                "saved": raw_tokens - compact_tokens,
+            })
+        return compact
+
+    def rows(self) -> list:
+        with self._lock:
+            return list(self._rows)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(row["saved"] for row in self.rows())
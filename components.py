@@ -0,0 +1,235 @@
+"""
+Section component library for the developer agent.
+
+Most prompts produce the same kinds of sections (header, hero, features, CTA, footer),
+yet the developer wrote each page from scratch. Now:
+
+    - After a build whose developer actually wrote 'index.html', the page is repaired
+      the same way the optimizer does it ('postprocess.repair_html()', so markup outside
+      a proper <body> is found too) and every top-level section of it is harvested into a Chroma collection ('components' in 'db/'). Each
+      entry holds the section's HTML and the CSS rules that style it, plus its type and
+      the design tokens of the build. Sections that are too small or have no visible
+      text are skipped, and identical sections are stored once.
+    - Before the developer runs, the closest stored section for each section type
+      listed in the designer's tokens is looked up (filtered by type, ranked by
+      similarity of type + tokens + brand brief). The matches are appended to the
+      developer's context as references to adapt rather than code to write from scratch.
+      Only whole sections are added: a section that doesn't fit in the remaining token
+      budget is left out rather than cut into markup that no longer parses.
+
+Configuration (via .env):
+    COMPONENT_LIBRARY    'on' (default) or 'off'
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+
+from compaction import count_tokens, extract_artifact
+from ingest import CHROMA_PATH, chroma_lock, collection_generation
+from pipeline import concatenate_outputs
+from postprocess import dedupe_rules, minify_css, repair_html, split_rules
+
+COMPONENTS_COLLECTION = "components"
+SECTION_TYPES = ("header", "nav", "hero", "features", "pricing", "testimonials", "faq", "cta", "contact", "footer")
+MIN_SECTION_TEXT = 40  # Characters of visible text a section needs to be worth keeping
+MAX_SECTION_HTML = 20_000
+REFERENCE_BUDGET = 1500  # Tokens of reference sections added to the developer's context
+
+_collection = None
+_collection_generation = None
+_collection_lock = threading.Lock()
+
+
+def get_components_collection():
+    """Returns the Chroma collection holding the harvested sections (use it under 'ingest.chroma_lock()')."""
+    global _collection, _collection_generation
+    generation = collection_generation()
+    with _collection_lock:
+        if _collection is None or generation != _collection_generation:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=CHROMA_PATH)
+            _collection = client.get_or_create_collection(COMPONENTS_COLLECTION, metadata={"hnsw:space": "cosine"})
+            _collection_generation = generation
+        return _collection
+
+
+def section_type(element) -> str:
+    """Classifies a top-level page element by its tag, id and classes."""
+    if element.name in ("header", "nav", "footer"):
+        return element.name
+    names = " ".join([element.get("id") or ""] + element.get("class", [])).lower()
+    for candidate in SECTION_TYPES:
+        if candidate in names:
+            return candidate
+    heading = element.find(["h1", "h2"])
+    if element.name == "section" and heading is not None and heading.name == "h1":
+        return "hero"
+    return "section"
+
+
+def _section_tokens(element) -> set:
+    tokens = set()
+    for item in [element] + element.find_all(True):
+        tokens.add(item.name)
+        tokens.update(f".{name}" for name in item.get("class", []))
+        if item.get("id"):
+            tokens.add(f"#{item['id']}")
+    return tokens
+
+
+def _selector_within(selector: str, tokens: set) -> bool:
+    # Unlike the critical-CSS check, every compound must match, so 'footer p' doesn't leak into the hero.
+    for compound in re.split(r"[\s>+~]+", selector.strip()):
+        compound = re.sub(r"::?[\w-]+(\([^)]*\))?|\[[^\]]*\]", "", compound)
+        if compound in ("", "*", "html", "body", ":root"):
+            continue
+        if not all(token in tokens for token in re.findall(r"[.#]?[\w-]+", compound)):
+            return False
+    return True
+
+
+def _section_css(rules: list, element) -> str:
+    """The top-level rules whose selectors target something inside 'element'."""
+    tokens = _section_tokens(element)
+    return "".join(
+        rule for rule in rules
+        if not rule.startswith("@") and any(_selector_within(selector, tokens) for selector in rule.split("{", 1)[0].split(","))
+    )
+
+
+def _design_query(section: str, design_tokens: dict, brand_brief: dict) -> str:
+    parts = [f"{section} section"]
+    if design_tokens:
+        parts.append(json.dumps({key: design_tokens[key] for key in ("colors", "fonts", "style_notes") if key in design_tokens}))
+    if brand_brief:
+        parts.append(" ".join(str(brand_brief.get(key, "")) for key in ("tone", "audience", "value_proposition")))
+    return " | ".join(parts)
+
+
+def harvest_sections(html: str, design_tokens: dict = None, brand_brief: dict = None) -> int:
+    """
+    Stores the top-level sections of a generated page in the library.
+
+    Returns:
+        int: Number of new sections stored.
+    """
+    soup = repair_html(html)
+    body = soup.body
+    css = "".join(minify_css(style.string or "") for style in soup.find_all("style"))
+    rules = dedupe_rules(split_rules(css))
+    elements = body.find_all(["header", "nav", "section", "footer"], recursive=False)
+    main = body.find("main", recursive=False)
+    if main is not None:
+        elements += main.find_all(["section", "header", "footer"], recursive=False)
+
+    ids, documents, metadatas = [], [], []
+    for element in elements:
+        text = element.get_text(" ", strip=True)
+        markup = str(element)
+        if len(text) < MIN_SECTION_TEXT or len(markup) > MAX_SECTION_HTML:
+            continue
+        kind = section_type(element)
+        section_css = _section_css(rules, element)
+        content_hash = hashlib.sha256((markup + section_css).encode("utf-8")).hexdigest()
+        ids.append(f"{kind}:{content_hash[:32]}")
+        documents.append(_design_query(kind, design_tokens or {}, brand_brief or {}) + " | " + text[:500])
+        metadatas.append({
+            "section_type": kind,
+            "html": markup,
+            "css": section_css,
+            "design_tokens": json.dumps(design_tokens or {}),
+            "content_hash": content_hash,
+            "created": time.time(),
+        })
+    if not ids:
+        return 0
+    with chroma_lock():
+        collection = get_components_collection()
+        existing = set(collection.get(ids=ids, include=[])["ids"])
+        new = [index for index, entry_id in enumerate(ids) if entry_id not in existing and entry_id not in ids[:index]]
+        if new:
+            collection.add(
+                ids=[ids[index] for index in new],
+                documents=[documents[index] for index in new],
+                metadatas=[metadatas[index] for index in new],
+            )
+    return len(new)
+
+
+def find_references(design_tokens: dict, brand_brief: dict = None, budget: int = REFERENCE_BUDGET) -> list:
+    """
+    Looks up the closest stored section for every section type the designer planned.
+
+    Returns:
+        list: '{"id", "section_type", "html", "css"}' dicts, in page order. Sections are never
+        truncated; the ones that don't fit in what is left of 'budget' tokens are skipped.
+    """
+    planned = [section_type_name(name) for name in (design_tokens or {}).get("sections", [])] or ["header", "hero", "features", "cta", "footer"]
+    with chroma_lock():
+        collection = get_components_collection()
+        if collection.count() == 0:
+            return []
+        matches = {}
+        for kind in dict.fromkeys(planned):
+            matches[kind] = collection.query(query_texts=[_design_query(kind, design_tokens or {}, brand_brief or {})],
+                                             n_results=1, where={"section_type": kind})
+    references, used = [], 0
+    for kind, found in matches.items():
+        if not found["ids"] or not found["ids"][0]:
+            continue
+        metadata = found["metadatas"][0][0]
+        html, css = metadata["html"], metadata["css"]
+        cost = count_tokens(html) + count_tokens(css)
+        if used + cost > budget:
+            continue  # A smaller section of a later type may still fit
+        used += cost
+        references.append({"id": found["ids"][0][0], "section_type": kind, "html": html, "css": css})
+    return references
+
+
+def section_type_name(name: str) -> str:
+    """Maps a section name from the designer's tokens ('Hero banner', 'CTA') onto SECTION_TYPES."""
+    lowered = str(name).lower()
+    for candidate in SECTION_TYPES:
+        if candidate in lowered:
+            return candidate
+    return "section"
+
+
+def with_component_references(build_context, task_name: str = "developer"):
+    """
+    Wraps a DAG 'build_context(node, outputs)' so 'task_name' also gets reference sections.
+
+    Args:
+        build_context: The context builder to extend; None means 'pipeline.concatenate_outputs'.
+        task_name (str): The node that receives the references.
+    Returns:
+        A callable with the same signature, for 'run_task_dag(..., build_context=...)'.
+    """
+    build_context = build_context or concatenate_outputs
+
+    def build(node, outputs):
+        context = build_context(node, outputs)
+        if node.name != task_name:
+            return context
+        design_tokens = extract_artifact("designer", outputs.get("designer", "")) or {}
+        brand_brief = extract_artifact("briefing", outputs.get("briefing", "")) or {}
+        try:
+            references = find_references(design_tokens, brand_brief)
+        except Exception:
+            return context  # The library is an optimization; never fail the build over it
+        if not references:
+            return context
+        blocks = "\n\n".join(
+            f"### {reference['section_type']} ({reference['id']})\n```html\n{reference['html']}\n```\n"
+            f"```css\n{reference['css']}\n```"
+            for reference in references
+        )
+        return (f"{context}\n\n## Reusable sections from earlier sites\n"
+                "Adapt these instead of writing the sections from scratch: replace the copy with the "
+                "section_copy above and the colors/fonts with the design_tokens.\n\n" + blocks)
+
+    return build
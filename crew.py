@@ -0,0 +1,380 @@
+"""
+Process-wide registry of the LLM client, tools and agents used by the website builder.
+
+Streamlit re-executes 'main.py' on every widget interaction. Building the agents
+(and the tools behind them) on every rerun costs seconds, so they are built once per
+server process and reused until the configuration changes.
+
+Registry entries are keyed by a fingerprint of:
+    - the LLM configuration (model, temperature),
+    - the raw contents of the '.env' file,
+    - a hash of every API key the tools depend on (the keys themselves are never stored),
+    - the LLM provider and completion-cache settings.
+When '.env' is edited the fingerprint changes, the environment is reloaded (keys deleted
+from '.env' are removed from the environment too) and the registry is rebuilt on the
+next call to 'get_registry()'.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+
+import sqlite_compat  # noqa: F401  (must run before crewai/chromadb are imported)
+from environment import ENV_FILE, load_environment
+
+# Central LLM settings. Changing these invalidates the registry.
+LLM_CONFIG = {"model": "gpt-4o", "temperature": 0.7}
+
+# Every environment variable that changes how a tool or the LLM client is constructed.
+API_KEY_NAMES = (
+    "OPENAI_API_KEY",
+    "COMPOSIO_API_KEY",
+    "EXA_API_KEY",
+    "FIRECRAWL_API_KEY",
+    "GITHUB_TOKEN",
+    "SERPER_API_KEY",
+    "YOUTUBE_API_KEY",
+)
+
+# Non-secret settings that change how the LLM client is built (see llm_cache.py).
+SETTING_NAMES = (
+    "LLM_PROVIDER",
+    "LLM_CACHE_MODE",
+    "LLM_CACHE_PATH",
+    "LLM_CACHE_SEMANTIC",
+    "LLM_CACHE_SIMILARITY",
+)
+
+
+@dataclass
+class AgentRegistry:
+    """Everything a crew run needs, built once per configuration fingerprint."""
+    fingerprint: str
+    llm: object
+    tools: object  # The (re)loaded 'tools' module
+    agents: dict = field(default_factory=dict)
+    completion_cache: object = None  # llm_cache.CompletionCache, or None when disabled
+
+
+_registry_lock = threading.Lock()
+_registries = {}
+_env_file_digest = None
+
+
+def _file_digest(path: str) -> str:
+    """Returns the sha256 of a file's contents, or an empty string if it doesn't exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def _refresh_environment(env_file: str = ENV_FILE) -> str:
+    """
+    Reloads '.env' into os.environ if it changed since the last call.
+
+    Keys that were loaded from '.env' and have since been deleted from it are removed
+    from os.environ, so a removed API key doesn't keep being used. Variables set in the
+    real environment are left alone (see environment.py).
+
+    Returns:
+        str: The digest of the current '.env' contents.
+    """
+    global _env_file_digest
+    digest = _file_digest(env_file)
+    if digest != _env_file_digest:
+        load_environment(env_file)
+        _env_file_digest = digest
+    return digest
+
+
+def config_fingerprint(env_file: str = ENV_FILE, llm_config: dict = None) -> str:
+    """
+    Computes the cache key for the registry.
+
+    Args:
+        env_file (str): Path to the '.env' file to watch.
+        llm_config (dict): LLM settings; defaults to LLM_CONFIG.
+    Returns:
+        str: A short hex fingerprint. API keys only contribute their hash.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(llm_config or LLM_CONFIG, sort_keys=True).encode())
+    hasher.update(_refresh_environment(env_file).encode())
+    for name in API_KEY_NAMES:
+        value = os.getenv(name, "")
+        hasher.update(name.encode())
+        hasher.update(hashlib.sha256(value.encode()).digest())
+    for name in SETTING_NAMES:
+        hasher.update(f"{name}={os.getenv(name, '')}".encode())
+    return hasher.hexdigest()[:16]
+
+
+def _load_tools_module(reload: bool):
+    """Imports 'tools', reloading it when the environment changed since the last build."""
+    if reload and "tools" in sys.modules:
+        return importlib.reload(sys.modules["tools"])
+    return importlib.import_module("tools")
+
+
+def _build_registry(fingerprint: str, reload_tools: bool = False) -> AgentRegistry:
+    from crewai import Agent
+    from llm_cache import build_completion_cache, build_llm
+    from instrumentation import InstrumentationCallbackHandler, StreamingCallbackHandler
+    from progress import step_callback
+
+    tools = _load_tools_module(reload_tools)
+
+    # --- Consolidated Tool Lists (Tailored for each agent) ---
+    # Instead of giving all agents all tools, provide only what they need.
+    # This reduces the LLM's 'cognitive load' and potential for misusing tools.
+
+    # General Web Search & File Reading tools for initial research
+    briefing_agent_tools = [
+        tools.serper_dev_tool,
+        tools.exa_search_tool,
+        tools.file_read_tool,
+        tools.firecrawl_search_tool,
+        tools.firecrawl_crawl_website_tool,
+        tools.firecrawl_scrape_website_tool, # Use this if you need full page content
+        tools.website_search_tool,
+        tools.csv_search_tool, # If it might read uploaded CSVs
+        tools.txt_search_tool, # If it might read uploaded TXTs
+        tools.pdf_search_tool, # If it might read uploaded PDFs
+    ]
+    # Add scrape_element_from_website_tool ONLY if this agent is expected to extract specific CSS elements
+    # briefing_agent_tools.append(tools.scrape_element_from_website_tool)
+
+    # Designer and Copywriter might need general web search for inspiration/context
+    designer_copywriter_tools = [
+        tools.serper_dev_tool,
+        tools.exa_search_tool,
+        tools.file_read_tool,
+        tools.scrape_website_tool, # For general website content to inform design/copy
+        tools.csv_search_tool, # If they might refer to design.csv
+        tools.txt_search_tool,
+        tools.json_search_tool,
+    ]
+
+    # Developer needs code interpretation, file read/write, and potentially Github search
+    developer_agent_tools = [
+        tools.code_interpreter_tool,
+        tools.file_read_tool,
+        # Assuming 'Write File Tool' is implied/handled by CrewAI's Task output,
+        # but if there's an explicit WriteFileTool, add it here.
+        # If the custom zip functions are needed for developer output:
+        tools.create_zip_archive_tool_function,
+        tools.extract_zip_archive_tool_function,
+        tools.github_search_tool,
+    ]
+
+    # Analyst needs specific tools for data querying.
+    # This is where the main "correction" for the database issue goes.
+    analyst_agent_tools = [
+        tools.feedback_query_tool, # Answers from the pre-aggregated tables in the feedback store
+        tools.code_interpreter_tool, # Can be used to run Python code for data analysis/DB interaction
+        tools.csv_search_tool,
+        tools.json_search_tool,
+        tools.file_read_tool,
+        # Do NOT include code_docs_search_tool here if it's for local documentation.
+        # It caused errors trying to resolve external URLs for database queries.
+    ]
+
+    # Ensure OPENAI_API_KEY is set in your environment (or LLM_PROVIDER=fake for offline runs).
+    # Completions are served from the completion cache when the same prompt was seen before.
+    # Tokens and tool calls are streamed to whichever build is running on the calling thread.
+    completion_cache = build_completion_cache()
+    # Latency, tokens, cost and cache hits of every completion are recorded on the running build's trace.
+    llm = build_llm(
+        LLM_CONFIG,
+        completion_cache,
+        callbacks=[StreamingCallbackHandler(), InstrumentationCallbackHandler(LLM_CONFIG["model"])],
+    ) # Recommended: Use a more capable model like gpt-4o for complex tasks
+
+    # === AGENTS ===
+    briefing_agent = Agent(
+        role="Creative Strategist",
+        goal="Understand product intent and search for relevant competitors and market trends using web search. Summarize findings into a comprehensive brand brief.",
+        backstory="An expert in market analysis and brand positioning, adept at synthesizing information for strategic insights.",
+        tools=briefing_agent_tools, # Assign specific tools
+        llm=llm,
+        step_callback=step_callback, # Streams each thought/tool step to the UI (see progress.py)
+        verbose=True,
+        allow_delegation=True # Allow delegation for complex research tasks
+    )
+
+    designer_agent = Agent(
+        role="Web Designer",
+        goal="Define the website's structure, layout, and visual design tokens (colors, typography, spacing). Incorporate best UX practices and refer to design resources.",
+        backstory="A seasoned UX/UI designer who excels at translating abstract ideas into intuitive and aesthetically pleasing web interfaces.",
+        tools=designer_copywriter_tools, # Assign specific tools
+        llm=llm,
+        step_callback=step_callback, # Streams each thought/tool step to the UI (see progress.py)
+        verbose=True,
+        allow_delegation=True
+    )
+
+    copywriter_agent = Agent(
+        role="Content Marketer",
+        goal="Write compelling and contextual copy for each website section, including hero title, subtext, CTA, and footer. Ensure SEO optimization and a clear brand voice.",
+        backstory="A master storyteller and wordsmith, capable of crafting engaging content that resonates with target audiences and drives action.",
+        tools=designer_copywriter_tools, # Assign specific tools
+        llm=llm,
+        step_callback=step_callback, # Streams each thought/tool step to the UI (see progress.py)
+        verbose=True,
+        allow_delegation=True
+    )
+
+    developer_agent = Agent(
+        role="Frontend Coder",
+        goal="Translate the design and content into clean, responsive, and functional HTML/CSS code for a full homepage. **The final output must be saved as a complete, well-formed HTML document to the 'index.html' path given in the task (by default 'autosite/index.html') using the appropriate file writing tool.**",
+        backstory="A meticulous and efficient frontend developer who transforms visual designs and content into high-quality, production-ready web code.",
+        tools=developer_agent_tools, # Assign specific tools
+        llm=llm,
+        step_callback=step_callback, # Streams each thought/tool step to the UI (see progress.py)
+        verbose=True,
+        allow_delegation=True
+    )
+
+    analyst_agent = Agent(
+        role="Database Analyst", # Changed role for clarity
+        goal="Retrieve and summarize the most common feature requests and complaints from the 'user_feedback' database table to provide data-driven insights for design and copy improvements.",
+        backstory="A data-first decision maker with expertise in querying and interpreting structured database information.",
+        tools=analyst_agent_tools, # Assign specific tools (includes the feedback query tool)
+        llm=llm,
+        step_callback=step_callback, # Streams each thought/tool step to the UI (see progress.py)
+        verbose=True,
+        allow_delegation=True
+    )
+
+    return AgentRegistry(
+        fingerprint=fingerprint,
+        llm=llm,
+        tools=tools,
+        completion_cache=completion_cache,
+        agents={
+            "briefing": briefing_agent,
+            "designer": designer_agent,
+            "copywriter": copywriter_agent,
+            "developer": developer_agent,
+            "analyst": analyst_agent,
+        },
+    )
+
+
+def get_registry(env_file: str = ENV_FILE) -> AgentRegistry:
+    """
+    Returns the registry for the current configuration, building it on first use.
+
+    Cheap on a cache hit (one small file read and a few hashes), so it is safe
+    to call at the top of every Streamlit rerun.
+
+    Args:
+        env_file (str): Path to the '.env' file whose changes invalidate the registry.
+    Returns:
+        AgentRegistry: The shared LLM client, tools module and agents.
+    """
+    fingerprint = config_fingerprint(env_file)
+    with _registry_lock:
+        registry = _registries.get(fingerprint)
+        if registry is None:
+            # Only the current configuration is kept alive; stale agents are dropped
+            # and the tools are rebuilt against the new environment.
+            stale = bool(_registries)
+            _registries.clear()
+            registry = _registries[fingerprint] = _build_registry(fingerprint, reload_tools=stale)
+        return registry
+
+
+def new_registry(env_file: str = ENV_FILE) -> AgentRegistry:
+    """
+    Builds a private registry for the current configuration, bypassing the shared one.
+
+    crewai agents keep per-run state (tools handler, executor, messages), so builds that
+    run at the same time in one process must not share agents. The tools module is
+    process-wide either way; the LLM client and its completion cache are built anew for
+    each registry (the cache's entries are shared through its database file).
+
+    Args:
+        env_file (str): Path to the '.env' file the configuration is read from.
+    Returns:
+        AgentRegistry: A registry no other caller holds.
+    """
+    fingerprint = config_fingerprint(env_file)
+    with _registry_lock:
+        # Serialized with get_registry(), which may reload the tools module.
+        return _build_registry(fingerprint)
+
+
+def build_task_graph(prompt: str, registry: AgentRegistry, site_dir: str = "autosite") -> list:
+    """
+    Declares the website-build tasks as a dependency graph.
+
+        briefing ──┬── designer ───┐
+                   └── copywriter ─┼── developer
+        analyst ───────────────────┘
+
+    The designer and copywriter only need the brand brief, and the analyst needs nothing
+    but the feedback table, so those branches run concurrently. The developer waits for
+    all of them, including the analyst's insights.
+
+    Args:
+        prompt (str): The user's website idea.
+        registry (AgentRegistry): Registry providing the agents.
+        site_dir (str): Directory the developer must save 'index.html' into. Concurrent
+                        builds each get their own directory.
+    Returns:
+        list: TaskNodes for 'pipeline.run_task_dag()'.
+    """
+    from crewai import Task
+    from compaction import json_output_instructions
+    from pipeline import TaskNode
+
+    agents = registry.agents
+    site_dir = site_dir.rstrip("/")
+    return [
+        TaskNode("briefing", Task(
+            description=f"Analyze the prompt: '{prompt}'. Use web search tools to find and summarize related products, competitors, and current market trends. Deliver a concise brand brief.",
+            expected_output="A brief outlining brand goals, key competitors, and relevant user/market insights."
+                            + json_output_instructions("briefing"),
+            agent=agents["briefing"],
+        )),
+        TaskNode("designer", Task(
+            description="Based on the brand brief, define the website's structure (e.g., header, hero, features, CTA, footer), a clear layout, and a consistent visual design token system (color palette, typography, spacing). Reference uploaded design files if available (e.g., 'design.csv').",
+            expected_output="A text-based wireframe layout description and a list of design tokens."
+                            + json_output_instructions("designer"),
+            agent=agents["designer"],
+        ), depends_on=("briefing",)),
+        TaskNode("copywriter", Task(
+            description="Based on the brand brief, draft persuasive and SEO-friendly content for each section of the website. Include a catchy hero title, compelling subtext, a clear call-to-action (CTA), and a functional footer. Ensure the tone aligns with the brand brief and target audience.",
+            expected_output="Complete and contextual copywriting for the entire homepage."
+                            + json_output_instructions("copywriter"),
+            agent=agents["copywriter"],
+        ), depends_on=("briefing",)),
+        TaskNode("analyst", Task(
+            description=(
+                "Access the 'user_feedback' database table and retrieve the most common feature requests and complaints. "
+                "Use the feedback query tool: ask for 'top_requests', 'top_complaints' and 'category_breakdown' first, "
+                "and only write a custom SELECT if those don't answer a question. "
+                "Summarize these findings into actionable insights for improving the website's design and copy. "
+                "If the tool reports that no feedback has been recorded, say so instead of inventing findings."
+            ),
+            expected_output="A summary of data-driven insights from user feedback, including common requests/complaints, presented clearly for design/copy improvement."
+                            + json_output_instructions("analyst"),
+            agent=agents["analyst"],
+        )),
+        TaskNode("developer", Task(
+            description=(
+                "Using the design tokens, section copy and feedback insights (JSON) from previous agents, write clean, semantic, and responsive HTML and CSS code for the entire homepage. "
+                "Apply the user-feedback insights from the analyst where they affect layout or copy. "
+                f"**Crucially, after generating the complete HTML and CSS, save it as a single, well-formed HTML document named 'index.html' inside the '{site_dir}/' directory. "
+                "You must use the available file writing tool to perform this save operation.**"
+            ),
+            expected_output=f"A complete and syntactically correct HTML/CSS file saved as '{site_dir}/index.html'.",
+            agent=agents["developer"],
+        ), depends_on=("designer", "copywriter", "analyst"), checkpoint=False),  # Its result is the written file
+    ]
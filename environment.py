@@ -0,0 +1,46 @@
+"""
+Loading of '.env' into the process environment, shared by every entry point.
+
+The real environment always wins over '.env' (load_dotenv's default), and crew.py reloads
+'.env' when it is edited, removing keys that were deleted from it. That needs to know
+which variables came from '.env' rather than from the real environment, which
+'load_dotenv()' doesn't record, and by the time crew.py runs the server or worker has
+long since loaded '.env'. So every entry point loads it through 'load_environment()',
+which records the names it set in DOTENV_LOADED_KEYS. Spawned job workers inherit that
+variable along with the values, so they don't mistake the inherited '.env' values for
+real ones either.
+"""
+import os
+
+from dotenv import dotenv_values
+
+ENV_FILE = ".env"
+LOADED_KEYS_VARIABLE = "DOTENV_LOADED_KEYS"
+
+
+def env_file_keys() -> set:
+    """Names of the variables in os.environ whose value was loaded from '.env'."""
+    return {name for name in os.environ.get(LOADED_KEYS_VARIABLE, "").split(",") if name}
+
+
+def load_environment(env_file: str = ENV_FILE) -> dict:
+    """
+    Applies '.env' to os.environ; safe to call again after the file changed.
+
+    Keys loaded from '.env' take its current value, keys deleted from it are removed,
+    and variables set in the real environment are never touched.
+
+    Returns:
+        dict: The values currently in '.env'.
+    """
+    values = {name: value for name, value in dotenv_values(env_file).items() if value is not None}
+    loaded = env_file_keys()
+    for name in loaded - values.keys():
+        os.environ.pop(name, None)
+    loaded &= values.keys()
+    for name, value in values.items():
+        if name in loaded or name not in os.environ:
+            os.environ[name] = value
+            loaded.add(name)
+    os.environ[LOADED_KEYS_VARIABLE] = ",".join(sorted(loaded))
+    return values
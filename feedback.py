@@ -0,0 +1,344 @@
+"""
+User-feedback store for the analyst agent.
+
+The analyst task asks for the most common feature requests and complaints in
+'user_feedback', but no database was wired up, so the agent fell back to the code
+interpreter or guessed. This module provides a SQLAlchemy-backed store (SQLite in 'db/' by
+default, any SQLAlchemy URL via DATABASE_URL) with:
+
+    user_feedback             raw rows (indexed by kind, category, created_at)
+    feedback_category_counts  (kind, category) -> count
+    feedback_topic_counts     (kind, category, topic) -> count, last_seen
+
+The aggregate tables are maintained incrementally: 'add_feedback()' inserts a batch of
+raw rows and upserts the batch's per-group counts in the same transaction, so they never
+drift from the raw table and queries never need a GROUP BY over the raw rows. SQLite and
+PostgreSQL use INSERT ... ON CONFLICT; other databases update each group and insert the
+groups that had no row yet.
+
+'FeedbackQueryTool' (in tools.py) gives the analyst read-only access: canned questions (top requests,
+top complaints, counts per category) are answered from the aggregates in milliseconds,
+and ad-hoc SELECTs run in a read-only transaction (a read-only connection on SQLite) that
+is always rolled back, with a row limit. On databases without read-only transactions
+(anything but SQLite, PostgreSQL and MySQL/MariaDB) ad-hoc SQL is refused.
+
+'python -m feedback generate --rows 1000000' fills the store with a synthetic, skewed
+dataset for benchmarks (see benchmarks/bench_feedback.py).
+"""
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, String, Table, Text, and_, case, create_engine,
+                        event, func, select, text)
+
+DEFAULT_DATABASE_URL = "sqlite:///db/feedback.sqlite3"
+KINDS = ("request", "complaint", "praise")
+QUERY_ROW_LIMIT = 200
+READ_ONLY_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+
+metadata = MetaData()
+
+user_feedback = Table(
+    "user_feedback", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", Float, nullable=False),
+    Column("kind", String(16), nullable=False),
+    Column("category", String(64), nullable=False),
+    Column("topic", String(200), nullable=False),
+    Column("text", Text, nullable=False),
+    Column("rating", Integer),
+    Index("idx_feedback_kind_category", "kind", "category"),
+    Index("idx_feedback_created", "created_at"),
+)
+
+category_counts = Table(
+    "feedback_category_counts", metadata,
+    Column("kind", String(16), primary_key=True),
+    Column("category", String(64), primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+topic_counts = Table(
+    "feedback_topic_counts", metadata,
+    Column("kind", String(16), primary_key=True),
+    Column("category", String(64), primary_key=True),
+    Column("topic", String(200), primary_key=True),
+    Column("count", Integer, nullable=False),
+    Column("last_seen", Float, nullable=False),
+    Index("idx_topic_counts_kind_count", "kind", "count"),
+)
+
+
+def _sqlite_pragmas(dbapi_connection, _record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _upsert(connection, table, rows: list, key_columns: tuple, add_columns: tuple, max_columns: tuple = ()):
+    """INSERT ... ON CONFLICT DO UPDATE adding 'add_columns' and keeping the max of 'max_columns'."""
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        _update_then_insert(connection, table, rows, key_columns, add_columns, max_columns)
+        return
+    statement = insert(table)
+    updates = {name: table.c[name] + statement.excluded[name] for name in add_columns}
+    updates.update({name: func.max(table.c[name], statement.excluded[name]) if dialect == "sqlite"
+                    else func.greatest(table.c[name], statement.excluded[name]) for name in max_columns})
+    connection.execute(statement.on_conflict_do_update(index_elements=list(key_columns), set_=updates), rows)
+
+
+def _update_then_insert(connection, table, rows: list, key_columns: tuple, add_columns: tuple, max_columns: tuple = ()):
+    """
+    Portable '_upsert()': updates each row's group in place and inserts the groups that don't exist yet.
+
+    The increments are applied by the database ('count = count + n'), so concurrent batches
+    updating the same group don't lose counts. Two batches creating the same new group at
+    the same moment make one transaction fail on the primary key, like any other conflict.
+    """
+    for row in rows:
+        values = {name: table.c[name] + row[name] for name in add_columns}
+        values.update({name: case((table.c[name] < row[name], row[name]), else_=table.c[name]) for name in max_columns})
+        condition = and_(*(table.c[name] == row[name] for name in key_columns))
+        if connection.execute(table.update().where(condition).values(values)).rowcount == 0:
+            connection.execute(table.insert(), [row])
+
+
+class FeedbackStore:
+    """Raw feedback plus incrementally maintained aggregates."""
+
+    def __init__(self, url: str = None):
+        self.url = url or os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+        if self.url.startswith("sqlite:///"):
+            directory = os.path.dirname(self.url[len("sqlite:///"):])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.engine = create_engine(self.url)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _sqlite_pragmas)
+        metadata.create_all(self.engine)
+        self._read_only_engine = None
+
+    def add_feedback(self, rows: list) -> int:
+        """
+        Inserts raw feedback rows and updates the aggregates in one transaction.
+
+        Args:
+            rows (list): Dicts with 'kind', 'category', 'topic', 'text' and optionally
+                         'rating' and 'created_at'.
+        Returns:
+            int: Number of rows inserted.
+        """
+        now = time.time()
+        prepared, by_category, by_topic, last_seen = [], Counter(), Counter(), {}
+        for row in rows:
+            if row["kind"] not in KINDS:
+                raise ValueError(f"Unknown feedback kind '{row['kind']}' (expected one of {', '.join(KINDS)}).")
+            row = dict(row, created_at=row.get("created_at") or now, rating=row.get("rating"))
+            prepared.append(row)
+            by_category[(row["kind"], row["category"])] += 1
+            topic_key = (row["kind"], row["category"], row["topic"])
+            by_topic[topic_key] += 1
+            last_seen[topic_key] = max(last_seen.get(topic_key, 0.0), row["created_at"])
+        if not prepared:
+            return 0
+        with self.engine.begin() as connection:
+            connection.execute(user_feedback.insert(), prepared)
+            _upsert(connection, category_counts,
+                    [{"kind": kind, "category": category, "count": count} for (kind, category), count in by_category.items()],
+                    ("kind", "category"), ("count",))
+            _upsert(connection, topic_counts,
+                    [{"kind": kind, "category": category, "topic": topic, "count": count, "last_seen": last_seen[(kind, category, topic)]}
+                     for (kind, category, topic), count in by_topic.items()],
+                    ("kind", "category", "topic"), ("count",), ("last_seen",))
+        return len(prepared)
+
+    def rebuild_aggregates(self):
+        """Recomputes both aggregate tables from the raw rows (after bulk imports or manual edits)."""
+        with self.engine.begin() as connection:
+            connection.execute(category_counts.delete())
+            connection.execute(topic_counts.delete())
+            connection.execute(category_counts.insert().from_select(
+                ["kind", "category", "count"],
+                select(user_feedback.c.kind, user_feedback.c.category, func.count())
+                .group_by(user_feedback.c.kind, user_feedback.c.category),
+            ))
+            connection.execute(topic_counts.insert().from_select(
+                ["kind", "category", "topic", "count", "last_seen"],
+                select(user_feedback.c.kind, user_feedback.c.category, user_feedback.c.topic, func.count(),
+                       func.max(user_feedback.c.created_at))
+                .group_by(user_feedback.c.kind, user_feedback.c.category, user_feedback.c.topic),
+            ))
+
+    def top_topics(self, kind: str, category: str = None, limit: int = 10) -> list:
+        """Most frequent topics of one kind (e.g. 'request'), optionally within one category."""
+        query = (select(topic_counts.c.category, topic_counts.c.topic, topic_counts.c.count)
+                 .where(topic_counts.c.kind == kind).order_by(topic_counts.c.count.desc()).limit(limit))
+        if category:
+            query = query.where(topic_counts.c.category == category)
+        with self.engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.execute(query)]
+
+    def category_breakdown(self, kind: str = None) -> list:
+        """Feedback counts per (kind, category), largest first."""
+        query = select(category_counts).order_by(category_counts.c.count.desc())
+        if kind:
+            query = query.where(category_counts.c.kind == kind)
+        with self.engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.execute(query)]
+
+    def read_only_query(self, sql: str, limit: int = QUERY_ROW_LIMIT) -> list:
+        """
+        Runs one SELECT in a read-only transaction and returns at most 'limit' rows.
+
+        The statement check only catches obvious mistakes; the database enforces read-only
+        access (e.g. for 'WITH ... DELETE' or functions with side effects), and the
+        transaction is rolled back either way.
+
+        Raises:
+            ValueError: If the statement isn't a single SELECT (or WITH ... SELECT), or the
+                        database has no read-only mode (see READ_ONLY_DIALECTS).
+        """
+        dialect = self.engine.dialect.name
+        if dialect not in READ_ONLY_DIALECTS:
+            raise ValueError(f"Ad-hoc SQL isn't available on '{dialect}' (no read-only transactions).")
+        statement = sql.strip().rstrip(";")
+        if ";" in statement or not re.match(r"(?is)^\s*(select|with)\b", statement):
+            raise ValueError("Only a single SELECT statement is allowed.")
+        with self._read_only().connect() as connection:
+            # Both make the transaction the query runs in read-only.
+            if dialect == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = ON")
+            else:
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            try:
+                result = connection.execute(text(statement))
+                columns = list(result.keys())
+                return [dict(zip(columns, row)) for row in result.fetchmany(limit)]
+            finally:
+                connection.rollback()
+                if dialect == "sqlite":
+                    # The pragma outlives the transaction; an in-memory database shares this connection with writers.
+                    connection.exec_driver_sql("PRAGMA query_only = OFF")
+
+    def _read_only(self):
+        if self._read_only_engine is None:
+            if self.engine.dialect.name == "sqlite" and self.url.startswith("sqlite:///"):
+                path = os.path.abspath(self.url[len("sqlite:///"):])
+                self._read_only_engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+            else:
+                self._read_only_engine = self.engine
+        return self._read_only_engine
+
+    def data_version(self) -> str:
+        """Changes whenever feedback is added; read from the aggregates, so it costs one small query."""
+        with self.engine.connect() as connection:
+            total, latest = connection.execute(
+                select(func.coalesce(func.sum(topic_counts.c.count), 0), func.max(topic_counts.c.last_seen))
+            ).one()
+        return f"feedback:{total}:{latest or 0}"
+
+    def count(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.coalesce(func.sum(category_counts.c.count), 0))).scalar()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feedback_store() -> FeedbackStore:
+    """Returns the process-wide store configured by DATABASE_URL."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeedbackStore()
+        return _store
+
+
+# --- Synthetic data ---
+
+TOPICS = {
+    ("request", "features"): ["dark mode", "offline mode", "export to CSV", "calendar sync", "multi-user accounts",
+                              "custom workouts", "API access", "voice control"],
+    ("request", "pricing"): ["annual plan discount", "free tier", "student pricing", "family plan"],
+    ("request", "mobile"): ["Android app", "tablet layout", "home-screen widget", "Apple Watch support"],
+    ("complaint", "performance"): ["slow page load", "app crashes on start", "laggy video", "sync takes minutes"],
+    ("complaint", "pricing"): ["too expensive", "hidden fees", "confusing plans", "hard to cancel"],
+    ("complaint", "usability"): ["navigation is confusing", "text too small", "checkout is long", "no search"],
+    ("complaint", "support"): ["slow support replies", "no live chat", "unhelpful FAQ"],
+    ("praise", "design"): ["beautiful design", "clean layout", "great onboarding"],
+    ("praise", "features"): ["accurate tracking", "great coaching", "useful reminders"],
+}
+
+
+def generate_feedback(rows: int, seed: int = 42, days: int = 365):
+    """Yields synthetic feedback rows with a Zipf-like skew over groups and topics."""
+    rng = random.Random(seed)
+    groups = list(TOPICS)
+    group_weights = [1 / (rank + 1) for rank in range(len(groups))]
+    now = time.time()
+    for _ in range(rows):
+        kind, category = rng.choices(groups, weights=group_weights)[0]
+        topics = TOPICS[(kind, category)]
+        topic = rng.choices(topics, weights=[1 / (rank + 1) for rank in range(len(topics))])[0]
+        yield {
+            "created_at": now - rng.random() * days * 86400,
+            "kind": kind,
+            "category": category,
+            "topic": topic,
+            "text": f"{topic.capitalize()} — {rng.choice(['please', 'really', 'honestly', 'asap', ''])}".strip(" —"),
+            "rating": rng.randint(1, 2) if kind == "complaint" else rng.randint(3, 5),
+        }
+
+
+def load_generated(store: FeedbackStore, rows: int, batch_size: int = 10_000, seed: int = 42) -> float:
+    """Inserts 'rows' generated rows in batches; returns the elapsed seconds."""
+    started = time.perf_counter()
+    batch = []
+    for row in generate_feedback(rows, seed=seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            store.add_feedback(batch)
+            batch = []
+    store.add_feedback(batch)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the user-feedback store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Insert synthetic feedback rows.")
+    generate.add_argument("--rows", type=int, default=1_000_000)
+    generate.add_argument("--seed", type=int, default=42)
+    commands.add_parser("rebuild", help="Recompute the aggregate tables from the raw rows.")
+    commands.add_parser("top", help="Print the top requests and complaints.")
+    args = parser.parse_args()
+
+    store = FeedbackStore()
+    if args.command == "generate":
+        seconds = load_generated(store, args.rows, seed=args.seed)
+        print(f"Inserted {args.rows} rows in {seconds:.1f}s ({store.count()} rows in {store.url}).")
+    elif args.command == "rebuild":
+        store.rebuild_aggregates()
+        print(f"Rebuilt aggregates over {store.count()} rows.")
+    else:
+        for kind in ("request", "complaint"):
+            print(f"Top {kind}s:")
+            for row in store.top_topics(kind, limit=5):
+                print(f"  {row['count']:>8}  {row['category']}: {row['topic']}")
+
+
+if __name__ == "__main__":
+    main()
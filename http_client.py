@@ -0,0 +1,283 @@
+"""
+Shared HTTP client for every web-facing tool.
+
+The crewai tools (Serper, EXA, Firecrawl, ScrapeWebsiteTool, ScrapeElementFromWebsiteTool,
+WebsiteSearchTool's loaders) and the SDKs behind them call 'requests.get/post(...)', which
+opens a fresh session, and therefore a fresh TCP + TLS connection, for every request, or
+send through a session of their own (the scrape tools use crewai_tools' SSRF-checked
+'safe_get()'). None of them coordinate when an API starts answering 429.
+
+'install()' routes both through one HttpClient:
+
+    - one pooled, keep-alive 'requests.Session' shared by all tools and builds;
+    - at most HTTP_MAX_PER_HOST requests in flight per host;
+    - the per-API token buckets from rate_limits.py for the metered API hosts;
+    - retries with full-jitter exponential backoff on connection errors, 429 and 5xx
+      (honouring 'Retry-After'), for idempotent methods and the lookup POSTs of
+      COALESCE_POST_HOSTS only; any other POST/PATCH is sent once, since repeating it
+      could repeat a side effect (e.g. start a second crawl job);
+    - coalescing: identical concurrent requests (same method, URL, params, body and
+      headers) share one network round-trip; every caller gets its own Response copy.
+
+Module-level calls are sent on the client's own session. A request made on another
+session ('requests.Session.request' is hooked) still goes out through that session, so its
+adapters, auth, cookies, proxies and redirect settings (e.g. the scrape tools' IP pinning)
+are kept, but it is limited, retried, coalesced and counted like any other.
+
+Bytes and retries are reported to the running build's trace (see instrumentation.py).
+Libraries with their own HTTP stack (the YouTube tools use googleapiclient/httplib2)
+are not affected.
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import annotate
+from rate_limits import acquire
+
+# Metered API hosts and the rate limit (see rate_limits.py) their requests count against.
+# (The OpenAI client uses httpx; the chat model applies the "openai" limit itself, see llm_cache.py.)
+HOST_APIS = {
+    "google.serper.dev": "serper",
+    "api.exa.ai": "exa",
+    "api.firecrawl.dev": "firecrawl",
+}
+# POST endpoints that are pure lookups; identical concurrent POSTs to them are coalesced too.
+COALESCE_POST_HOSTS = {"google.serper.dev", "api.exa.ai"}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = 30.0
+
+
+class HttpClient:
+    """
+    Thread-safe pooled HTTP client with per-host limits, retries and request coalescing.
+
+    Args:
+        max_per_host (int): Concurrent requests per host (also the connection pool size).
+        max_retries (int): Retries after the first attempt.
+        backoff_base (float): First backoff ceiling in seconds; doubles on every retry.
+        backoff_max (float): Upper bound of a single backoff.
+        timeout (float): Default timeout when the caller didn't pass one.
+        host_apis (dict): Host -> rate-limited API name.
+    """
+
+    def __init__(self, max_per_host: int = 8, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 20.0, timeout: float = DEFAULT_TIMEOUT, host_apis: dict = None):
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.host_apis = HOST_APIS if host_apis is None else host_apis
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max_per_host)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # The session is shared by unrelated tools and builds; don't carry cookies between them.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self._host_slots = {}
+        self._in_flight = {}  # coalescing key -> Future of the leader's response
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0}
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def _coalesce_key(self, method: str, url: str, host: str, kwargs: dict, session: requests.Session):
+        if kwargs.get("stream") or kwargs.get("files"):
+            return None
+        if method not in ("GET", "HEAD") and not (method == "POST" and host in COALESCE_POST_HOSTS):
+            return None
+        # Another session's own headers, auth and cookies change the request too.
+        session_state = None if session is self.session else [
+            type(session).__qualname__, sorted(session.headers.items()), repr(session.auth),
+            sorted(session.cookies.get_dict().items()),
+        ]
+        try:
+            payload = json.dumps(
+                [method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"),
+                 sorted((kwargs.get("headers") or {}).items()), kwargs.get("cookies"),
+                 kwargs.get("allow_redirects", True), session_state],
+                sort_keys=True, default=str,
+            )
+        except TypeError:
+            return None
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                try:
+                    return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0), self.backoff_max)
+                except (TypeError, ValueError):
+                    pass
+        # Full jitter: concurrent builds that hit a 429 together don't retry in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, method: str, url: str, host: str, kwargs: dict, session: requests.Session) -> requests.Response:
+        api = self.host_apis.get(host)
+        retryable = method in IDEMPOTENT_METHODS or (method == "POST" and host in COALESCE_POST_HOSTS)
+        max_retries = self.max_retries if retryable else 0
+        attempt = 0
+        while True:
+            acquire(api)
+            with self._slots(host):
+                try:
+                    response = _original_session_request(session, method, url, **kwargs)
+                    if not kwargs.get("stream"):
+                        response.content  # Read the body while holding the host slot
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= max_retries:
+                        raise
+                    response = None
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= max_retries):
+                return response
+            delay = self._backoff(attempt, response)
+            attempt += 1
+            with self._lock:
+                self.stats["retries"] += 1
+            annotate(retries=1)
+            time.sleep(delay)
+
+    def request(self, method: str, url: str, session: requests.Session = None, **kwargs) -> requests.Response:
+        """
+        Same signature and result as 'requests.request()'.
+
+        Args:
+            session (requests.Session): Session to send on; defaults to the client's pooled one.
+        """
+        method = method.upper() if isinstance(method, str) else method.decode().upper()
+        url = url if isinstance(url, str) else url.decode()
+        session = session or self.session
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        host = (urlsplit(url).hostname or "").lower()
+        key = self._coalesce_key(method, url, host, kwargs, session)
+
+        leader = True
+        if key is not None:
+            with self._lock:
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = self._in_flight[key] = Future()
+                else:
+                    leader = False
+                    self.stats["coalesced"] += 1
+            if not leader:
+                response = _copy_response(future.result())
+                annotate(bytes=len(response.content))  # Coalesced requests are never streamed
+                return response
+
+        with self._lock:
+            self.stats["requests"] += 1
+        try:
+            response = self._send(method, url, host, kwargs, session)
+        except BaseException as exc:
+            if key is not None:
+                self._finish(key, future, exception=exc)
+            raise
+        if key is not None:
+            self._finish(key, future, response=response)
+        if not kwargs.get("stream"):
+            annotate(bytes=len(response.content))
+        return response
+
+    def _finish(self, key, future: Future, response=None, exception=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(_copy_response(response))  # Untouched by whatever the leader does next
+
+    def close(self):
+        self.session.close()
+
+
+def _copy_response(response: requests.Response) -> requests.Response:
+    """A coalesced caller's own Response: the (already read) body is shared, mutable state isn't."""
+    duplicate = copy.copy(response)
+    duplicate.headers = response.headers.copy()
+    duplicate.cookies = response.cookies.copy()
+    duplicate.history = list(response.history)
+    return duplicate
+
+
+_client = None
+_client_lock = threading.Lock()
+_installed = None  # The client 'install()' routed requests through, if any
+_original_request = requests.api.request
+_original_session_request = requests.Session.request
+# Positional parameters of 'requests.Session.request()' after method and url.
+_SESSION_REQUEST_ARGS = ("params", "data", "headers", "cookies", "files", "auth", "timeout", "allow_redirects",
+                         "proxies", "hooks", "stream", "verify", "cert", "json")
+
+
+def _session_request(session, method, url, *args, **kwargs):
+    """Replacement for 'requests.Session.request' sending through the installed client."""
+    client = _installed
+    if client is None:
+        return _original_session_request(session, method, url, *args, **kwargs)
+    kwargs.update(zip(_SESSION_REQUEST_ARGS, args))
+    return client.request(method, url, session=session, **kwargs)
+
+
+def get_http_client() -> HttpClient:
+    """Returns the process-wide client, configured from HTTP_MAX_PER_HOST / HTTP_MAX_RETRIES / HTTP_TIMEOUT."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(
+                max_per_host=int(os.getenv("HTTP_MAX_PER_HOST", 8)),
+                max_retries=int(os.getenv("HTTP_MAX_RETRIES", 3)),
+                timeout=float(os.getenv("HTTP_TIMEOUT", DEFAULT_TIMEOUT)),
+            )
+        return _client
+
+
+def install(client: HttpClient = None) -> HttpClient:
+    """
+    Routes every 'requests' call through 'client' (the shared client by default).
+
+    'requests.get()' and friends look up 'requests.api.request' at call time, so replacing
+    it (and the 'requests.request' alias) sends the module-level API on the client's pooled
+    session. Requests made on any other session go through 'requests.Session.request',
+    which is hooked as well. Set HTTP_SHARED_CLIENT=0 to leave 'requests' untouched.
+    """
+    global _installed
+    client = client or get_http_client()
+    if os.getenv("HTTP_SHARED_CLIENT", "1") == "0":
+        return client
+    _installed = client
+    requests.api.request = client.request
+    requests.request = client.request
+    requests.Session.request = _session_request
+    return client
+
+
+def uninstall():
+    """Restores the original 'requests.request' and 'requests.Session.request'."""
+    global _installed
+    _installed = None
+    requests.api.request = _original_request
+    requests.request = _original_request
+    requests.Session.request = _original_session_request
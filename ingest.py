@@ -0,0 +1,230 @@
+"""
+Shared embedding index for uploaded files.
+
+The CSV/TXT/PDF/JSON search tools used to chunk and embed an uploaded file the first time
+each agent pointed one of them at it. Several agents query the same 'uploads/' files, so
+that work was repeated. Instead, files are ingested once (at upload time in 'main.py')
+into a single Chroma collection in 'db/', keyed by the sha256 of their contents:
+
+    - a file whose content hash is already in the collection is skipped,
+    - renaming or re-uploading the same bytes costs nothing,
+    - every search tool queries that one collection (optionally filtered to one file),
+    - a file without any text (e.g. an empty CSV) is recorded with a single marker
+      record (chunk -1, no file type), so it isn't extracted again on every upload and
+      never shows up in search results.
+
+Embeddings use Chroma's default local embedding function, so ingestion needs no API key.
+The search tool itself ('UploadSearchTool') lives in tools.py, so the web server can ingest
+uploads without importing crewai.
+
+The server and every job worker keep their own handle on the collections in 'db/', while
+maintenance.py may replace a collection with a rebuilt copy. Every use of the uploads and
+components collections therefore happens under 'chroma_lock()' (a shared file lock that
+the rebuild takes exclusively), and a rebuild bumps a generation number in 'db/' that makes
+every process open the collection again instead of using its stale handle.
+"""
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+UPLOADS_COLLECTION = "uploads"
+CHROMA_PATH = "db"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMPTY_MARKER_CHUNK = -1
+PAGE_SIZE = 5000
+LOCK_FILE = "chroma.lock"
+GENERATION_FILE = "chroma_generation"
+
+SUPPORTED_EXTENSIONS = (".csv", ".txt", ".md", ".json", ".pdf")
+
+_collection = None
+_collection_generation = None
+_collection_lock = threading.Lock()
+_ingest_lock = threading.Lock()
+
+
+@contextmanager
+def chroma_lock(exclusive: bool = False, path: str = None):
+    """
+    Cross-process lock on the Chroma store: shared for reading and writing collections,
+    exclusive while maintenance replaces one. Shared locks can be nested.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows: no coordination, rebuild only while the app is stopped
+        yield
+        return
+    path = path or CHROMA_PATH
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, LOCK_FILE), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield  # Released when the file is closed
+
+
+def collection_generation(path: str = None) -> int:
+    """Incremented every time maintenance replaces a collection (0 if it never did)."""
+    try:
+        with open(os.path.join(path or CHROMA_PATH, GENERATION_FILE)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_collection_generation(path: str = None) -> int:
+    """Tells every process that its collection handles are stale (call under the exclusive lock)."""
+    path = path or CHROMA_PATH
+    generation = collection_generation(path) + 1
+    temporary = os.path.join(path, GENERATION_FILE + ".tmp")
+    with open(temporary, "w") as f:
+        f.write(str(generation))
+    os.replace(temporary, os.path.join(path, GENERATION_FILE))
+    return generation
+
+
+def get_uploads_collection():
+    """Returns the shared Chroma collection holding all uploaded-file chunks (use it under 'chroma_lock()')."""
+    global _collection, _collection_generation
+    generation = collection_generation()
+    with _collection_lock:
+        if _collection is None or generation != _collection_generation:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=CHROMA_PATH)
+            _collection = client.get_or_create_collection(UPLOADS_COLLECTION, metadata={"hnsw:space": "cosine"})
+            _collection_generation = generation
+        return _collection
+
+
+def search_filter(file_types: tuple = SUPPORTED_EXTENSIONS, content_hash: str = None) -> dict:
+    """
+    Chroma 'where' filter for searching the uploads: one file's chunks if 'content_hash'
+    is given, otherwise every file of the given types. Neither ever matches the marker of
+    a file without text.
+    """
+    if content_hash:
+        return {"$and": [{"content_hash": content_hash}, {"chunk": {"$gte": 0}}]}
+    if len(file_types) == 1:
+        return {"file_type": file_types[0]}
+    return {"file_type": {"$in": list(file_types)}}
+
+
+def file_content_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    """Returns the sha256 of a file's contents, read in blocks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _chunk_text(text: str, prefix: str = "", size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list:
+    """Splits text into overlapping character windows, each starting with 'prefix'."""
+    text = text.strip()
+    if not text:
+        return []
+    step = max(size - overlap, 1)
+    return [prefix + text[start:start + size] for start in range(0, max(len(text) - overlap, 1), step)]
+
+
+def extract_chunks(path: str) -> list:
+    """
+    Reads a supported file and splits it into text chunks.
+
+    CSV chunks repeat the header row so each chunk is self-describing.
+
+    Raises:
+        ValueError: If the file type isn't supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".txt", ".md"):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return _chunk_text(f.read())
+    if extension == ".csv":
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            rows = list(csv.reader(f))
+        if not rows:
+            return []
+        header = ", ".join(rows[0]) + "\n"
+        body = "\n".join(", ".join(row) for row in rows[1:])
+        return _chunk_text(body, prefix=header) or [header]
+    if extension == ".json":
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return _chunk_text(json.dumps(json.load(f), indent=1, ensure_ascii=False))
+    if extension == ".pdf":
+        from pypdf import PdfReader
+
+        pages = PdfReader(path).pages
+        return _chunk_text("\n".join(page.extract_text() or "" for page in pages))
+    raise ValueError(f"Unsupported file type for indexing: '{extension}'.")
+
+
+def is_indexed(content_hash: str) -> bool:
+    with chroma_lock():
+        found = get_uploads_collection().get(where={"content_hash": content_hash}, limit=1)
+    return bool(found["ids"])
+
+
+def indexed_content_hashes() -> list:
+    """Sorted content hashes of every indexed file with content (what the search tools can currently see)."""
+    hashes, offset = set(), 0
+    with chroma_lock():
+        collection = get_uploads_collection()
+        while True:
+            found = collection.get(where={"chunk": 0}, include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+            hashes.update(metadata["content_hash"] for metadata in found["metadatas"])
+            if len(found["ids"]) < PAGE_SIZE:
+                return sorted(hashes)
+            offset += PAGE_SIZE
+
+
+def ingest_upload(path: str) -> dict:
+    """
+    Indexes a file into the shared uploads collection unless its contents are already there.
+
+    Args:
+        path (str): Path of the uploaded file.
+    Returns:
+        dict: {'content_hash', 'chunks', 'skipped'} describing what happened.
+    """
+    content_hash = file_content_hash(path)
+    with _ingest_lock, chroma_lock():
+        if is_indexed(content_hash):
+            return {"content_hash": content_hash, "chunks": 0, "skipped": True}
+        chunks = extract_chunks(path)
+        source, ingested_at = os.path.basename(path), time.time()
+        if chunks:
+            extension = os.path.splitext(path)[1].lower()
+            get_uploads_collection().add(
+                ids=[f"{content_hash}:{index}" for index in range(len(chunks))],
+                documents=chunks,
+                metadatas=[
+                    {"content_hash": content_hash, "source": source, "file_type": extension,
+                     "chunk": index, "ingested_at": ingested_at}
+                    for index in range(len(chunks))
+                ],
+            )
+        else:
+            # No 'file_type', so the search tools' type filters never match the marker.
+            get_uploads_collection().add(
+                ids=[f"{content_hash}:empty"],
+                documents=[f"(no text) {source}"],
+                metadatas=[{"content_hash": content_hash, "source": source, "chunk": EMPTY_MARKER_CHUNK,
+                            "ingested_at": ingested_at}],
+            )
+    return {"content_hash": content_hash, "chunks": len(chunks), "skipped": False}
+
+
+def ingest_directory(directory: str) -> list:
+    """Ingests every supported file below 'directory' (e.g. an extracted ZIP)."""
+    results = []
+    for root, _dirs, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.join(root, name)
+                results.append(dict(ingest_upload(path), path=path))
+    return results
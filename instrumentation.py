@@ -0,0 +1,267 @@
+"""
+Per-run instrumentation: where a website build spends its time, tokens and money.
+
+Every tool exported from 'tools.py' records its calls through 'record_tool_call()', and the
+agents' chat model reports each completion through 'InstrumentationCallbackHandler'. The
+records of one build are collected in a RunTrace:
+
+    {"run_id", "type": "task" | "tool" | "llm", "name", "task", "agent",
+     "start_ms", "wall_ms", "bytes", "tokens_in", "tokens_out", "cost_usd",
+     "cache_hit", "retries", "error"}
+
+Like progress.py, the trace is bound to the DAG worker thread through a context variable
+(see 'instrumented_execute()'), so the process-wide tools and LLM client attribute their
+records to the right build, task and agent.
+
+'StreamingCallbackHandler', the LangChain callback forwarding tokens to the build's progress
+bus (see progress.py), lives here too: progress.py is imported by the web server, which
+shouldn't have to load langchain.
+
+At the end of a build the trace is appended to 'traces/runs.jsonl' (one JSON record per
+line) and summarized per task/tool for the Streamlit page.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_cache import last_lookup_hit
+from pipeline import current_task_name
+from progress import emit
+
+TRACE_PATH = os.path.join("traces", "runs.jsonl")
+
+# USD per 1M tokens (input, output). Unknown models are recorded with a cost of 0.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_current_trace = contextvars.ContextVar("instrumentation_current_trace", default=None)
+_current_record = contextvars.ContextVar("instrumentation_current_record", default=None)
+_current_agent = contextvars.ContextVar("instrumentation_current_agent", default="")
+
+
+class RunTrace:
+    """Thread-safe collection of the records of one build."""
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def new_record(self, record_type: str, name: str, agent: str = "") -> dict:
+        return {
+            "run_id": self.run_id,
+            "type": record_type,
+            "name": name,
+            "task": current_task_name.get() or "",
+            "agent": agent,
+            "start_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "wall_ms": 0.0,
+            "bytes": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "cost_usd": 0.0,
+            "cache_hit": False,
+            "retries": 0,
+            "error": None,
+        }
+
+    def finish(self, record: dict):
+        record["wall_ms"] = round((time.perf_counter() - self.started) * 1000 - record["start_ms"], 1)
+        with self._lock:
+            self.records.append(record)
+
+    def write_jsonl(self, path: str = TRACE_PATH):
+        """Appends every record of this run to a JSONL trace file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+    def summary_rows(self) -> list:
+        """Aggregates the records per (task, type, name), slowest first."""
+        groups = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            key = (record["task"], record["type"], record["name"])
+            row = groups.setdefault(key, {
+                "task": record["task"], "agent": record["agent"], "type": record["type"], "name": record["name"],
+                "calls": 0, "wall_ms": 0.0, "bytes": 0, "tokens_in": 0, "tokens_out": 0,
+                "cost_usd": 0.0, "cache_hits": 0, "retries": 0, "errors": 0,
+            })
+            row["calls"] += 1
+            row["wall_ms"] = round(row["wall_ms"] + record["wall_ms"], 1)
+            row["bytes"] += record["bytes"]
+            row["tokens_in"] += record["tokens_in"]
+            row["tokens_out"] += record["tokens_out"]
+            row["cost_usd"] = round(row["cost_usd"] + record["cost_usd"], 5)
+            row["cache_hits"] += int(record["cache_hit"])
+            row["retries"] += record["retries"]
+            row["errors"] += int(record["error"] is not None)
+        return sorted(groups.values(), key=lambda row: row["wall_ms"], reverse=True)
+
+    def timeline(self) -> list:
+        """Records as '(lane, name, start, end)' rows for a flamegraph-style timeline chart."""
+        with self._lock:
+            return [
+                {
+                    "lane": record["task"] or "-",
+                    "name": f"{record['type']}: {record['name']}",
+                    "start_ms": record["start_ms"],
+                    "end_ms": record["start_ms"] + record["wall_ms"],
+                }
+                for record in self.records
+            ]
+
+
+@contextmanager
+def record_tool_call(name: str):
+    """
+    Records one tool call on the current build's trace (no-op outside a build).
+
+    Yields:
+        dict | None: The record, so the caller (or nested layers via 'annotate()') can fill in
+        bytes, cache hits and retries.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    record = trace.new_record("tool", name, agent=_current_agent.get())
+    token = _current_record.set(record)
+    try:
+        yield record
+    except BaseException as exc:
+        record["error"] = f"{type(exc).__name__}: {exc}"[:300]
+        raise
+    finally:
+        _current_record.reset(token)
+        trace.finish(record)
+
+
+def annotate(**increments):
+    """
+    Adds to the numeric fields (or sets the boolean fields) of the record in progress.
+
+    Used by lower layers such as the HTTP client, e.g. 'annotate(bytes=len(body), retries=1)'.
+    """
+    record = _current_record.get()
+    if record is None:
+        return
+    for field, value in increments.items():
+        if isinstance(value, bool):
+            record[field] = value
+        else:
+            record[field] = record.get(field, 0) + value
+
+
+def instrumented_execute(trace: RunTrace, execute):
+    """
+    Wraps a DAG 'execute(task, context)' callable so its tool and LLM calls land on 'trace'.
+
+    Returns:
+        A callable with the same signature, for 'run_task_dag(..., execute=...)'.
+    """
+    def run(task, context):
+        agent = getattr(getattr(task, "agent", None), "role", "") or ""
+        trace_token = _current_trace.set(trace)
+        agent_token = _current_agent.set(agent)
+        record = trace.new_record("task", current_task_name.get() or "task", agent=agent)
+        try:
+            return execute(task, context)
+        except BaseException as exc:
+            record["error"] = f"{type(exc).__name__}: {exc}"[:300]
+            raise
+        finally:
+            trace.finish(record)
+            _current_agent.reset(agent_token)
+            _current_trace.reset(trace_token)
+
+    return run
+
+
+def _token_usage(response) -> tuple:
+    """Extracts (prompt_tokens, completion_tokens) from an LLMResult."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    tokens_in, tokens_out = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    if not (tokens_in or tokens_out):
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                tokens_in += metadata.get("input_tokens", 0)
+                tokens_out += metadata.get("output_tokens", 0)
+    return tokens_in, tokens_out
+
+
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """LangChain callback recording latency, tokens, cost and cache hits of each completion."""
+
+    def __init__(self, model_name: str = ""):
+        self.model_name = model_name
+        self._pending = {}  # LangChain run_id -> (trace, record)
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        record = trace.new_record("llm", self.model_name or "llm", agent=_current_agent.get())
+        last_lookup_hit.set(False)  # Set again by CompletionCache.lookup if this call is served from cache
+        with self._lock:
+            self._pending[run_id] = (trace, record)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        trace, record = pending
+        record["cache_hit"] = last_lookup_hit.get()
+        if not record["cache_hit"]:
+            record["tokens_in"], record["tokens_out"] = _token_usage(response)
+            price_in, price_out = MODEL_PRICES.get(self.model_name, (0.0, 0.0))
+            record["cost_usd"] = round((record["tokens_in"] * price_in + record["tokens_out"] * price_out) / 1_000_000, 6)
+        trace.finish(record)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.get(run_id)
+        if pending is not None:
+            pending[1]["retries"] += 1
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        trace, record = pending
+        record["error"] = f"{type(error).__name__}: {error}"[:300]
+        trace.finish(record)
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback streaming LLM tokens and tool calls to the current build's bus."""
+    raise_error = True  # Let BuildCancelled propagate instead of being logged and ignored
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        emit("token", token)
+
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs):
+        emit("tool", f"{(serialized or {}).get('name', 'tool')}: {input_str[:300]}")
@@ -0,0 +1,451 @@
+"""
+Local job queue for website builds.
+
+Builds used to run inside the Streamlit button handler, so a browser refresh killed them
+and concurrent users competed for the script thread. Now the UI only submits a job and
+polls its status; a bounded pool of worker processes executes the builds.
+
+    - Jobs live in a SQLite table (db/jobs.sqlite3), so status, results and progress
+      events survive reruns, refreshes and server restarts.
+    - Submitting a prompt that is already queued or running returns the existing job
+      instead of starting a second identical build.
+    - Every job writes its artifacts to 'jobs/<job_id>/' (autosite/index.html + ZIP).
+    - Progress events are persisted in batches so the UI can stream them from any session,
+      and a cancel request is picked up by the worker within a second.
+    - A failed or cancelled job can be retried. The retry keeps the job id, which is the
+      build's checkpoint resume key, so the tasks that already succeeded aren't run again
+      (see checkpoints.py); a new job never reuses another job's task outputs.
+    - A worker that dies mid-build is restarted by the pool, and its job is requeued (and
+      resumes from its checkpoints, since the job id is its resume key).
+    - The events of finished jobs are deleted after JOB_EVENT_RETENTION seconds (default:
+      7 days) by the workers, so the table doesn't grow with every build ever run. The
+      job rows and their artifacts are kept.
+
+Workers start with the Streamlit server ('get_worker_pool()'), or can run on their own:
+    python -m jobs --workers 4
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from progress import BuildCancelled, ProgressBus, ProgressEvent
+
+JOB_DB_PATH = os.path.join("db", "jobs.sqlite3")
+JOB_ARTIFACT_DIR = "jobs"
+DEFAULT_WORKERS = 2
+POLL_INTERVAL = 0.5
+MONITOR_INTERVAL = 5.0
+DEFAULT_EVENT_RETENTION = 7 * 24 * 3600
+PRUNE_INTERVAL = 3600
+
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+_WHITESPACE = re.compile(r"\s+")
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Identifies identical prompts (ignoring surrounding and repeated whitespace)."""
+    return hashlib.sha256(_WHITESPACE.sub(" ", prompt.strip()).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite-backed job table. Safe to use from several processes: every call opens its own
+    connection, and state transitions run inside 'BEGIN IMMEDIATE' transactions.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    worker_pid INTEGER,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    artifact_dir TEXT,
+                    result TEXT,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created);
+                CREATE INDEX IF NOT EXISTS idx_jobs_prompt ON jobs (prompt_hash, status);
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    timestamp REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id);
+                """
+            )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def submit(self, prompt: str) -> tuple:
+        """
+        Queues a build unless an identical prompt is already queued or running.
+
+        Returns:
+            tuple: (job_id, deduplicated)
+        """
+        prompt_hash = prompt_fingerprint(prompt)
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE prompt_hash = ? AND status IN (?, ?) ORDER BY created LIMIT 1",
+                (prompt_hash, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                connection.execute("COMMIT")
+                return row["id"], True
+            job_id = uuid.uuid4().hex[:12]
+            connection.execute(
+                "INSERT INTO jobs (id, prompt, prompt_hash, status, created, artifact_dir) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, prompt, prompt_hash, time.time(), os.path.join(JOB_ARTIFACT_DIR, job_id)),
+            )
+            connection.execute("COMMIT")
+        return job_id, False
+
+    def get(self, job_id: str):
+        """Returns the job as a dict (with 'result' decoded), or None."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self):
+        """Atomically moves the oldest queued job to 'running' for this process, or returns None."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', started = ?, worker_pid = ? WHERE id = ?",
+                (time.time(), os.getpid(), row["id"]),
+            )
+            connection.execute("COMMIT")
+        return self.get(row["id"])
+
+    def finish(self, job_id: str, status: str, result: dict = None, error: str = None):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id),
+            )
+
+    def request_cancel(self, job_id: str):
+        """Cancels a queued job immediately; a running job is stopped by its worker."""
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+
+    def retry(self, job_id: str) -> bool:
+        """
+        Queues a failed or cancelled job again under the same id (and artifact directory).
+
+        Returns:
+            bool: False if the job doesn't exist or isn't failed/cancelled.
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL, finished = NULL, worker_pid = NULL,"
+                " cancel_requested = 0, result = NULL, error = NULL WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (job_id,),
+            )
+            if cursor.rowcount:
+                # The new attempt's progress starts from an empty log.
+                connection.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            connection.execute("COMMIT")
+        return bool(cursor.rowcount)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as connection:
+            row = connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def append_events(self, job_id: str, events: list):
+        if not events:
+            return
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO job_events (job_id, kind, task, text, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, event.kind, event.task, event.text, event.timestamp) for event in events],
+            )
+
+    def events_since(self, job_id: str, after_id: int = 0) -> list:
+        """Returns '(event_id, ProgressEvent)' pairs newer than 'after_id'."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, kind, task, text, timestamp FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after_id),
+            ).fetchall()
+        return [(row["id"], ProgressEvent(row["kind"], row["task"], row["text"], row["timestamp"])) for row in rows]
+
+    def prune_events(self, retention_seconds: float = DEFAULT_EVENT_RETENTION) -> int:
+        """Deletes the progress events of jobs that finished more than 'retention_seconds' ago."""
+        cutoff = time.time() - retention_seconds
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM job_events WHERE job_id IN"
+                " (SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished < ?)",
+                (*TERMINAL_STATUSES, cutoff),
+            )
+        return cursor.rowcount
+
+    def requeue_orphans(self) -> int:
+        """
+        Puts 'running' jobs whose worker process no longer exists back in the queue (or
+        marks them cancelled if a cancel was requested).
+
+        Returns:
+            int: Number of orphaned jobs found.
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute("SELECT id, worker_pid, cancel_requested FROM jobs WHERE status = 'running'").fetchall()
+            orphans = [row for row in rows if not _pid_alive(row["worker_pid"])]
+            for row in orphans:
+                if row["cancel_requested"]:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'cancelled', finished = ?, error = ? WHERE id = ?",
+                        (time.time(), "Cancelled by user.", row["id"]),
+                    )
+                else:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'queued', started = NULL, worker_pid = NULL WHERE id = ?", (row["id"],)
+                    )
+            connection.execute("COMMIT")
+        return len(orphans)
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobProgressBus(ProgressBus):
+    """
+    ProgressBus that persists events to the job table in batches and turns a cancel
+    request stored in the table into a local cancellation.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, flush_interval: float = 0.5):
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self, flush_interval: float):
+        while not self._stopped.wait(flush_interval):
+            self.flush()
+            if self.store.cancel_requested(self.job_id):
+                self.cancel()
+
+    def flush(self):
+        self.store.append_events(self.job_id, self.drain(timeout=0))
+
+    def close(self):
+        self._stopped.set()
+        self._flusher.join()
+        self.flush()
+
+
+def run_job(store: JobStore, job: dict):
+    """Executes one claimed job and records its outcome."""
+    from builder import run_website_build
+
+    bus = JobProgressBus(store, job["id"])
+    status, result, error = "failed", None, None
+    try:
+        result = run_website_build(job["prompt"], output_dir=job["artifact_dir"], bus=bus, resume_key=f"job:{job['id']}")
+        status = "succeeded"
+    except BuildCancelled:
+        status, error = "cancelled", "Cancelled by user."
+    except Exception:
+        error = traceback.format_exc()[-4000:]
+    finally:
+        # Persist the last events before the status flips, so pollers never miss them.
+        bus.close()
+        store.finish(job["id"], status, result=result, error=error)
+
+
+def worker_main(db_path: str = JOB_DB_PATH, poll_interval: float = POLL_INTERVAL):
+    """Entry point of a worker process: claims and runs jobs until the process is terminated."""
+    import sqlite_compat  # noqa: F401  (before crewai/chromadb in this fresh interpreter)
+    from environment import load_environment
+    from maintenance import maybe_run_maintenance
+
+    load_environment()
+    store = JobStore(db_path)
+    retention = float(os.getenv("JOB_EVENT_RETENTION", DEFAULT_EVENT_RETENTION))
+    next_prune = 0.0
+    while True:
+        if time.time() >= next_prune:
+            store.prune_events(retention)
+            # Evict expired embeddings and compact the Chroma store once per interval (see maintenance.py).
+            maybe_run_maintenance()
+            next_prune = time.time() + PRUNE_INTERVAL
+        job = store.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(store, job)
+
+
+class WorkerPool:
+    """
+    A fixed number of worker processes sharing one job table.
+
+    A monitor thread checks the workers every 'monitor_interval' seconds. A worker that
+    died mid-build (OOM kill, crash in native code) is replaced, and the job it was
+    running goes back to the queue instead of staying 'running' forever.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, db_path: str = JOB_DB_PATH,
+                 monitor_interval: float = MONITOR_INTERVAL, target=None):
+        self.workers = workers
+        self.db_path = db_path
+        self.monitor_interval = monitor_interval
+        self.target = target or worker_main
+        self.processes = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # 'spawn' gives every worker a clean interpreter (no threads inherited from Streamlit).
+        self._context = multiprocessing.get_context("spawn")
+
+    def _spawn(self, index: int):
+        process = self._context.Process(target=self.target, args=(self.db_path,), name=f"build-worker-{index}", daemon=True)
+        process.start()
+        return process
+
+    def start(self):
+        JobStore(self.db_path).requeue_orphans()
+        with self._lock:
+            self.processes = [self._spawn(index) for index in range(self.workers)]
+        if self.workers and self.monitor_interval:
+            threading.Thread(target=self._monitor, name="build-worker-monitor", daemon=True).start()
+        return self
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self.processes)
+
+    def check(self) -> int:
+        """
+        Replaces dead workers and requeues the jobs they were running.
+
+        Returns:
+            int: Number of workers replaced.
+        """
+        with self._lock:
+            dead = [index for index, process in enumerate(self.processes) if not process.is_alive()]
+            if not dead or self._stopping.is_set():
+                return 0
+            for index in dead:
+                process = self.processes[index]
+                process.join()  # Reaped, so its pid no longer counts as alive
+                logger.warning("Build worker %s (pid %s) exited with code %s; restarting it.",
+                               process.name, process.pid, process.exitcode)
+            requeued = JobStore(self.db_path).requeue_orphans()
+            if requeued:
+                logger.warning("Requeued %d job(s) left running by dead workers.", requeued)
+            for index in dead:
+                self.processes[index] = self._spawn(index)
+        return len(dead)
+
+    def _monitor(self):
+        while not self._stopping.wait(self.monitor_interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Checking the build workers failed.")
+
+    def stop(self):
+        self._stopping.set()
+        with self._lock:
+            for process in self.processes:
+                process.terminate()
+            for process in self.processes:
+                process.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    """
+    Returns the worker pool of this server process, starting it on first use.
+
+    JOB_WORKERS (in .env) sets the pool size; JOB_WORKERS=0 starts none, for deployments
+    where workers run separately via 'python -m jobs'.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS))).start()
+        return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run website-build workers against the job table.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)))
+    parser.add_argument("--db", default=JOB_DB_PATH)
+    args = parser.parse_args()
+    pool = WorkerPool(workers=args.workers, db_path=args.db).start()
+    print(f"Started {args.workers} build workers on {args.db}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Completion cache and offline LLM for the agents' chat model.
+
+The 'ChatOpenAI' client is called many times per crew run, and re-running the same prompt
+repeats every completion. 'CompletionCache' plugs into LangChain's cache interface, so
+every chat completion is looked up before it is sent to the API:
+
+    - Exact layer: keyed by LangChain's llm_string (model, temperature, bound tools, ...)
+      plus the serialized messages, stored in a ResultCache (see cache.py) with the same
+      TTL and LRU size eviction as the web-tool cache.
+    - Similarity layer (optional): prompts are embedded into a Chroma collection in 'db/';
+      a new prompt whose nearest cached neighbour (for the same llm_string) is within
+      'similarity_threshold' reuses that completion.
+
+crewai doesn't call LangChain chat models itself: an Agent given anything other than a
+'crewai.BaseLLM' rebuilds a litellm-backed LLM from its model name, which silently drops
+the cache, the callbacks and the rate limiter. 'build_llm()' therefore returns a
+'ChatModelLLM', a BaseLLM whose 'call()' invokes the LangChain model, so every agent
+completion goes through the cache, the streaming/instrumentation callbacks and the
+OpenAI rate limiter.
+
+Configuration (via .env):
+    LLM_PROVIDER              'openai' (default) or 'fake' for the offline FakeChatModel.
+    LLM_CACHE_MODE            'off', 'read_write' (default) or 'replay'. Replay serves the whole
+                              run from cache and raises CacheMissError instead of calling the API.
+    LLM_CACHE_PATH            Database file (default: db/llm_cache.sqlite3)
+    LLM_CACHE_TTL             Time-to-live in seconds (default: 30 days)
+    LLM_CACHE_MAX_MB          Size budget in megabytes (default: 512)
+    LLM_CACHE_SEMANTIC        Set to 1 to enable the similarity layer.
+    LLM_CACHE_SIMILARITY      Minimum cosine similarity for a semantic hit (default: 0.97)
+"""
+import contextvars
+import hashlib
+import os
+from typing import Any, Iterator, List, Optional, Sequence
+
+from crewai import BaseLLM
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from cache import CacheMissError, ResultCache, make_key
+from rate_limits import get_rate_limiter
+
+DEFAULT_LLM_CACHE_PATH = os.path.join("db", "llm_cache.sqlite3")
+DEFAULT_LLM_CACHE_TTL = 30 * 24 * 3600
+DEFAULT_LLM_CACHE_MAX_MB = 512
+SEMANTIC_COLLECTION = "llm_completion_cache"
+DEFAULT_CONTEXT_WINDOW = 128_000  # gpt-4o; crewai's BaseLLM assumes 4096 and would summarize early
+
+CACHE_MODES = ("off", "read_write", "replay")
+
+# Whether the most recent lookup on this thread was served from cache (read by instrumentation.py).
+last_lookup_hit = contextvars.ContextVar("llm_cache_last_lookup_hit", default=False)
+
+
+class CompletionCache(BaseCache):
+    """
+    LangChain cache backed by a ResultCache, with an optional Chroma similarity layer.
+
+    Args:
+        store (ResultCache): Exact-match storage. Set 'store.offline' for replay mode.
+        semantic (bool): Enable the embedding-similarity layer.
+        similarity_threshold (float): Minimum cosine similarity for a semantic hit.
+        chroma_path (str): Directory of the persistent Chroma store.
+    """
+
+    def __init__(self, store: ResultCache, semantic: bool = False,
+                 similarity_threshold: float = 0.97, chroma_path: str = "db"):
+        self.store = store
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.chroma_path = chroma_path
+        self.semantic_hits = 0
+        self._collection = None
+
+    # --- Exact layer ---
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return make_key("llm", llm_string, prompt)
+
+    @staticmethod
+    def _llm_hash(llm_string: str) -> str:
+        return hashlib.sha256(llm_string.encode("utf-8")).hexdigest()[:16]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[ChatGeneration]]:
+        key = self._key(prompt, llm_string)
+        cached = self.store.get(key, namespace="llm")
+        if cached is None and self.semantic:
+            cached = self._semantic_lookup(prompt, llm_string)
+        last_lookup_hit.set(cached is not None)
+        if cached is None:
+            if self.store.offline:
+                raise CacheMissError("No cached completion for this prompt (LLM replay mode).")
+            return None
+        return [loads(generation) for generation in cached]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[ChatGeneration]) -> None:
+        if self.store.offline:
+            return
+        key = self._key(prompt, llm_string)
+        self.store.set(key, [dumps(generation) for generation in return_val], namespace="llm")
+        if self.semantic:
+            self._semantic_add(key, prompt, llm_string)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+        if self.semantic:
+            self._get_collection().delete(where={"llm": {"$ne": ""}})
+
+    # --- Similarity layer ---
+
+    def _get_collection(self):
+        if self._collection is None:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=self.chroma_path)
+            self._collection = client.get_or_create_collection(SEMANTIC_COLLECTION, metadata={"hnsw:space": "cosine"})
+        return self._collection
+
+    def _semantic_add(self, key: str, prompt: str, llm_string: str):
+        self._get_collection().upsert(ids=[key], documents=[prompt], metadatas=[{"llm": self._llm_hash(llm_string)}])
+
+    def _semantic_lookup(self, prompt: str, llm_string: str):
+        collection = self._get_collection()
+        if collection.count() == 0:
+            return None
+        found = collection.query(query_texts=[prompt], n_results=1, where={"llm": self._llm_hash(llm_string)})
+        if not found["ids"] or not found["ids"][0]:
+            return None
+        neighbour, distance = found["ids"][0][0], found["distances"][0][0]
+        if 1.0 - distance < self.similarity_threshold:
+            return None
+        cached = self.store.get(neighbour, namespace="llm-semantic")
+        if cached is None:
+            # The exact entry was evicted; drop the dangling embedding too.
+            collection.delete(ids=[neighbour])
+            return None
+        self.semantic_hits += 1
+        return cached
+
+    def stats(self) -> dict:
+        """Exact hits, similarity hits and real misses (completions sent to the API)."""
+        counts = self.store.stats()["by_namespace"].get("llm", {"hits": 0, "misses": 0})
+        return {
+            "exact_hits": counts["hits"],
+            "semantic_hits": self.semantic_hits,
+            "misses": counts["misses"] - self.semantic_hits,
+        }
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic, offline chat model for exercising the crew without network access.
+
+    Every reply is a well-formed CrewAI final answer that echoes the start of the last
+    message, so agents finish their task in a single step. With 'streaming=True' the reply
+    is delivered word by word, like ChatOpenAI's streamed tokens.
+    """
+    response_prefix: str = "Fake completion for"
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-website-builder"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"response_prefix": self.response_prefix}
+
+    def _reply(self, messages: List) -> str:
+        last = messages[-1].content if messages else ""
+        summary = " ".join(str(last).split())[:200]
+        return f"Thought: I now know the final answer\nFinal Answer: {self.response_prefix}: {summary}"
+
+    def _generate(self, messages: List, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages: List, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for index, word in enumerate(self._reply(messages).split(" ")):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if index == 0 else " " + word))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class ChatModelLLM(BaseLLM):
+    """
+    crewai LLM that sends every agent completion through a LangChain chat model.
+
+    Tools are described in the ReAct prompt rather than passed as functions, so the
+    model's cache key only depends on the messages and stop words.
+    """
+    llm_type: str = "langchain"
+    chat_model: Any = None  # BaseChatModel (ChatOpenAI or FakeChatModel)
+    context_window: int = DEFAULT_CONTEXT_WINDOW
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None) -> str:
+        stop = list(self.stop_sequences) or None
+        reply = self.chat_model.invoke(_to_langchain_messages(messages), stop=stop)
+        usage = getattr(reply, "usage_metadata", None)
+        if usage:
+            self._track_token_usage_internal({
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            })
+        return self._apply_stop_words(reply.content if isinstance(reply.content, str) else str(reply.content))
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return self.context_window
+
+
+def _to_langchain_messages(messages) -> list:
+    """Converts crewai's message dicts (or a plain prompt) to LangChain messages."""
+    if isinstance(messages, str):
+        return [HumanMessage(content=messages)]
+    classes = {"system": SystemMessage, "assistant": AIMessage}
+    return [classes.get(message.get("role"), HumanMessage)(content=message.get("content") or "") for message in messages]
+
+
+def build_completion_cache() -> Optional[CompletionCache]:
+    """Creates the completion cache configured in .env, or None if LLM_CACHE_MODE is 'off'."""
+    mode = os.getenv("LLM_CACHE_MODE", "read_write")
+    if mode not in CACHE_MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(CACHE_MODES)}, got '{mode}'.")
+    if mode == "off":
+        return None
+    store = ResultCache(
+        path=os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL", DEFAULT_LLM_CACHE_TTL)),
+        max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_LLM_CACHE_MAX_MB)) * 1024 * 1024),
+        offline=mode == "replay",
+    )
+    return CompletionCache(
+        store,
+        semantic=os.getenv("LLM_CACHE_SEMANTIC") == "1",
+        similarity_threshold=float(os.getenv("LLM_CACHE_SIMILARITY", "0.97")),
+    )
+
+
+def build_chat_model(llm_config: dict, completion_cache: Optional[CompletionCache] = None, callbacks: list = None):
+    """
+    Creates the LangChain chat model behind the agents' LLM.
+
+    Args:
+        llm_config (dict): Model settings (e.g. model, temperature) for ChatOpenAI.
+        completion_cache (CompletionCache): Cache attached to this model only (not set globally).
+        callbacks (list): LangChain callback handlers (e.g. token streaming to the UI).
+    Returns:
+        BaseChatModel: ChatOpenAI (streaming tokens), or FakeChatModel when LLM_PROVIDER=fake.
+    """
+    # Shared by every build in this process; only consulted on completion-cache misses.
+    rate_limiter = get_rate_limiter("openai")
+    if os.getenv("LLM_PROVIDER", "openai") == "fake":
+        return FakeChatModel(cache=completion_cache, streaming=True, callbacks=callbacks, rate_limiter=rate_limiter)
+
+    from langchain_openai import ChatOpenAI
+
+    # stream_usage=True so streamed completions still report token usage.
+    return ChatOpenAI(**llm_config, cache=completion_cache, streaming=True, stream_usage=True,
+                      callbacks=callbacks, rate_limiter=rate_limiter)
+
+
+def build_llm(llm_config: dict, completion_cache: Optional[CompletionCache] = None, callbacks: list = None) -> ChatModelLLM:
+    """
+    Creates the LLM shared by all agents (see 'build_chat_model()' for the arguments).
+
+    Returns:
+        ChatModelLLM: A crewai LLM that crewai uses as-is, keeping the chat model's cache,
+                      callbacks and rate limiter.
+    """
+    chat_model = build_chat_model(llm_config, completion_cache, callbacks)
+    model = getattr(chat_model, "model_name", None) or chat_model._llm_type  # ChatOpenAI has a model_name
+    return ChatModelLLM(model=model, temperature=llm_config.get("temperature"), chat_model=chat_model)
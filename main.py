@@ -1,192 +1,69 @@
-import sys
-import os
-import zipfile
-import streamlit as st
-from dotenv import load_dotenv
-
-# This section ensures that 'pysqlite3' is used whenever 'sqlite3' is imported.
-# This is crucial for libraries like ChromaDB that might default to the built-in sqlite3,
-# which is too old on your system.
-try:
-    __import__("pysqlite3")
-    sys.modules["sqlite3"] = sys.modules.pop("pysqlite3")
-except ImportError:
-    # If pysqlite3-binary somehow isn't available, fall back to the standard sqlite3.
-    # (Note: if this happens, ChromaDB will likely still fail due to old version).
-    pass
-
-# Load environment variables at the very beginning
-load_dotenv()
-
-from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
-
-# Make sure to import all tools you intend to use.
-# It's good practice to be explicit about which tools each agent gets.
-from tools import (
-    code_docs_search_tool,
-    code_interpreter_tool,
-    composio_tools, # This is a list of tools from ComposioToolSet
-    csv_search_tool,
-    exa_search_tool,
-    file_read_tool,
-    firecrawl_search_tool,
-    firecrawl_crawl_website_tool,
-    firecrawl_scrape_website_tool,
-    github_search_tool,
-    serper_dev_tool,
-    txt_search_tool,
-    json_search_tool,
-    mdx_search_tool,
-    pdf_search_tool,
-    rag_tool,
-    scrape_element_from_website_tool,
-    scrape_website_tool, # Used for general page scraping (doesn't need css_element)
-    website_search_tool,
-    xml_search_tool,
-    youtube_channel_search_tool,
-    youtube_video_search_tool,
-    create_zip_archive_tool_function,
-    extract_zip_archive_tool_function
-)
-
-# --- IMPORTANT: SQL Database Tool Setup (If you intend to query a database) ---
-# Your logs indicated 'analyst_agent' tried to query a 'user_feedback table'
-# with 'CodeDocsSearchTool', which is incorrect.
-# To query a SQL database, you need to properly set up SQLDatabase and QuerySQLDataBaseTool.
-# This part assumes you have a database connection string (e.g., in your .env).
-
-# from langchain_community.utilities import SQLDatabase
-# from langchain_community.tools import QuerySQLDataBaseTool
-
-# sql_query_tool = None # Initialize to None
-# try:
-#     # Replace with your actual database connection string
-#     DB_URI = os.getenv("DATABASE_URL", "sqlite:///./data/user_feedback.db") # Example for SQLite
-#     if not DB_URI:
-#         st.error("DATABASE_URL environment variable is not set for SQL database access.")
-#     else:
-#         # Ensure your database is accessible and has the 'user_feedback' table.
-#         # You might need to adjust the directory for 'data/user_feedback.db'
-#         # You may need to create the 'data' directory and an empty 'user_feedback.db' file initially
-#         sql_database = SQLDatabase.from_uri(DB_URI)
-#         sql_query_tool = QuerySQLDataBaseTool(database=sql_database)
-#         st.info(f"SQL Database Tool initialized for {DB_URI}")
-# except Exception as e:
-#     st.error(f"Error initializing SQL Database Tool: {e}. Check your DATABASE_URL and database file.")
-
-# --- Consolidated Tool Lists (Tailored for each agent) ---
-# Instead of giving all agents all tools, provide only what they need.
-# This reduces the LLM's 'cognitive load' and potential for misusing tools.
-
-# General Web Search & File Reading tools for initial research
-briefing_agent_tools = [
-    serper_dev_tool,
-    exa_search_tool,
-    file_read_tool,
-    firecrawl_search_tool,
-    firecrawl_crawl_website_tool,
-    firecrawl_scrape_website_tool, # Use this if you need full page content
-    website_search_tool,
-    csv_search_tool, # If it might read uploaded CSVs
-    txt_search_tool, # If it might read uploaded TXTs
-    pdf_search_tool, # If it might read uploaded PDFs
-]
-# Add scrape_element_from_website_tool ONLY if this agent is expected to extract specific CSS elements
-# briefing_agent_tools.append(scrape_element_from_website_tool)
-
-# Designer and Copywriter might need general web search for inspiration/context
-designer_copywriter_tools = [
-    serper_dev_tool,
-    exa_search_tool,
-    file_read_tool,
-    scrape_website_tool, # For general website content to inform design/copy
-    csv_search_tool, # If they might refer to design.csv
-    txt_search_tool,
-    json_search_tool,
-]
-
-# Developer needs code interpretation, file read/write, and potentially Github search
-developer_agent_tools = [
-    code_interpreter_tool,
-    file_read_tool,
-    # Assuming 'Write File Tool' is implied/handled by CrewAI's Task output,
-    # but if there's an explicit WriteFileTool, add it here.
-    # If the custom zip functions are needed for developer output:
-    create_zip_archive_tool_function,
-    extract_zip_archive_tool_function,
-    github_search_tool,
-]
-
-# Analyst needs specific tools for data querying.
-# This is where the main "correction" for the database issue goes.
-analyst_agent_tools = [
-    # If you enabled the SQL_QUERY_TOOL above, uncomment this:
-    # sql_query_tool,
-    code_interpreter_tool, # Can be used to run Python code for data analysis/DB interaction
-    csv_search_tool,
-    json_search_tool,
-    file_read_tool,
-    # Do NOT include code_docs_search_tool here if it's for local documentation.
-    # It caused errors trying to resolve external URLs for database queries.
-]
-# Filter out None if sql_query_tool wasn't initialized
-analyst_agent_tools = [tool for tool in analyst_agent_tools if tool is not None]
-
-
-# Ensure OPENAI_API_KEY is set in your environment
-llm = ChatOpenAI(model="gpt-4o", temperature=0.7) # Recommended: Use a more capable model like gpt-4o for complex tasks
-
-# === AGENTS ===
-briefing_agent = Agent(
-    role="Creative Strategist",
-    goal="Understand product intent and search for relevant competitors and market trends using web search. Summarize findings into a comprehensive brand brief.",
-    backstory="An expert in market analysis and brand positioning, adept at synthesizing information for strategic insights.",
-    tools=briefing_agent_tools, # Assign specific tools
-    llm=llm,
-    verbose=True,
-    allow_delegation=True # Allow delegation for complex research tasks
-)
+import time
 
-designer_agent = Agent(
-    role="Web Designer",
-    goal="Define the website's structure, layout, and visual design tokens (colors, typography, spacing). Incorporate best UX practices and refer to design resources.",
-    backstory="A seasoned UX/UI designer who excels at translating abstract ideas into intuitive and aesthetically pleasing web interfaces.",
-    tools=designer_copywriter_tools, # Assign specific tools
-    llm=llm,
-    verbose=True,
-    allow_delegation=True
-)
+# STARTUP_PROFILE=1 reports the import time and memory of the first run (see startup_profile.py).
+import startup_profile
+startup_profile.start_if_enabled()
 
-copywriter_agent = Agent(
-    role="Content Marketer",
-    goal="Write compelling and contextual copy for each website section, including hero title, subtext, CTA, and footer. Ensure SEO optimization and a clear brand voice.",
-    backstory="A master storyteller and wordsmith, capable of crafting engaging content that resonates with target audiences and drives action.",
-    tools=designer_copywriter_tools, # Assign specific tools
-    llm=llm,
-    verbose=True,
-    allow_delegation=True
-)
-
-developer_agent = Agent(
-    role="Frontend Coder",
-    goal="Translate the design and content into clean, responsive, and functional HTML/CSS code for a full homepage. **The final output must be saved as a complete, well-formed HTML document to 'autosite/index.html' using the appropriate file writing tool.**",
-    backstory="A meticulous and efficient frontend developer who transforms visual designs and content into high-quality, production-ready web code.",
-    tools=developer_agent_tools, # Assign specific tools
-    llm=llm,
-    verbose=True,
-    allow_delegation=True
-)
+import streamlit as st
 
-analyst_agent = Agent(
-    role="Database Analyst", # Changed role for clarity
-    goal="Retrieve and summarize the most common feature requests and complaints from the 'user_feedback' database table to provide data-driven insights for design and copy improvements.",
-    backstory="A data-first decision maker with expertise in querying and interpreting structured database information.",
-    tools=analyst_agent_tools, # Assign specific tools (should include sql_query_tool if enabled)
-    llm=llm,
-    verbose=True,
-    allow_delegation=True
-)
+# Ensure 'pysqlite3' replaces the built-in sqlite3 before ChromaDB gets imported.
+import sqlite_compat  # noqa: F401
+
+# Load environment variables at the very beginning (see environment.py)
+from environment import load_environment
+
+load_environment()
+
+# Builds run on a pool of worker processes fed from a SQLite job table (see jobs.py), so
+# they survive reruns and refreshes, and several users can build at once. The workers
+# build the LLM client, tools and agents once per process (see crew.py).
+from archive import safe_extract
+from cache import get_web_cache
+from ingest import ingest_directory, ingest_upload
+from jobs import TERMINAL_STATUSES, JobStore, get_worker_pool
+from uploads import UploadTooLargeError, save_upload_stream, submit_extraction
+
+job_store = JobStore()
+get_worker_pool()
+startup_profile.finish_if_enabled("main")
+
+
+def render_live_progress(job_id):
+    """
+    Replays and then polls the job's progress events into one status panel per task
+    until the job reaches a terminal state.
+
+    Returns:
+        dict: The final job row.
+    """
+    panels, live_text, tokens = {}, {}, {}
+    last_event_id = 0
+    while True:
+        job = job_store.get(job_id)
+        events = job_store.events_since(job_id, last_event_id)
+        for event_id, event in events:
+            last_event_id = event_id
+            if event.task not in panels:
+                panels[event.task] = st.status(f"⏸️ {event.task}", expanded=False)
+                live_text[event.task] = panels[event.task].empty()
+                tokens[event.task] = ""
+            panel = panels[event.task]
+            if event.kind == "task_start":
+                panel.update(label=f"🏃 {event.task}", state="running", expanded=True)
+            elif event.kind in ("token", "tool_output"):
+                # Partial LLM or code-interpreter output for the step in progress
+                tokens[event.task] += event.text
+                live_text[event.task].markdown(tokens[event.task][-1500:])
+            elif event.kind in ("step", "tool"):
+                tokens[event.task] = ""
+                panel.text(event.text[:1000])
+            elif event.kind == "task_end":
+                live_text[event.task].markdown(event.text[:3000])
+                panel.update(label=f"✅ {event.task}", state="complete", expanded=False)
+        if job["status"] in TERMINAL_STATUSES and not events:
+            return job
+        if not events:
+            time.sleep(0.3)
 
 
 # === STREAMLIT UI ===
@@ -196,20 +73,57 @@ prompt = st.text_input("Enter your website idea or prompt", placeholder="e.g. A
 
 uploaded_file = st.file_uploader("Upload your design or data file (CSV, TXT, PDF, ZIP)", type=["csv", "txt", "pdf", "zip"])
 if uploaded_file is not None:
-    os.makedirs("uploads", exist_ok=True)
-    file_path = os.path.join("uploads", uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.read())
-    st.success(f"Uploaded {uploaded_file.name}")
-
-    # NEW: Handle ZIP file extraction upon upload
-    if uploaded_file.type == "application/zip":
-        st.info(f"Extracting '{uploaded_file.name}'...")
+    # Streamlit reruns this script on every interaction; only handle each upload once.
+    processed = st.session_state.setdefault("processed_uploads", {})
+    if uploaded_file.file_id not in processed:
+        try:
+            # Streamed to disk in chunks and hashed on the way; identical content is stored once.
+            saved = save_upload_stream(uploaded_file, uploaded_file.name)
+        except UploadTooLargeError as e:
+            st.error(str(e))
+            saved = None
+        if saved is not None:
+            processed[uploaded_file.file_id] = saved
+            if uploaded_file.type == "application/zip" and not saved["duplicate"]:
+                # NEW: Handle ZIP file extraction upon upload, on a background worker.
+                # Extracted files are indexed for the search tools on the same worker.
+                st.session_state["zip_extraction"] = (
+                    uploaded_file.name,
+                    submit_extraction(safe_extract, saved["path"], "uploads/extracted_zip", after=ingest_directory),
+                )
+            elif uploaded_file.type != "application/zip":
+                # Embed the file once into the shared uploads collection; every search tool queries it.
+                # Files whose contents were indexed before are skipped.
+                try:
+                    saved["indexed"] = ingest_upload(saved["path"])
+                except Exception as e:
+                    st.error(f"Failed to index uploaded file: {e}")
+
+    saved = processed.get(uploaded_file.file_id)
+    if saved is not None:
+        if saved["duplicate"]:
+            st.success(f"Uploaded {uploaded_file.name} (identical to the already stored '{saved['path']}').")
+        else:
+            st.success(f"Uploaded {uploaded_file.name}")
+        indexed = saved.get("indexed")
+        if indexed is not None:
+            if indexed["skipped"]:
+                st.caption("This file's contents are already indexed for the search tools.")
+            else:
+                st.caption(f"Indexed {indexed['chunks']} chunks for the search tools.")
+
+extraction = st.session_state.get("zip_extraction")
+if extraction is not None:
+    zip_name, future = extraction
+    if not future.done():
+        st.info(f"Extracting '{zip_name}' in the background...")
+        st.button("🔄 Check extraction status")
+    else:
         try:
-            # Use the custom tool function directly, or let an agent handle it if more complex logic is needed
-            # For direct extraction, ensure the function is importable and callable.
-            extract_zip_archive_tool_function(file_path, "uploads/extracted_zip")
-            st.success(f"Successfully extracted '{uploaded_file.name}' to 'uploads/extracted_zip'.")
+            extracted, indexed = future.result()
+            st.success(f"Successfully extracted {extracted['files']} files from '{zip_name}' to 'uploads/extracted_zip'.")
+            new_chunks = sum(entry["chunks"] for entry in indexed)
+            st.caption(f"Indexed {new_chunks} new chunks from {len(indexed)} extracted files for the search tools.")
         except Exception as e:
             st.error(f"Failed to extract zip file: {e}")
 
@@ -218,82 +132,112 @@ if st.button("🚀 Run AI Website Builder"):
     if not prompt:
         st.warning("Please enter a prompt before running the builder.")
     else:
-        st.write("Running CrewAI Agents... Please wait.")
-
         # === TASKS ===
-        tasks = [
-            Task(
-                description=f"Analyze the prompt: '{prompt}'. Use web search tools to find and summarize related products, competitors, and current market trends. Deliver a concise brand brief.",
-                expected_output="A brief outlining brand goals, key competitors, and relevant user/market insights.",
-                agent=briefing_agent,
-            ),
-            Task(
-                description="Based on the brand brief, define the website's structure (e.g., header, hero, features, CTA, footer), a clear layout, and a consistent visual design token system (color palette, typography, spacing). Reference uploaded design files if available (e.g., 'design.csv').",
-                expected_output="A text-based wireframe layout description and a list of design tokens.",
-                agent=designer_agent,
-            ),
-            Task(
-                description="Draft persuasive and SEO-friendly content for each section of the website. Include a catchy hero title, compelling subtext, a clear call-to-action (CTA), and a functional footer. Ensure the tone aligns with the brand brief and target audience.",
-                expected_output="Complete and contextual copywriting for the entire homepage.",
-                agent=copywriter_agent,
-            ),
-            Task(
-                description=(
-                    "Using the detailed layout, content, and design tokens from previous agents, write clean, semantic, and responsive HTML and CSS code for the entire homepage. "
-                    "**Crucially, after generating the complete HTML and CSS, save it as a single, well-formed HTML document named 'index.html' inside the 'autosite/' directory. "
-                    "You must use the available file writing tool to perform this save operation.**"
-                ),
-                expected_output="A complete and syntactically correct HTML/CSS file saved as 'autosite/index.html'.",
-                agent=developer_agent,
-            ),
-            Task(
-                description=(
-                    "Access the 'user_feedback' database table and retrieve the most common feature requests and complaints. "
-                    "Use the SQL query tool to extract relevant data. "
-                    "Summarize these findings into actionable insights for improving the website's design and copy. "
-                    "If the SQL tool isn't available, state that and explain how you would hypothetically achieve this if it were."
-                ),
-                expected_output="A summary of data-driven insights from user feedback, including common requests/complaints, presented clearly for design/copy improvement.",
-                agent=analyst_agent,
-            )
-        ]
-
-        # Use an appropriate model, e.g., "gpt-4o" for better performance in complex tasks
-        crew = Crew(
-            agents=[briefing_agent, designer_agent, copywriter_agent, developer_agent, analyst_agent],
-            tasks=tasks,
-            verbose=True,
-            # Uncomment below for higher verbosity to debug agent thought process
-            # manager_llm=llm # Add a manager_llm if you have a hierarchical crew setup
-        )
-        result = crew.kickoff()
-        st.success("Website generation process completed!")
-        st.text_area("CrewAI Process Summary Output", value=result, height=300)
-
-        # Ensure 'autosite' directory exists before checking for the file or zipping
-        os.makedirs("autosite", exist_ok=True)
-
-        generated_html_path = "autosite/index.html"
-        if os.path.exists(generated_html_path) and os.path.getsize(generated_html_path) > 0:
-            st.success(f"Generated HTML found at {generated_html_path}")
-            with open(generated_html_path, "r") as f:
-                st.code(f.read(), language="html") # Display the generated HTML
+        # The tasks form a dependency graph (see crew.build_task_graph); independent
+        # branches run concurrently so the build only takes as long as its critical path.
+        # The build is queued for a worker process; an identical prompt that is still
+        # queued or running is joined instead of built twice.
+        job_id, deduplicated = job_store.submit(prompt)
+        if deduplicated:
+            st.info("An identical build is already in progress; showing its progress.")
+        # Kept in the URL too, so a refresh (or a shared link) reattaches to the build.
+        st.session_state["job_id"] = job_id
+        st.query_params["job"] = job_id
+
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+job = job_store.get(job_id) if job_id else None
+if job is not None:
+    st.caption(f"Build job {job_id}: {job['status']}")
+    if job["status"] not in TERMINAL_STATUSES:
+        if job["cancel_requested"]:
+            st.warning("Cancelling the build; agents stop at their next step.")
         else:
-            st.warning(f"No HTML file found or it's empty at {generated_html_path}. The developer agent might not have saved it correctly or encountered an issue.")
-            # Provide a placeholder if generation failed
-            with open(generated_html_path, "w") as f:
-                f.write("<html><body><h1>Generated Website (Placeholder)</h1><p>The AI agent did not produce the expected HTML output.</p></body></html>")
-
-
-        # Create a ZIP archive of the 'autosite' directory
-        zip_filename = "autosite_package.zip"
-        try:
-            # Using the custom tool function directly here for the download button,
-            # assuming it's reliable for this purpose outside of an agent's direct call.
-            # Alternatively, an agent could be tasked to create this zip.
-            create_zip_archive_tool_function("autosite", zip_filename)
-            st.success(f"Website package zipped to '{zip_filename}'.")
-            with open(zip_filename, "rb") as zip_file:
-                st.download_button("📦 Download Website ZIP", data=zip_file, file_name=zip_filename, mime="application/zip")
-        except Exception as e:
-            st.error(f"Error creating zip for download: {e}")
\ No newline at end of file
+            st.button("🛑 Cancel build", on_click=job_store.request_cancel, args=(job_id,))
+        job = render_live_progress(job_id)
+
+    if job["status"] == "cancelled":
+        st.warning("Build cancelled.")
+        st.button("🔁 Retry build", on_click=job_store.retry, args=(job_id,))
+        st.stop()
+    if job["status"] == "failed":
+        st.error("The build failed.")
+        st.code(job["error"] or "", language="text")
+        # The retry reuses the tasks that already succeeded (see checkpoints.py).
+        st.button("🔁 Retry build", on_click=job_store.retry, args=(job_id,))
+        st.stop()
+
+    build = job["result"]
+    result = build["outputs"]["developer"]
+    st.success(f"Website generation process completed in {build['wall_time']:.1f}s!")
+
+    st.subheader("⏱️ Task Timing")
+    st.caption("Critical path: " + " → ".join(build["critical_path"]))
+    if build.get("resumed"):
+        st.caption("Resumed from checkpoints of the previous attempt: " + ", ".join(build["resumed"]))
+    st.table(build["timing_rows"])
+    cache_stats = get_web_cache().stats()
+    st.caption(f"Web cache: {build['web_cache']['hits']} hits / {build['web_cache']['misses']} misses in this build "
+               f"({cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} KiB)")
+    if build["llm_cache"] is not None:
+        llm_stats = build["llm_cache"]
+        st.caption(f"LLM cache (worker): {llm_stats['exact_hits']} exact hits, {llm_stats['semantic_hits']} similar hits, "
+                   f"{llm_stats['misses']} misses")
+
+    if build.get("context_rows"):
+        saved = sum(row["saved"] for row in build["context_rows"])
+        st.caption(f"Context compaction saved {saved} prompt tokens across downstream tasks.")
+        st.dataframe(build["context_rows"])
+
+    st.subheader("🔬 Run Profile")
+    profile_rows = build["profile_rows"]
+    st.caption(f"Run {build['run_id']}: {sum(row['tokens_in'] for row in profile_rows)} tokens in, "
+               f"{sum(row['tokens_out'] for row in profile_rows)} tokens out, "
+               f"${sum(row['cost_usd'] for row in profile_rows):.4f} (trace appended to traces/runs.jsonl)")
+    st.dataframe(profile_rows)
+    # Flamegraph-style timeline: one lane per task, one bar per task/tool/LLM call.
+    st.vega_lite_chart(build["timeline"], {
+        "mark": {"type": "bar", "opacity": 0.7},
+        "encoding": {
+            "y": {"field": "lane", "type": "nominal", "title": "task"},
+            "x": {"field": "start_ms", "type": "quantitative", "title": "ms since start"},
+            "x2": {"field": "end_ms"},
+            "color": {"field": "name", "type": "nominal", "legend": None},
+            "tooltip": [{"field": "name"}, {"field": "start_ms"}, {"field": "end_ms"}],
+        },
+    }, use_container_width=True)
+
+    for name in build["order"]:
+        with st.expander(f"Output: {name}"):
+            st.markdown(build["outputs"][name])
+    st.text_area("CrewAI Process Summary Output", value=result, height=300)
+
+    # Every job writes into its own 'jobs/<job_id>/autosite' directory (see builder.py).
+    generated_html_path = build["html_path"]
+    if build["html_generated"]:
+        st.success(f"Generated HTML found at {generated_html_path}")
+        with open(generated_html_path, "r") as f:
+            st.code(f.read(), language="html") # Display the generated HTML
+    else:
+        st.warning(f"No HTML file found or it's empty at {generated_html_path}. The developer agent might not have saved it correctly or encountered an issue.")
+
+    optimization = build.get("optimization")
+    if optimization:
+        if "error" in optimization:
+            st.warning(f"HTML optimization skipped: {optimization['error']}")
+        elif optimization["reused"]:
+            st.caption("Optimized output reused from an identical earlier build.")
+        else:
+            st.caption(f"Optimized HTML: {optimization['html_bytes_before'] / 1024:.1f} → {optimization['html_bytes'] / 1024:.1f} KiB, "
+                       f"CSS {optimization['css_bytes_before'] / 1024:.1f} → {optimization['css_bytes'] / 1024:.1f} KiB "
+                       f"({optimization['critical_bytes'] / 1024:.1f} KiB inlined), "
+                       f"{optimization['images']} images recompressed (-{optimization['image_bytes_saved'] / 1024:.0f} KiB).")
+
+    # The worker already packaged the site (parallel compression, see archive.py).
+    zip_filename = "autosite_package.zip"
+    try:
+        with open(build["zip_path"], "rb") as f:
+            zip_bytes = f.read()
+        st.success(f"Website package zipped ({len(zip_bytes) / 1024:.0f} KiB).")
+        st.download_button("📦 Download Website ZIP", data=zip_bytes, file_name=zip_filename, mime="application/zip")
+    except Exception as e:
+        st.error(f"Error reading the zip for download: {e}")
@@ -0,0 +1,446 @@
+"""
+Maintenance of the persistent Chroma store in 'db/'.
+
+Every build adds to the store: uploaded files (ingest.py), harvested page sections
+(components.py), prompt embeddings of the completion cache (llm_cache.py) and the
+embedchain indexes of the RAG tools. Nothing ever removed anything. Chroma's HNSW
+index also never reclaims deleted elements; it only marks them as deleted. So disk usage
+and query latency grew with every month of builds. This module:
+
+    - reports per-collection record counts, index size on disk and the age of the
+      oldest/newest record ('stats'),
+    - evicts expired records: uploaded-file chunks older than CHROMA_UPLOAD_TTL (by
+      'ingested_at'), harvested sections older than CHROMA_COMPONENT_TTL (by 'created'),
+      and completion-cache embeddings whose exact cache entry is gone,
+    - rebuilds the index of a collection that lost a good part of its records (or all
+      collections with --rebuild): the records and their stored embeddings are copied
+      into a fresh collection, which then replaces the old one, so nothing is re-embedded,
+    - removes segment directories that no collection references any more and VACUUMs
+      'chroma.sqlite3',
+    - measures query latency of each collection before and after, using stored
+      embeddings as queries (no embedding model involved).
+
+'python -m maintenance' runs everything once and prints the report ('--dry-run' only
+reports). Rebuilding a collection replaces it. The uploads and components collections
+are only used under 'ingest.chroma_lock()', in the server and in every job worker, so
+maintenance evicts from them under the same shared lock, and their rebuild holds it
+exclusively and then bumps the collection generation, which makes every process drop its
+cached handle (see ingest.py). Orphaned segment directories are removed and the database
+is VACUUMed under the exclusive lock too. The other collections (the completion cache's
+embeddings, the RAG tools' indexes) have no such coordination, so a '--rebuild' of those
+is meant to run while the app is stopped, and a segment directory changed within the
+last hour is never removed, in case one of them is creating it.
+
+The job workers run maintenance automatically between builds: each checks hourly, and
+the first one to find the last run older than CHROMA_MAINTENANCE_INTERVAL runs it (a lock
+file keeps the others out). The automatic run only rebuilds the uploads and components
+collections.
+
+Configuration (via .env):
+    CHROMA_UPLOAD_TTL              Days uploaded-file chunks are kept (default: 30, 0 = forever)
+    CHROMA_COMPONENT_TTL           Days harvested sections are kept (default: 180, 0 = forever)
+    CHROMA_MAINTENANCE_INTERVAL    Hours between automatic runs (default: 24, 0 = never)
+"""
+import sqlite_compat  # noqa: F401  (must run before chromadb is imported)
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import statistics
+import time
+
+from ingest import CHROMA_PATH, UPLOADS_COLLECTION, bump_collection_generation, chroma_lock
+
+COMPONENTS_COLLECTION = "components"  # Same as components.COMPONENTS_COLLECTION (not imported: it pulls in the post-processing stack)
+# Same as in llm_cache.py (not imported: llm_cache pulls in crewai and langchain).
+SEMANTIC_COLLECTION = "llm_completion_cache"
+DEFAULT_LLM_CACHE_PATH = os.path.join("db", "llm_cache.sqlite3")
+DEFAULT_LLM_CACHE_TTL = 30 * 24 * 3600
+TIMESTAMP_KEYS = ("ingested_at", "created")
+DEFAULT_UPLOAD_TTL_DAYS = 30
+DEFAULT_COMPONENT_TTL_DAYS = 180
+DEFAULT_INTERVAL_HOURS = 24
+REBUILD_FRACTION = 0.2  # Rebuild a collection once this share of its records was evicted
+BATCH_SIZE = 1000
+LATENCY_SAMPLES = 20
+ORPHAN_GRACE_SECONDS = 3600  # Segment directories changed more recently are never treated as orphaned
+LAST_RUN_FILE = "maintenance.json"
+RUN_LOCK_FILE = "maintenance.lock"
+# Collections whose users coordinate through ingest.chroma_lock() and the collection generation.
+COORDINATED_COLLECTIONS = (UPLOADS_COLLECTION, COMPONENTS_COLLECTION)
+
+logger = logging.getLogger(__name__)
+
+
+def _client(path: str):
+    import chromadb
+
+    return chromadb.PersistentClient(path=path)
+
+
+def _collection_names(client) -> list:
+    # chromadb 0.6 returns names, other versions Collection objects
+    return sorted(item if isinstance(item, str) else item.name for item in client.list_collections())
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _dirs, files in os.walk(path) for name in files)
+
+
+def _segment_directories(path: str) -> dict:
+    """Collection name -> directories of its segments (the HNSW files), read from chroma.sqlite3."""
+    directories = {}
+    database = os.path.join(path, "chroma.sqlite3")
+    if not os.path.exists(database):
+        return directories
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT collections.name, segments.id FROM segments JOIN collections ON segments.collection = collections.id"
+        ).fetchall()
+    except sqlite3.Error:  # Unknown schema (other chromadb version): sizes are reported as unknown
+        rows = []
+    finally:
+        connection.close()
+    for name, segment_id in rows:
+        directory = os.path.join(path, segment_id)
+        if os.path.isdir(directory):
+            directories.setdefault(name, []).append(directory)
+    return directories
+
+
+def _iterate(collection, include: list):
+    """Yields (ids, embeddings, documents, metadatas) batches of a whole collection."""
+    offset = 0
+    while True:
+        batch = collection.get(include=include, limit=BATCH_SIZE, offset=offset)
+        if not batch["ids"]:
+            return
+        yield batch
+        offset += len(batch["ids"])
+
+
+def collection_stats(client, path: str = CHROMA_PATH) -> list:
+    """
+    Per-collection size and age.
+
+    Returns:
+        list: One dict per collection with 'collection', 'records', 'index bytes' and the
+        age in days of its oldest and newest record (None without a timestamp).
+    """
+    directories = _segment_directories(path)
+    now = time.time()
+    rows = []
+    for name in _collection_names(client):
+        collection = client.get_collection(name)
+        timestamps = []
+        for batch in _iterate(collection, ["metadatas"]):
+            for metadata in batch["metadatas"]:
+                stamp = next((metadata[key] for key in TIMESTAMP_KEYS if metadata and key in metadata), None)
+                if isinstance(stamp, (int, float)):
+                    timestamps.append(stamp)
+        rows.append({
+            "collection": name,
+            "records": collection.count(),
+            "index bytes": sum(_directory_bytes(directory) for directory in directories.get(name, [])),
+            "oldest (days)": round((now - min(timestamps)) / 86400, 1) if timestamps else None,
+            "newest (days)": round((now - max(timestamps)) / 86400, 1) if timestamps else None,
+        })
+    return rows
+
+
+def query_latency(collection, samples: int = LATENCY_SAMPLES) -> float:
+    """Median milliseconds of a 5-nearest-neighbour query, using stored embeddings as queries (None if empty)."""
+    count = collection.count()
+    if count == 0:
+        return None
+    step = max(count // samples, 1)
+    queries = []
+    for offset in range(0, count, step)[:samples]:
+        found = collection.get(include=["embeddings"], limit=1, offset=offset)
+        if found["ids"]:
+            queries.append(list(found["embeddings"][0]))
+    durations = []
+    for embedding in queries:
+        started = time.perf_counter()
+        collection.query(query_embeddings=[embedding], n_results=min(5, count))
+        durations.append(time.perf_counter() - started)
+    return round(statistics.median(durations) * 1000, 2) if durations else None
+
+
+def _expired_ids(collection, key: str, cutoff: float) -> list:
+    expired = []
+    for batch in _iterate(collection, ["metadatas"]):
+        expired.extend(
+            entry_id for entry_id, metadata in zip(batch["ids"], batch["metadatas"])
+            if isinstance((metadata or {}).get(key), (int, float)) and metadata[key] < cutoff
+        )
+    return expired
+
+
+def _dangling_completion_ids(collection) -> list:
+    """Embeddings of the completion cache whose exact entry expired or was evicted from the LLM cache."""
+    database = os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH)
+    if not os.path.exists(database):
+        return []
+    cutoff = time.time() - float(os.getenv("LLM_CACHE_TTL", DEFAULT_LLM_CACHE_TTL))
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        dangling = []
+        for batch in _iterate(collection, []):
+            ids = batch["ids"]
+            placeholders = ",".join("?" * len(ids))
+            alive = {key for (key,) in connection.execute(
+                f"SELECT key FROM cache_entries WHERE key IN ({placeholders}) AND created >= ?", (*ids, cutoff))}
+            dangling.extend(entry_id for entry_id in ids if entry_id not in alive)
+        return dangling
+    finally:
+        connection.close()
+
+
+def _ttl_days(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def evict_expired(client, dry_run: bool = False, path: str = CHROMA_PATH) -> dict:
+    """
+    Deletes expired records (see the module docstring).
+
+    The uploads and components collections are read and written under the shared
+    'chroma_lock()' in 'path', like every other use of them.
+
+    Returns:
+        dict: Collection name -> number of records evicted (or that would be, with 'dry_run').
+    """
+    names = set(_collection_names(client))
+    now = time.time()
+    plans = []
+    upload_ttl = _ttl_days("CHROMA_UPLOAD_TTL", DEFAULT_UPLOAD_TTL_DAYS)
+    if UPLOADS_COLLECTION in names and upload_ttl > 0:
+        plans.append((UPLOADS_COLLECTION, lambda collection: _expired_ids(collection, "ingested_at", now - upload_ttl * 86400)))
+    component_ttl = _ttl_days("CHROMA_COMPONENT_TTL", DEFAULT_COMPONENT_TTL_DAYS)
+    if COMPONENTS_COLLECTION in names and component_ttl > 0:
+        plans.append((COMPONENTS_COLLECTION, lambda collection: _expired_ids(collection, "created", now - component_ttl * 86400)))
+    if SEMANTIC_COLLECTION in names:
+        plans.append((SEMANTIC_COLLECTION, _dangling_completion_ids))
+
+    evicted = {}
+    for name, find in plans:
+        with chroma_lock(path=path) if name in COORDINATED_COLLECTIONS else contextlib.nullcontext():
+            collection = client.get_collection(name)
+            ids = find(collection)
+            if ids and not dry_run:
+                for start in range(0, len(ids), BATCH_SIZE):
+                    collection.delete(ids=ids[start:start + BATCH_SIZE])
+        evicted[name] = len(ids)
+    return evicted
+
+
+def rebuild_collection(client, name: str) -> int:
+    """
+    Replaces a collection with a fresh copy of its records, which drops the deleted
+    elements its HNSW index still carries. Stored embeddings are copied, not recomputed.
+
+    Returns:
+        int: Number of records copied.
+    """
+    source = client.get_collection(name)
+    temporary = f"{name}__rebuild"
+    if temporary in _collection_names(client):
+        client.delete_collection(temporary)  # Left over from an interrupted rebuild; the source is intact
+    target = client.create_collection(temporary, metadata=source.metadata or None)
+    copied = 0
+    for batch in _iterate(source, ["embeddings", "documents", "metadatas"]):
+        target.add(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"],
+                   metadatas=batch["metadatas"])
+        copied += len(batch["ids"])
+    client.delete_collection(name)
+    target.modify(name=name)
+    return copied
+
+
+def remove_orphaned_segments(path: str = CHROMA_PATH, grace_seconds: float = ORPHAN_GRACE_SECONDS) -> int:
+    """
+    Deletes segment directories in 'path' that no collection references. Returns the bytes freed.
+
+    Run it under the exclusive 'chroma_lock()'. Directories changed within the last
+    'grace_seconds' are kept: a collection without that coordination (the completion
+    cache's, the RAG tools') may be creating one right now.
+    """
+    referenced = {directory for directories in _segment_directories(path).values() for directory in directories}
+    if not os.path.exists(os.path.join(path, "chroma.sqlite3")):
+        return 0
+    freed = 0
+    for entry in os.listdir(path):
+        directory = os.path.join(path, entry)
+        # Segment directories are named by UUID and hold HNSW files such as 'header.bin'
+        if (os.path.isdir(directory) and directory not in referenced and len(entry) == 36 and entry.count("-") == 4
+                and os.path.exists(os.path.join(directory, "header.bin"))
+                and time.time() - _last_modified(directory) >= grace_seconds):
+            freed += _directory_bytes(directory)
+            shutil.rmtree(directory)
+    return freed
+
+
+def _last_modified(directory: str) -> float:
+    return max([os.path.getmtime(directory)] + [os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)])
+
+
+def vacuum(path: str = CHROMA_PATH) -> bool:
+    """VACUUMs chroma.sqlite3; returns False if another process holds it busy."""
+    database = os.path.join(path, "chroma.sqlite3")
+    if not os.path.exists(database):
+        return False
+    connection = sqlite3.connect(database, timeout=5)
+    try:
+        connection.execute("VACUUM")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def run_maintenance(path: str = CHROMA_PATH, rebuild=None, dry_run: bool = False, log=print) -> dict:
+    """
+    Evicts expired records, rebuilds fragmented indexes, frees disk space and reports.
+
+    Args:
+        path (str): Directory of the persistent Chroma store.
+        rebuild: Collection names to rebuild, True for all, or None to rebuild the uploads
+                 and components collections once REBUILD_FRACTION of their records was evicted.
+        dry_run (bool): Only report what would be evicted.
+        log: Callable receiving progress lines.
+    Returns:
+        dict: 'before' and 'after' stats rows (with query latency), 'evicted', 'rebuilt',
+        'disk bytes before/after'.
+    """
+    client = _client(path)
+    disk_before = _directory_bytes(path)
+    before = collection_stats(client, path)
+    for row in before:
+        row["query ms"] = query_latency(client.get_collection(row["collection"]))
+    log(f"{len(before)} collections, {disk_before / 1e6:.1f} MB on disk")
+
+    evicted = evict_expired(client, dry_run=dry_run, path=path)
+    log(f"Evicted: {evicted or 'nothing'}" + (" (dry run)" if dry_run else ""))
+    report = {"before": before, "evicted": evicted, "rebuilt": [], "disk bytes before": disk_before}
+    if dry_run:
+        return report
+
+    records = {row["collection"]: row["records"] for row in before}
+    if rebuild is True:
+        targets = _collection_names(client)
+    elif rebuild:
+        targets = list(rebuild)
+    else:
+        targets = [name for name in COORDINATED_COLLECTIONS
+                   if evicted.get(name, 0) >= max(1, REBUILD_FRACTION * records.get(name, 0))]
+    for name in targets:
+        if name in COORDINATED_COLLECTIONS:
+            # No process reads or writes the collection while it is copied and swapped, and
+            # afterwards every process opens the new one instead of its stale handle.
+            with chroma_lock(exclusive=True, path=path):
+                copied = rebuild_collection(client, name)
+                bump_collection_generation(path)
+        else:
+            copied = rebuild_collection(client, name)
+        report["rebuilt"].append(name)
+        log(f"Rebuilt '{name}' ({copied} records)")
+
+    # Nothing may open, write or create a coordinated collection while its files are
+    # deleted or the database is rewritten.
+    with chroma_lock(exclusive=True, path=path):
+        freed = remove_orphaned_segments(path)
+        vacuumed = vacuum(path)
+    after = collection_stats(client, path)
+    for row in after:
+        row["query ms"] = query_latency(client.get_collection(row["collection"]))
+    report.update(after=after, orphaned_bytes_freed=freed, vacuumed=vacuumed, **{"disk bytes after": _directory_bytes(path)})
+    log(f"{report['disk bytes after'] / 1e6:.1f} MB on disk after maintenance")
+    return report
+
+
+def _run_due(marker: str, interval: float) -> bool:
+    try:
+        with open(marker) as f:
+            return time.time() - json.load(f)["finished"] >= interval
+    except (OSError, ValueError, KeyError):
+        return True
+
+
+def maybe_run_maintenance(path: str = CHROMA_PATH):
+    """
+    Runs 'run_maintenance()' if the last run is older than CHROMA_MAINTENANCE_INTERVAL.
+
+    Called periodically by the job workers (see jobs.py). A lock file makes sure only one
+    process runs it at a time; the time of the last run is kept in 'db/maintenance.json'.
+
+    Returns:
+        dict: The report, or None if no run was due, another process is running it, or it failed.
+    """
+    interval = float(os.getenv("CHROMA_MAINTENANCE_INTERVAL", DEFAULT_INTERVAL_HOURS)) * 3600
+    marker = os.path.join(path, LAST_RUN_FILE)
+    if interval <= 0 or not os.path.exists(os.path.join(path, "chroma.sqlite3")) or not _run_due(marker, interval):
+        return None
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    with open(os.path.join(path, RUN_LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None  # Another worker is running it
+        if not _run_due(marker, interval):
+            return None  # Another worker finished a run while this one waited for the lock
+        try:
+            report = run_maintenance(path, log=lambda line: None)
+        except Exception:  # Maintenance must never take a worker down; it is retried on the next check
+            logger.exception("Chroma maintenance failed.")
+            return None
+        with open(marker, "w") as f:
+            json.dump({"finished": time.time(), "evicted": report["evicted"], "rebuilt": report["rebuilt"]}, f)
+        return report
+
+
+def _print_rows(title: str, rows: list):
+    print(f"\n{title}")
+    columns = ["collection", "records", "index bytes", "oldest (days)", "newest (days)", "query ms"]
+    print("  ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{str(row.get(column)):>14}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evict, compact and report on the Chroma store in db/.")
+    parser.add_argument("--path", default=CHROMA_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be evicted.")
+    parser.add_argument("--rebuild", nargs="*", metavar="COLLECTION",
+                        help="Rebuild these collections (all if none are named). Stop the app first.")
+    parser.add_argument("--stats", action="store_true", help="Only print per-collection stats.")
+    args = parser.parse_args()
+
+    if args.stats:
+        client = _client(args.path)
+        rows = collection_stats(client, args.path)
+        for row in rows:
+            row["query ms"] = query_latency(client.get_collection(row["collection"]))
+        _print_rows("Collections", rows)
+        return
+    rebuild = None if args.rebuild is None else (args.rebuild or True)
+    report = run_maintenance(args.path, rebuild=rebuild, dry_run=args.dry_run)
+    _print_rows("Before", report["before"])
+    if "after" in report:
+        _print_rows("After", report["after"])
+        print(f"\nDisk: {report['disk bytes before'] / 1e6:.1f} MB -> {report['disk bytes after'] / 1e6:.1f} MB"
+              f" (orphaned segments freed: {report['orphaned_bytes_freed'] / 1e6:.1f} MB, vacuum: {report['vacuumed']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Dependency-aware execution of the website-builder tasks.
+
+Instead of running the crew strictly one task after another, the tasks are declared as a
+DAG of TaskNodes. Every node whose dependencies have finished is submitted to a thread
+pool, so independent branches (e.g. the analyst and the designer/copywriter chain) run
+concurrently and the wall-clock time of a build drops to its critical path.
+
+This module deliberately doesn't import crewai: a node's task only needs an
+'execute_sync(agent=..., context=...)' method (as crewai.Task provides), which keeps the
+scheduler easy to exercise with stand-in tasks.
+"""
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Name of the node running on the current worker thread. Callbacks that are shared by all
+# tasks (progress streaming, instrumentation) use it to attribute what they observe.
+current_task_name = contextvars.ContextVar("current_task_name", default=None)
+
+
+@dataclass
+class TaskNode:
+    """A task in the build graph together with the names of the nodes it needs."""
+    name: str
+    task: object
+    depends_on: tuple = ()
+    checkpoint: bool = True  # Output may be reused when the build is retried (see checkpoints.py)
+
+
+@dataclass
+class TaskTiming:
+    """Wall-clock timing of one node, relative to the start of the DAG run."""
+    name: str
+    agent: str
+    started: float
+    finished: float
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+@dataclass
+class DagResult:
+    """Outputs and timings of a DAG run."""
+    outputs: dict = field(default_factory=dict)  # node name -> raw text output
+    timings: dict = field(default_factory=dict)  # node name -> TaskTiming
+    order: list = field(default_factory=list)  # node names in completion order
+    wall_time: float = 0.0
+    critical_path: list = field(default_factory=list)
+
+    def timing_rows(self) -> list:
+        """Per-task timing breakdown, ready for st.table / st.dataframe."""
+        return [
+            {
+                "task": name,
+                "agent": self.timings[name].agent,
+                "start (s)": round(self.timings[name].started, 2),
+                "duration (s)": round(self.timings[name].duration, 2),
+                "critical path": name in self.critical_path,
+            }
+            for name in self.order
+        ]
+
+
+def topological_order(nodes: list) -> list:
+    """
+    Validates the graph and returns the node names in a dependency-respecting order.
+
+    Raises:
+        ValueError: On duplicate names, unknown dependencies or cycles.
+    """
+    by_name = {}
+    for node in nodes:
+        if node.name in by_name:
+            raise ValueError(f"Duplicate task name '{node.name}' in task graph.")
+        by_name[node.name] = node
+    for node in nodes:
+        for dependency in node.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Task '{node.name}' depends on unknown task '{dependency}'.")
+
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Task graph has a cycle through '{name}'.")
+        visiting.add(name)
+        for dependency in by_name[name].depends_on:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for node in nodes:
+        visit(node.name)
+    return order
+
+
+def _critical_path(nodes: list, timings: dict) -> list:
+    """Returns the chain of dependent nodes with the largest summed duration."""
+    by_name = {node.name: node for node in nodes}
+    best = {}  # name -> (total duration, path)
+    for name in topological_order(nodes):
+        incoming = [best[dependency] for dependency in by_name[name].depends_on]
+        total, path = max(incoming, key=lambda item: item[0], default=(0.0, []))
+        best[name] = (total + timings[name].duration, path + [name])
+    return max(best.values(), key=lambda item: item[0], default=(0.0, []))[1]
+
+
+def _agent_label(task) -> str:
+    agent = getattr(task, "agent", None)
+    return getattr(agent, "role", "") if agent is not None else ""
+
+
+def execute_task(task, context: str) -> str:
+    """
+    Runs a single crewai Task with the outputs of its dependencies as context.
+
+    Returns:
+        str: The raw text output of the task.
+    """
+    output = task.execute_sync(agent=task.agent, context=context or None)
+    return getattr(output, "raw", output)
+
+
+def concatenate_outputs(node: TaskNode, outputs: dict) -> str:
+    return "\n\n".join(f"## Output of '{dependency}'\n{outputs[dependency]}" for dependency in node.depends_on)
+
+
+def run_task_dag(nodes: list, max_workers: int = None, execute=execute_task, build_context=None) -> DagResult:
+    """
+    Executes the task graph, running every node as soon as its dependencies are done.
+
+    Args:
+        nodes (list): TaskNodes making up the graph.
+        max_workers (int): Thread pool size; defaults to the number of nodes.
+        execute: Callable '(task, context) -> str' used to run one task.
+        build_context: Callable '(node, outputs) -> str' turning the dependencies' outputs into
+                       the task context; defaults to concatenating them (see compaction.py).
+    Returns:
+        DagResult: Outputs, per-task timings and the critical path of the run.
+    Raises:
+        ValueError: If the graph is invalid.
+        Exception: The first exception raised by a task; tasks that haven't started are cancelled.
+    """
+    topological_order(nodes)  # Fail fast on a malformed graph
+    by_name = {node.name: node for node in nodes}
+    build_context = build_context or concatenate_outputs
+    remaining = {node.name: set(node.depends_on) for node in nodes}
+    result = DagResult()
+    run_started = time.perf_counter()
+
+    def run_node(node):
+        token = current_task_name.set(node.name)
+        try:
+            started = time.perf_counter() - run_started
+            text = execute(node.task, build_context(node, result.outputs))
+            finished = time.perf_counter() - run_started
+        finally:
+            current_task_name.reset(token)
+        return text, TaskTiming(node.name, _agent_label(node.task), started, finished)
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(nodes), 1), thread_name_prefix="crew-task") as pool:
+        running = {}
+
+        def submit_ready():
+            for name in [name for name, pending in remaining.items() if not pending]:
+                del remaining[name]
+                running[pool.submit(run_node, by_name[name])] = name
+
+        submit_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    text, timing = future.result()
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    raise
+                result.outputs[name] = text
+                result.timings[name] = timing
+                result.order.append(name)
+                for pending in remaining.values():
+                    pending.discard(name)
+            submit_ready()
+
+    result.wall_time = time.perf_counter() - run_started
+    result.critical_path = _critical_path(nodes, result.timings)
+    return result
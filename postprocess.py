@@ -0,0 +1,425 @@
+"""
+Deterministic post-processing of the generated site before it is zipped.
+
+The developer agent writes a single 'autosite/index.html' with whatever markup and inline
+styles the model produced. 'optimize_site()' turns that into a page that loads faster:
+
+    1. Repair: the HTML is re-parsed and re-serialized with a doctype, <html lang>,
+       <head> with charset/viewport/title, and <body>. Unclosed tags are closed.
+    2. CSS: all <style> blocks are merged and identical blocks deduplicated. Repeated
+       identical rules keep only their last occurrence, which is the one that wins the
+       cascade. The result is minified; quoted strings and url(...) values are left
+       exactly as written.
+    3. Critical CSS: small stylesheets are inlined completely. Larger ones are split:
+       rules matching the above-the-fold markup (header/nav/first section, plus
+       html/body/:root and @font-face) stay inline, and the rest goes to a
+       content-hashed 'styles.<hash>.css' that loads without blocking rendering.
+    4. Images: local <img> files are downscaled to MAX_IMAGE_WIDTH and re-encoded if
+       that makes them smaller, and every image after the first is lazy-loaded. They get
+       width/height attributes (which reserve their space while loading) only when the
+       CSS sets 'height: auto' on images; otherwise a width-constrained image would be
+       stretched to the attribute's height.
+    5. Pre-compression: '.gz' (and '.br' when the 'brotli' package is installed)
+       variants of the text assets are written next to them, for servers that serve
+       pre-compressed files.
+
+The output depends only on the input files, so it is cached in 'db/site_cache/<hash>/'
+keyed by the content hash of the site; an identical page from a later build is restored
+from there instead of being processed again. The least recently used entries beyond
+SITE_CACHE_MAX_ENTRIES are deleted.
+
+Configuration (via .env):
+    SITE_CACHE_MAX_ENTRIES   Optimized sites kept in db/site_cache (default: 200)
+"""
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+
+PIPELINE_VERSION = 1
+SITE_CACHE_DIR = os.path.join("db", "site_cache")
+DEFAULT_SITE_CACHE_MAX_ENTRIES = 200
+INLINE_ALL_MAX_BYTES = 8 * 1024  # Below this, the whole stylesheet is inlined
+MAX_IMAGE_WIDTH = 1600
+JPEG_QUALITY = 82
+PRECOMPRESS_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json", ".txt", ".xml")
+PRECOMPRESS_MIN_BYTES = 1024
+ABOVE_THE_FOLD_SELECTOR = "header, nav, body > section:first-of-type, main > section:first-of-type, .hero, #hero"
+ALWAYS_CRITICAL = {"html", "body", ":root", "*"}
+
+_GENERATED_FILE = re.compile(r"^styles\.[0-9a-f]{10}\.css$|\.(gz|br)$")
+# Comments, then the tokens whose contents must survive minification verbatim.
+_CSS_TOKENS = re.compile(
+    r"""(/\*.*?\*/)|("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|url\(\s*[^\s"')]*\s*\))""", re.S | re.I
+)
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+# A minified rule whose selector targets <img> and that declares 'height:auto'.
+_IMG_HEIGHT_AUTO = re.compile(r"(?:^|[^\w.#-])img(?![\w-])[^{}]*\{(?:[^}]*;)?height:auto", re.I)
+
+
+# --- CSS ---
+
+def minify_css(css: str) -> str:
+    """Whitespace/comment minification that doesn't change the meaning of the CSS."""
+    protected = []
+
+    def protect(match):
+        if match.group(1):
+            return ""  # Comment
+        protected.append(match.group(2))
+        return f"\x00{len(protected) - 1}\x00"
+
+    css = _CSS_TOKENS.sub(protect, css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r"\s*:\s*(?![^{}]*\{)", ":", css)  # Only inside declarations, not in selectors like 'a :hover'
+    css = css.replace(";}", "}")
+    return _PLACEHOLDER.sub(lambda match: protected[int(match.group(1))], css.strip())
+
+
+def split_rules(css: str) -> list:
+    """Splits minified CSS into top-level statements (rules and @-blocks), respecting nested braces and strings."""
+    rules, depth, start, quote, escaped = [], 0, 0, None, False
+    for index, char in enumerate(css):
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:index + 1].strip())
+                start = index + 1
+        elif char == ";" and depth == 0:
+            rules.append(css[start:index + 1].strip())  # e.g. @import / @charset
+            start = index + 1
+    tail = css[start:].strip()
+    if tail:
+        rules.append(tail)
+    return [rule for rule in rules if rule]
+
+
+def dedupe_rules(rules: list) -> list:
+    """Drops exact duplicate statements, keeping the last one (the one that wins the cascade)."""
+    last_index = {rule: index for index, rule in enumerate(rules)}
+    return [rule for index, rule in enumerate(rules) if last_index[rule] == index]
+
+
+def _selector_matches(selector: str, fold_tokens: set) -> bool:
+    # The rightmost compound selector decides which elements a rule styles.
+    compound = re.split(r"[\s>+~]+", selector.strip())[-1]
+    compound = re.sub(r"::?[\w-]+(\([^)]*\))?", "", compound)  # Pseudo-classes/elements
+    compound = re.sub(r"\[[^\]]*\]", "", compound)
+    if not compound or compound in ALWAYS_CRITICAL:
+        return True
+    tokens = re.findall(r"[.#]?[\w-]+", compound)
+    return all(token in fold_tokens for token in tokens)
+
+
+def is_critical(rule: str, fold_tokens: set) -> bool:
+    if rule.startswith("@font-face") or rule.startswith("@import") or rule.startswith("@charset"):
+        return True
+    if rule.startswith("@"):
+        return False
+    selectors = rule.split("{", 1)[0]
+    return any(_selector_matches(selector, fold_tokens) for selector in selectors.split(","))
+
+
+def _fold_tokens(soup) -> set:
+    """Tags, '.classes' and '#ids' used by the above-the-fold elements."""
+    tokens = set()
+    for root in soup.select(ABOVE_THE_FOLD_SELECTOR):
+        for element in [root] + root.find_all(True):
+            tokens.add(element.name)
+            tokens.update(f".{name}" for name in element.get("class", []))
+            if element.get("id"):
+                tokens.add(f"#{element['id']}")
+    return tokens
+
+
+# --- HTML ---
+
+def repair_html(html: str):
+    """
+    Parses (and thereby repairs) the page and makes sure it has the basic document structure.
+
+    Returns:
+        bs4.BeautifulSoup: The repaired document.
+    """
+    from bs4 import BeautifulSoup, Doctype
+
+    soup = BeautifulSoup(html, "html.parser")
+    if soup.html is None:
+        wrapper = BeautifulSoup("<html><head></head><body></body></html>", "html.parser")
+        for child in list(soup.contents):
+            name = getattr(child, "name", None)
+            if isinstance(child, Doctype):
+                continue
+            if name in ("head", "body"):
+                # A stray <head>/<body> without <html>: move its contents, not the tag itself
+                for grandchild in list(child.contents):
+                    getattr(wrapper, name).append(grandchild.extract())
+                continue
+            target = wrapper.head if name in ("title", "meta", "link", "style", "base") else wrapper.body
+            target.append(child.extract())
+        soup = wrapper
+    if soup.head is None:
+        soup.html.insert(0, soup.new_tag("head"))
+    if soup.body is None:
+        body = soup.new_tag("body")
+        for child in [child for child in soup.html.contents if child is not soup.head]:
+            body.append(child.extract())
+        soup.html.append(body)
+    if not soup.html.get("lang"):
+        soup.html["lang"] = "en"
+    if soup.head.find("meta", charset=True) is None:
+        soup.head.insert(0, soup.new_tag("meta", charset="utf-8"))
+    if soup.head.find("meta", attrs={"name": "viewport"}) is None:
+        soup.head.append(soup.new_tag("meta", attrs={"name": "viewport", "content": "width=device-width, initial-scale=1"}))
+    if soup.head.title is None:
+        title = soup.new_tag("title")
+        heading = soup.body.find(["h1", "h2"])
+        title.string = heading.get_text(" ", strip=True)[:70] if heading else "Website"
+        soup.head.append(title)
+    for item in list(soup.contents):
+        if isinstance(item, Doctype):
+            item.extract()
+    soup.insert(0, Doctype("html"))
+    return soup
+
+
+def optimize_styles(soup, site_dir: str) -> dict:
+    """Merges, dedupes, minifies and splits the page's <style> blocks (see module docstring)."""
+    blocks, seen, before = [], set(), 0
+    for style in soup.find_all("style"):
+        if style.get("media") not in (None, "", "all"):
+            continue  # Media-specific blocks keep their own <style media=...>
+        text = style.string or ""
+        before += len(text.encode("utf-8"))
+        key = minify_css(text)
+        if key and key not in seen:
+            seen.add(key)
+            blocks.append(key)
+        style.decompose()
+    if not blocks:
+        return {"css_blocks": 0, "css_bytes_before": before, "css_bytes": 0, "critical_bytes": 0, "stylesheet": None}
+
+    rules = dedupe_rules(split_rules("".join(blocks)))
+    css = "".join(rules)
+    stylesheet = None
+    if len(css.encode("utf-8")) <= INLINE_ALL_MAX_BYTES:
+        critical = css
+    else:
+        fold_tokens = _fold_tokens(soup)
+        critical = "".join(rule for rule in rules if is_critical(rule, fold_tokens))
+        stylesheet = f"styles.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:10]}.css"
+        with open(os.path.join(site_dir, stylesheet), "w", encoding="utf-8") as f:
+            f.write(css)  # The full sheet; the critical rules repeat harmlessly
+
+    if critical:
+        style = soup.new_tag("style")
+        style.string = critical
+        soup.head.append(style)
+    if stylesheet:
+        # Loads without blocking the first render; <noscript> covers browsers without JS.
+        soup.head.append(soup.new_tag("link", rel="preload", href=stylesheet, attrs={
+            "as": "style", "onload": "this.onload=null;this.rel='stylesheet'"}))
+        noscript = soup.new_tag("noscript")
+        noscript.append(soup.new_tag("link", rel="stylesheet", href=stylesheet))
+        soup.head.append(noscript)
+    return {"css_blocks": len(blocks), "css_bytes_before": before, "css_bytes": len(css.encode("utf-8")),
+            "critical_bytes": len(critical.encode("utf-8")), "stylesheet": stylesheet}
+
+
+def _local_path(site_dir: str, src: str):
+    if not src or re.match(r"^[a-z][a-z0-9+.-]*:|^//", src, re.I):
+        return None  # Remote, data: or protocol-relative URL
+    root = os.path.realpath(site_dir)
+    path = os.path.realpath(os.path.join(root, src.split("?", 1)[0].split("#", 1)[0]))
+    if not path.startswith(root + os.sep):
+        return None  # Outside the site
+    return path if os.path.isfile(path) else None
+
+
+def optimize_images(soup, site_dir: str, set_dimensions: bool = False) -> dict:
+    """
+    Downscales/recompresses local images and sets lazy loading on <img> tags.
+
+    Args:
+        set_dimensions (bool): Also add width/height attributes; only safe when the CSS keeps
+                               the aspect ratio of scaled images ('height: auto').
+    """
+    done = {}
+    for index, img in enumerate(soup.find_all("img")):
+        if index > 0 and not img.get("loading"):
+            img["loading"] = "lazy"
+        if not img.get("decoding"):
+            img["decoding"] = "async"
+        path = _local_path(site_dir, img.get("src", ""))
+        if path is None:
+            continue
+        if path not in done:
+            done[path] = _optimize_image_file(path)
+        size, _bytes_saved = done[path]
+        if set_dimensions and size is not None and not img.get("width") and not img.get("height"):
+            img["width"], img["height"] = str(size[0]), str(size[1])
+    savings = [bytes_saved for _size, bytes_saved in done.values() if bytes_saved]
+    return {"images": len(savings), "image_bytes_saved": sum(savings)}
+
+
+def _optimize_image_file(path: str) -> tuple:
+    """Returns ((width, height), bytes saved or None); rewrites the file only if it gets smaller."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None, None
+    try:
+        with Image.open(path) as image:
+            image.load()
+            image_format = image.format
+            if image_format not in ("JPEG", "PNG", "WEBP"):
+                return image.size, None
+            if image.width > MAX_IMAGE_WIDTH:
+                image = image.resize((MAX_IMAGE_WIDTH, round(image.height * MAX_IMAGE_WIDTH / image.width)), Image.LANCZOS)
+            buffer = io.BytesIO()
+            if image_format == "JPEG":
+                image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            elif image_format == "PNG":
+                image.save(buffer, "PNG", optimize=True)
+            else:
+                image.save(buffer, "WEBP", quality=JPEG_QUALITY, method=6)
+            size = image.size
+    except OSError:
+        return None, None  # Not a readable image
+    original = os.path.getsize(path)
+    if buffer.tell() >= original:
+        return size, None
+    with open(path, "wb") as f:
+        f.write(buffer.getvalue())
+    return size, original - buffer.tell()
+
+
+# --- Pre-compression ---
+
+def precompress(site_dir: str) -> int:
+    """Writes '.gz' (and '.br' if available) next to every text asset; returns the number of files written."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    written = 0
+    for root, _dirs, files in os.walk(site_dir):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < PRECOMPRESS_MIN_BYTES:
+                continue
+            with open(path + ".gz", "wb") as f:
+                # mtime=0 keeps the output byte-identical across builds
+                with gzip.GzipFile(filename="", mode="wb", fileobj=f, compresslevel=9, mtime=0) as gz:
+                    gz.write(data)
+            written += 1
+            if brotli is not None:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+                written += 1
+    return written
+
+
+# --- Pipeline ---
+
+def site_content_hash(site_dir: str) -> str:
+    """Hash over the pipeline version and every source file of the site (generated outputs excluded)."""
+    hasher = hashlib.sha256(f"v{PIPELINE_VERSION}".encode())
+    for root, dirs, files in os.walk(site_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if _GENERATED_FILE.search(name):
+                continue
+            path = os.path.join(root, name)
+            hasher.update(os.path.relpath(path, site_dir).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _restore(cached_dir: str, site_dir: str):
+    shutil.rmtree(site_dir)
+    shutil.copytree(cached_dir, site_dir)
+    os.utime(cached_dir)  # Marks the entry as recently used
+
+
+def evict_site_cache(cache_dir: str, max_entries: int) -> int:
+    """Deletes the least recently used entries beyond 'max_entries'; returns how many were deleted."""
+    try:
+        names = [name for name in os.listdir(cache_dir) if not name.endswith(".tmp")]
+    except FileNotFoundError:
+        return 0
+    entries = []
+    for name in names:
+        try:
+            entries.append((os.path.getmtime(os.path.join(cache_dir, name)), name))
+        except OSError:
+            continue  # Evicted by another build meanwhile
+    entries.sort(reverse=True)
+    for _mtime, name in entries[max_entries:]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    return max(len(entries) - max_entries, 0)
+
+
+def optimize_site(site_dir: str, cache_dir: str = SITE_CACHE_DIR, max_entries: int = None) -> dict:
+    """
+    Repairs and optimizes the generated site in place.
+
+    Args:
+        site_dir (str): Directory containing 'index.html' (and any assets it references).
+        cache_dir (str): Where optimized sites are kept by content hash; None disables reuse.
+        max_entries (int): Size limit of 'cache_dir' (default: SITE_CACHE_MAX_ENTRIES).
+    Returns:
+        dict: What was done (bytes before/after, CSS and image statistics, 'reused').
+    """
+    html_path = os.path.join(site_dir, "index.html")
+    content_hash = site_content_hash(site_dir)
+    cached_dir = os.path.join(cache_dir, content_hash[:32]) if cache_dir else None
+    if cached_dir and os.path.isdir(cached_dir):
+        _restore(cached_dir, site_dir)
+        return {"reused": True, "content_hash": content_hash, "html_bytes": os.path.getsize(html_path)}
+
+    with open(html_path, "r", encoding="utf-8", errors="replace") as f:
+        original = f.read()
+    soup = repair_html(original)
+    report = {"reused": False, "content_hash": content_hash, "html_bytes_before": len(original.encode("utf-8"))}
+    css = "".join(minify_css(style.string or "") for style in soup.find_all("style"))
+    report.update(optimize_styles(soup, site_dir))
+    report.update(optimize_images(soup, site_dir, set_dimensions=bool(_IMG_HEIGHT_AUTO.search(css))))
+    html = str(soup)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    report["html_bytes"] = len(html.encode("utf-8"))
+    report["precompressed_files"] = precompress(site_dir)
+
+    if cached_dir:
+        staging = cached_dir + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(site_dir, staging)
+        try:
+            os.replace(staging, cached_dir)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # Another build stored the same site first
+        if max_entries is None:
+            max_entries = int(os.getenv("SITE_CACHE_MAX_ENTRIES", DEFAULT_SITE_CACHE_MAX_ENTRIES))
+        evict_site_cache(cache_dir, max_entries)
+    return report
@@ -0,0 +1,134 @@
+"""
+Live progress events for a website build, plus cooperative cancellation.
+
+Agents run on the DAG's worker threads, but Streamlit elements may only be updated from
+the script thread. Everything that happens during a build (task start/end, agent steps,
+tool calls, LLM tokens) is therefore pushed as a ProgressEvent onto the run's
+ProgressBus, and the script thread drains the bus and renders the events.
+
+The agents and the LLM client are shared process-wide (see crew.py), so the callbacks
+('step_callback()' here, 'StreamingCallbackHandler' in instrumentation.py) don't hold a
+bus themselves: 'tracked_execute()' binds the current bus to the worker thread through a
+context variable, and the callbacks look it up together with 'pipeline.current_task_name'.
+Calls outside a tracked build are simply ignored.
+
+Cancelling sets a flag that every callback checks; the next step, tool call or token then
+raises BuildCancelled. It derives from BaseException so crewai's retry-on-Exception
+logic doesn't swallow it.
+"""
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from pipeline import current_task_name
+
+_current_bus = contextvars.ContextVar("progress_current_bus", default=None)
+
+
+class BuildCancelled(BaseException):
+    """Raised inside a build once the user cancelled it."""
+
+
+@dataclass
+class ProgressEvent:
+    """One thing that happened during a build."""
+    kind: str  # 'task_start', 'task_end', 'step', 'tool', 'token', 'tool_output'
+    task: str
+    text: str
+    timestamp: float = field(default_factory=time.time)
+
+
+class ProgressBus:
+    """Thread-safe event queue for one build, with a cancellation flag."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def emit(self, kind: str, task: str, text: str):
+        self._queue.put(ProgressEvent(kind, task, text))
+
+    def drain(self, timeout: float = 0.1) -> list:
+        """Returns the events emitted since the last call, waiting up to 'timeout' for the first one."""
+        try:
+            drained = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                drained.append(self._queue.get_nowait())
+            except queue.Empty:
+                return drained
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise BuildCancelled("The build was cancelled.")
+
+
+def emit(kind: str, text: str):
+    """Emits to the bus of the build running on this thread (if any), honouring cancellation."""
+    bus = _current_bus.get()
+    if bus is None:
+        return
+    bus.check_cancelled()
+    bus.emit(kind, current_task_name.get() or "", text)
+
+
+def emit_tool_output(text: str):
+    """Streams partial output of a running tool (e.g. the code interpreter's stdout) to the current build."""
+    emit("tool_output", text)
+
+
+def tracked_execute(bus: ProgressBus, execute):
+    """
+    Wraps a DAG 'execute(task, context)' callable so it reports to 'bus'.
+
+    Args:
+        bus (ProgressBus): The build's event bus.
+        execute: The underlying executor (e.g. pipeline.execute_task).
+    Returns:
+        A callable with the same signature, for 'run_task_dag(..., execute=...)'.
+    """
+    def run(task, context):
+        bus.check_cancelled()
+        task_name = current_task_name.get() or ""
+        token = _current_bus.set(bus)
+        try:
+            bus.emit("task_start", task_name, "")
+            output = execute(task, context)
+            bus.emit("task_end", task_name, str(output))
+            return output
+        finally:
+            _current_bus.reset(token)
+
+    return run
+
+
+def _describe_step(step) -> str:
+    """Formats a crewai agent step (AgentAction / AgentFinish / ToolResult) for display."""
+    parts = []
+    thought = getattr(step, "thought", None) or getattr(step, "log", None)
+    if thought:
+        parts.append(str(thought).strip())
+    tool = getattr(step, "tool", None)
+    if tool:
+        parts.append(f"🔧 {tool}({getattr(step, 'tool_input', '')})")
+    result = getattr(step, "result", None) or getattr(step, "output", None)
+    if result:
+        parts.append(f"→ {str(result)[:500]}")
+    return "\n".join(parts) or str(step)[:500]
+
+
+def step_callback(step):
+    """crewai Agent step_callback: streams each thought/tool step of the running task."""
+    emit("step", _describe_step(step))
+
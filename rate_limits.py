@@ -0,0 +1,97 @@
+"""
+Process-wide rate limits per external API (OpenAI, Serper, EXA, Firecrawl).
+
+Concurrent builds share the same LLM client and tools (see crew.py), so limits have to be
+global rather than per build: every outgoing call first takes a token from its API's
+bucket and blocks until one is available. Cache hits never reach the limiter: the chat
+model only consults it on a completion-cache miss, and the tools' HTTP requests to the
+metered API hosts are limited by the shared HTTP client (see http_client.py).
+
+Limits are requests per minute, read from .env (e.g. RATE_LIMIT_OPENAI=300) or set with
+'configure_rate_limit()' (the batch CLI's '--rate serper=60'). Unset means unlimited.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+APIS = ("openai", "serper", "exa", "firecrawl")
+
+
+class RateLimiter(BaseRateLimiter):
+    """
+    Thread-safe token bucket. 'requests_per_minute=None' disables the limit.
+
+    Also a LangChain rate limiter, so it can be passed to a chat model as 'rate_limiter='.
+    """
+
+    def __init__(self, requests_per_minute: float = None, burst: int = 1):
+        self._lock = threading.Lock()
+        self.configure(requests_per_minute, burst)
+
+    def configure(self, requests_per_minute: float = None, burst: int = 1):
+        """Changes the limit in place (objects holding this limiter pick it up immediately)."""
+        with self._lock:
+            self.requests_per_minute = requests_per_minute
+            self.burst = max(1, burst)
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+
+    def _try_take(self) -> float:
+        """Takes a token if one is available; otherwise returns the seconds until the next one."""
+        with self._lock:
+            if not self.requests_per_minute:
+                return 0.0
+            rate = self.requests_per_minute / 60.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._try_take()
+            if wait == 0.0:
+                return True
+            if not blocking:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._try_take()
+            if wait == 0.0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api: str) -> RateLimiter:
+    """Returns the shared limiter for 'api', created from RATE_LIMIT_<API> on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(api)
+        if limiter is None:
+            value = os.getenv(f"RATE_LIMIT_{api.upper()}")
+            limiter = _limiters[api] = RateLimiter(float(value) if value else None)
+        return limiter
+
+
+def configure_rate_limit(api: str, requests_per_minute: float = None, burst: int = 1):
+    """Overrides the limit of 'api' for this process."""
+    get_rate_limiter(api).configure(requests_per_minute, burst)
+
+
+def acquire(api: str = None):
+    """Blocks until a request to 'api' is allowed. 'None' (no API tag) never blocks."""
+    if api is not None:
+        get_rate_limiter(api).acquire()
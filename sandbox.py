@@ -0,0 +1,634 @@
+"""
+Pooled, pre-warmed Python workers for the code interpreter tool.
+
+crewai's CodeInterpreterTool starts a Docker container (or a fresh interpreter) for every
+call, so each snippet the developer or analyst runs pays seconds of startup before any
+of its own work. Instead, the tool now hands code to a small pool of local worker
+processes:
+
+    - Workers are started ahead of time as separate interpreters and import the common libraries
+      once (CODE_INTERPRETER_PRELOAD), so a call only pays for executing its snippet.
+    - Each worker runs under resource limits: address space (CODE_INTERPRETER_MEMORY_MB),
+      size of files it writes, and open files. Every call gets a CPU-time limit
+      (CODE_INTERPRETER_CPU_SECONDS) and a wall-clock limit (CODE_INTERPRETER_TIMEOUT);
+      a worker that exceeds either is killed and replaced, never reused.
+    - API keys, tokens, passwords and DATABASE_URL are removed from a worker's
+      environment, and each call runs in a fresh global namespace.
+    - stdout/stderr are streamed back while the code runs. The chunks appear live in the
+      build's progress panel, and the output returned to the agent is capped at MAX_OUTPUT.
+    - A worker that was idle for a while is pinged before it is used, and a worker is
+      recycled after CODE_INTERPRETER_MAX_RUNS calls (or after a MemoryError), so state
+      leaked by earlier snippets (monkeypatched modules, huge objects in caches) doesn't
+      pile up. Replacements are started right away, so they are warm by the next call.
+
+Workers are kept away from the server's files:
+
+    - Each worker runs in its own scratch directory (also its HOME and TMPDIR), which is
+      emptied before every call. The site directory of the running build is copied into
+      the scratch directory under the relative path the task uses (e.g.
+      'jobs/<id>/autosite/'), and the regular files found there afterwards are copied
+      back. Nothing else a snippet writes survives the call.
+    - Where bubblewrap ('bwrap') works, a worker runs in its own namespaces: the file
+      system is read-only except for its scratch directory, the project directory (with
+      .env, db/ and uploads/) is hidden, and there is no network.
+    - Otherwise, when the server runs as root, a worker runs as CODE_INTERPRETER_USER
+      (default: nobody), which can't write to the server's files.
+Both are probed once at startup (see 'sandbox_isolation()'). Without either, the workers
+are ordinary processes with resource limits, so CODE_INTERPRETER_MODE=auto keeps crewai's
+Docker-based CodeInterpreterTool; CODE_INTERPRETER_MODE=pool uses the pool anyway.
+Site directories outside the working directory (absolute paths) aren't mirrored.
+
+Workers run this file as their script ('--worker'), so it only imports the standard
+library; the crewai tool wrapping the pool lives in tools.py.
+
+Configuration (via .env):
+    CODE_INTERPRETER_MODE          'auto' (default: the pool when isolation is available), 'pool' or 'docker'
+    CODE_INTERPRETER_USER          Account workers run as when the server is root (default: nobody)
+    CODE_INTERPRETER_WORKERS       Number of workers (default: 2)
+    CODE_INTERPRETER_MAX_RUNS      Calls before a worker is recycled (default: 50)
+    CODE_INTERPRETER_TIMEOUT       Wall-clock seconds per call (default: 30)
+    CODE_INTERPRETER_CPU_SECONDS   CPU seconds per call (default: 20)
+    CODE_INTERPRETER_MEMORY_MB     Address-space limit per worker (default: 2048)
+    CODE_INTERPRETER_PRELOAD       Comma-separated modules imported at startup
+"""
+import ast
+import builtins
+import contextvars
+import importlib
+import argparse
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Callable, Optional
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_RUNS = 50
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CPU_SECONDS = 20
+DEFAULT_MEMORY_MB = 2048
+DEFAULT_PRELOAD = "json,math,re,csv,statistics,collections,itertools,datetime,sqlite3,pandas,numpy"
+MAX_OUTPUT = 64 * 1024  # Characters of output kept per call
+MAX_FILE_BYTES = 256 * 1024 * 1024
+STARTUP_TIMEOUT = 60.0  # Importing pandas/numpy on a cold disk can take a while
+HEALTH_CHECK_AFTER = 30.0  # Idle seconds after which a worker is pinged before use
+SECRET_ENVIRONMENT = re.compile(r"KEY|TOKEN|SECRET|PASSWORD|CREDENTIAL|^DATABASE_URL$", re.IGNORECASE)
+DEFAULT_SANDBOX_USER = "nobody"
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+# Site directory of the build running on this thread; set by 'with_site_dir()'.
+current_site_dir = contextvars.ContextVar("sandbox_current_site_dir", default=None)
+
+
+# --- Worker process ---
+
+class _StreamWriter:
+    """File-like stdout/stderr replacement that sends output to the parent in chunks."""
+
+    def __init__(self, connection, stream: str):
+        self.connection = connection
+        self.stream = stream
+        self.buffer = []
+        self.size = 0
+        self.sent = 0
+
+    def write(self, text: str) -> int:
+        if self.sent >= MAX_OUTPUT:
+            return len(text)
+        self.buffer.append(text)
+        self.size += len(text)
+        if "\n" in text or self.size >= 4096:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            text = "".join(self.buffer)[: MAX_OUTPUT - self.sent]
+            self.buffer, self.size = [], 0
+            self.sent += len(text)
+            self.connection.send(("output", self.stream, text))
+
+    def isatty(self) -> bool:
+        return False
+
+
+def _apply_limits(memory_mb: int):
+    try:
+        import resource
+    except ImportError:  # Not available on Windows; the wall-clock limit still applies
+        return
+    for limit, value in ((resource.RLIMIT_AS, memory_mb * 1024 * 1024),
+                         (resource.RLIMIT_FSIZE, MAX_FILE_BYTES),
+                         (resource.RLIMIT_NOFILE, 256)):
+        _soft, hard = resource.getrlimit(limit)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+
+def _set_cpu_limit(seconds: int):
+    """Lets the process use 'seconds' more CPU time; past that the kernel sends SIGXCPU, which kills it."""
+    try:
+        import resource
+    except ImportError:
+        return
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    _soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used.ru_utime + used.ru_stime) + 1 + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _execute(code: str, namespace: dict):
+    """Runs 'code' like a script; a trailing expression is printed, like in a REPL."""
+    tree = ast.parse(code, "<code_interpreter>", "exec")
+    last = tree.body[-1] if tree.body else None
+    if isinstance(last, ast.Expr):
+        tree.body.pop()
+        exec(compile(tree, "<code_interpreter>", "exec"), namespace)
+        value = eval(compile(ast.Expression(last.value), "<code_interpreter>", "eval"), namespace)
+        if value is not None:
+            print(repr(value))
+    else:
+        exec(compile(tree, "<code_interpreter>", "exec"), namespace)
+
+
+def _format_exception(error: BaseException) -> str:
+    """The traceback of 'error' without the worker's own frames."""
+    frames = error.__traceback__
+    while frames is not None and frames.tb_frame.f_code.co_filename == __file__:
+        frames = frames.tb_next
+    return "".join(traceback.format_exception(type(error), error, frames))
+
+
+def _worker_main(connection, preload: list, memory_mb: int):
+    """Entry point of a worker process: preload, then serve 'run'/'ping' messages until 'exit'."""
+    _apply_limits(memory_mb)
+    loaded = []
+    for module in preload:
+        try:
+            importlib.import_module(module)
+            loaded.append(module)
+        except Exception:  # Optional libraries (pandas, numpy) may not be installed
+            pass
+    connection.send(("ready", os.getpid(), loaded))
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message[0] == "exit":
+            return
+        if message[0] == "ping":
+            connection.send(("pong",))
+            continue
+        _command, code, cpu_seconds = message
+        stdout, stderr = _StreamWriter(connection, "stdout"), _StreamWriter(connection, "stderr")
+        error, recycle = None, False
+        started = time.perf_counter()
+        _set_cpu_limit(cpu_seconds)
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            _execute(code, {"__name__": "__main__", "__builtins__": builtins})
+        except MemoryError:
+            error, recycle = "MemoryError: the code exceeded the worker's memory limit.", True
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"SystemExit: {e.code}"
+        except BaseException as e:
+            error = _format_exception(e)
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+            stdout.flush()
+            stderr.flush()
+        connection.send(("done", error, time.perf_counter() - started, recycle))
+
+
+# --- Parent side ---
+
+def _namespace_command(scratch: str) -> list:
+    """bubblewrap prefix: read-only root, hidden project directory, writable scratch directory, no network."""
+    project = os.getcwd()
+    command = ["bwrap", "--ro-bind", "/", "/", "--dev", "/dev", "--proc", "/proc", "--tmpfs", "/tmp",
+               "--tmpfs", project, "--ro-bind", WORKER_SCRIPT, WORKER_SCRIPT]
+    if (sys.prefix + os.sep).startswith(project + os.sep):
+        command += ["--ro-bind", sys.prefix, sys.prefix]  # A virtualenv inside the project
+    return command + ["--bind", scratch, scratch, "--chdir", scratch, "--unshare-all", "--die-with-parent", "--"]
+
+
+def _sandbox_user():
+    """(uid, gid) of CODE_INTERPRETER_USER, or None if the server can't switch to it."""
+    if not hasattr(os, "geteuid") or os.geteuid() != 0:
+        return None
+    try:
+        import pwd
+
+        entry = pwd.getpwnam(os.getenv("CODE_INTERPRETER_USER", DEFAULT_SANDBOX_USER))
+    except (ImportError, KeyError):
+        return None
+    return entry.pw_uid, entry.pw_gid
+
+
+def _probe(command_prefix: list, **popen_kwargs) -> bool:
+    """True if a worker could start this way (the interpreter runs and can read this script)."""
+    try:
+        completed = subprocess.run(command_prefix + [sys.executable, "-c", f"open({WORKER_SCRIPT!r}).close()"],
+                                   stdin=subprocess.DEVNULL, capture_output=True, timeout=30, **popen_kwargs)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return completed.returncode == 0
+
+
+_isolation = None
+_isolation_lock = threading.Lock()
+
+
+def sandbox_isolation() -> str:
+    """
+    How workers can be isolated from the server, probed once per process.
+
+    Returns:
+        str: 'namespace' (bubblewrap), 'user' (CODE_INTERPRETER_USER) or '' (neither works here).
+    """
+    global _isolation
+    with _isolation_lock:
+        if _isolation is None:
+            _isolation = ""
+            scratch = tempfile.mkdtemp(prefix="code-interpreter-probe-")
+            try:
+                user = _sandbox_user()
+                if shutil.which("bwrap") and _probe(_namespace_command(scratch)):
+                    _isolation = "namespace"
+                elif user is not None and _probe([], user=user[0], group=user[1], extra_groups=[], cwd="/"):
+                    _isolation = "user"
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+        return _isolation
+
+
+def _site_mirror(scratch: str, site_dir: str):
+    """Where 'site_dir' (relative, as the task names it) appears inside a scratch directory, or None."""
+    if not site_dir or os.path.isabs(site_dir):
+        return None
+    relative = os.path.normpath(site_dir)
+    if relative == "." or relative == ".." or relative.startswith(".." + os.sep):
+        return None
+    return os.path.join(scratch, relative)
+
+
+def with_site_dir(site_dir: str, execute):
+    """
+    Wraps a DAG 'execute(task, context)' callable so code run by its tasks can write to 'site_dir'.
+
+    Returns:
+        A callable with the same signature, for 'run_task_dag(..., execute=...)'.
+    """
+    def run(task, context):
+        token = current_site_dir.set(site_dir)
+        try:
+            return execute(task, context)
+        finally:
+            current_site_dir.reset(token)
+
+    return run
+
+
+@dataclass
+class SandboxResult:
+    """Outcome of one call."""
+    output: str
+    error: Optional[str] = None
+    timed_out: bool = False
+    killed: bool = False
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out and not self.killed
+
+    def as_text(self) -> str:
+        """The text handed back to the agent."""
+        parts = [self.output.rstrip()] if self.output.strip() else []
+        if self.timed_out:
+            parts.append(f"Error: execution timed out after {self.seconds:.0f}s and was stopped.")
+        elif self.killed:
+            parts.append("Error: the worker was killed (CPU-time or memory limit exceeded).")
+        elif self.error:
+            parts.append(self.error.rstrip())
+        if len(self.output) >= MAX_OUTPUT:
+            parts.append(f"[output truncated to {MAX_OUTPUT} characters]")
+        return "\n".join(parts) or "Code executed successfully, but printed nothing. Print the result you need."
+
+
+class SandboxWorker:
+    """One pre-warmed worker process and the parent's end of its pipe."""
+
+    def __init__(self, preload: list, memory_mb: int, isolation: str = ""):
+        # A plain subprocess rather than multiprocessing: the build workers of jobs.py are
+        # daemonic processes, which multiprocessing doesn't allow to have children.
+        parent_socket, child_socket = socket.socketpair()
+        self.scratch = tempfile.mkdtemp(prefix="code-interpreter-")
+        self.user = _sandbox_user() if isolation == "user" else None
+        environment = {name: value for name, value in os.environ.items() if not SECRET_ENVIRONMENT.search(name)}
+        environment["PYTHONPATH"] = os.pathsep.join(path for path in sys.path if path)  # Same importable modules as the server
+        environment.update(HOME=self.scratch, TMPDIR=self.scratch)
+        command = [sys.executable, WORKER_SCRIPT, "--worker", str(child_socket.fileno()),
+                   "--memory-mb", str(memory_mb), "--preload", ",".join(preload)]
+        options = {}
+        if isolation == "namespace":
+            command = _namespace_command(self.scratch) + command
+        elif self.user is not None:
+            os.chown(self.scratch, *self.user)
+            options = {"user": self.user[0], "group": self.user[1], "extra_groups": []}
+        self.process = subprocess.Popen(
+            command, pass_fds=(child_socket.fileno(),), env=environment, stdin=subprocess.DEVNULL,
+            cwd=self.scratch, **options,
+        )
+        child_socket.close()
+        self.connection = Connection(parent_socket.detach())
+        self.runs = 0
+        self.ready = False
+        self.preloaded = []
+        self.last_used = time.monotonic()
+
+    def wait_ready(self, timeout: float = STARTUP_TIMEOUT) -> bool:
+        if not self.ready and self.connection.poll(timeout):
+            try:
+                message = self.connection.recv()
+            except EOFError:
+                return False
+            self.ready = message[0] == "ready"
+            self.preloaded = message[2] if self.ready else []
+        return self.ready
+
+    def healthy(self, timeout: float = 1.0) -> bool:
+        """Pings the worker (only when it was idle for a while; a busy worker just proved itself)."""
+        if self.process.poll() is not None:
+            return False
+        if time.monotonic() - self.last_used < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            self.connection.send(("ping",))
+            return self.connection.poll(timeout) and self.connection.recv() == ("pong",)
+        except (EOFError, OSError):
+            return False
+
+    def _prepare_scratch(self, site_dir: str = None):
+        """Empties the scratch directory and copies 'site_dir' into it; returns the copy's path (or None)."""
+        for name in os.listdir(self.scratch):
+            path = os.path.join(self.scratch, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        mirror = _site_mirror(self.scratch, site_dir)
+        if mirror is None:
+            return None
+        if os.path.isdir(site_dir):
+            shutil.copytree(site_dir, mirror, symlinks=True)
+        else:
+            os.makedirs(mirror)
+        if self.user is not None:
+            for root, dirs, files in os.walk(mirror):
+                for name in [root] + [os.path.join(root, entry) for entry in dirs + files]:
+                    os.chown(name, *self.user, follow_symlinks=False)
+        return mirror
+
+    @staticmethod
+    def _collect_site(mirror: str, site_dir: str):
+        """Copies the regular files the call left in the site copy back into 'site_dir' (never symlinks)."""
+        for root, _dirs, files in os.walk(mirror):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.islink(path) or not os.path.isfile(path):
+                    continue
+                target = os.path.join(site_dir, os.path.relpath(path, mirror))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+
+    def run(self, code: str, timeout: float, cpu_seconds: int, on_output: Callable[[str], None] = None,
+            site_dir: str = None) -> tuple:
+        """
+        Executes 'code' in the worker.
+
+        Args:
+            site_dir (str): The build's site directory; the code can write to it under this
+                            (relative) path.
+        Returns:
+            tuple: (SandboxResult, reusable). A worker that timed out, died or ran out of
+            memory isn't reusable.
+        """
+        mirror = self._prepare_scratch(site_dir)
+        try:
+            return self._run(code, timeout, cpu_seconds, on_output)
+        finally:
+            if mirror is not None:
+                self._collect_site(mirror, site_dir)
+
+    def _run(self, code: str, timeout: float, cpu_seconds: int, on_output: Callable[[str], None] = None) -> tuple:
+        started = time.monotonic()
+        chunks, size = [], 0
+        self.runs += 1
+        self.connection.send(("run", code, cpu_seconds))
+        try:
+            while True:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self.connection.poll(remaining):
+                    self.kill()
+                    return SandboxResult("".join(chunks), timed_out=True, seconds=timeout), False
+                try:
+                    message = self.connection.recv()
+                except (EOFError, OSError):
+                    self.process.wait(1)
+                    return SandboxResult("".join(chunks), killed=True, seconds=time.monotonic() - started), False
+                if message[0] == "output":
+                    text = message[2][: MAX_OUTPUT - size]
+                    if text:
+                        chunks.append(text)
+                        size += len(text)
+                        if on_output is not None:
+                            on_output(text)
+                elif message[0] == "done":
+                    _done, error, seconds, recycle = message
+                    self.last_used = time.monotonic()
+                    return SandboxResult("".join(chunks), error=error, seconds=seconds), not recycle
+        except BaseException:
+            # Cancelled while the code was running (see progress.BuildCancelled): don't leave it running.
+            self.kill()
+            raise
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.connection.close()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.connection.send(("exit",))
+                self.process.wait(1)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+
+class SandboxPool:
+    """
+    A fixed number of warm workers. 'run()' borrows one, and returns (or replaces) it afterwards.
+
+    Args:
+        workers (int): Number of worker processes.
+        max_runs (int): Calls after which a worker is replaced by a fresh one.
+        timeout (float): Wall-clock seconds per call.
+        cpu_seconds (int): CPU seconds per call.
+        memory_mb (int): Address-space limit per worker.
+        preload (list): Modules every worker imports at startup.
+        isolation (str): 'namespace', 'user' or '' (none); defaults to 'sandbox_isolation()'.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_runs: int = DEFAULT_MAX_RUNS, timeout: float = DEFAULT_TIMEOUT,
+                 cpu_seconds: int = DEFAULT_CPU_SECONDS, memory_mb: int = DEFAULT_MEMORY_MB, preload: list = None,
+                 isolation: str = None):
+        self.workers = max(1, workers)
+        self.max_runs = max(1, max_runs)
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.preload = list(DEFAULT_PRELOAD.split(",") if preload is None else preload)
+        self.isolation = sandbox_isolation() if isolation is None else isolation
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"runs": 0, "recycled": 0, "timeouts": 0, "killed": 0, "unhealthy": 0}
+
+    def start(self):
+        """Starts all workers without waiting for them to finish importing."""
+        for _ in range(self.workers):
+            self._idle.put(SandboxWorker(self.preload, self.memory_mb, self.isolation))
+        return self
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _replace(self, worker: SandboxWorker, reason: str):
+        self._count(reason)
+        worker.close()
+        if not self._closed:
+            self._idle.put(SandboxWorker(self.preload, self.memory_mb, self.isolation))
+
+    def _checkout(self) -> SandboxWorker:
+        failures = 0
+        while True:
+            worker = self._idle.get(timeout=STARTUP_TIMEOUT)
+            if worker.wait_ready() and worker.healthy():
+                return worker
+            failures += 1
+            self._replace(worker, "unhealthy")
+            if failures > self.workers:
+                # Every worker failed in a row: startup itself is broken (bad preload, no memory).
+                raise RuntimeError(f"Code interpreter workers fail to start (exit code {worker.process.returncode}).")
+
+    def run(self, code: str, on_output: Callable[[str], None] = None, timeout: float = None,
+            site_dir: str = None) -> SandboxResult:
+        """
+        Executes 'code' on a warm worker.
+
+        Args:
+            code (str): Python source. A trailing expression is printed.
+            on_output: Called with each chunk of stdout/stderr while the code runs.
+            timeout (float): Wall-clock limit for this call (default: the pool's).
+            site_dir (str): Directory the code may write to (default: the running build's,
+                            see 'with_site_dir()').
+        Returns:
+            SandboxResult: Captured output, error text and limit violations.
+        """
+        if self._closed:
+            raise RuntimeError("The code interpreter pool has been closed.")
+        worker = self._checkout()
+        try:
+            result, reusable = worker.run(code, timeout or self.timeout, self.cpu_seconds, on_output,
+                                          site_dir or current_site_dir.get())
+        except BaseException:
+            self._replace(worker, "killed")
+            raise
+        self._count("runs")
+        if result.timed_out:
+            self._replace(worker, "timeouts")
+        elif result.killed:
+            self._replace(worker, "killed")
+        elif not reusable or worker.runs >= self.max_runs:
+            self._replace(worker, "recycled")
+        else:
+            self._idle.put(worker)
+        return result
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_enabled() -> bool:
+    """
+    False when crewai's own (Docker) CodeInterpreterTool should be used: CODE_INTERPRETER_MODE=docker,
+    or the default 'auto' on a host where the workers can't be isolated (see 'sandbox_isolation()').
+    """
+    mode = os.getenv("CODE_INTERPRETER_MODE", "auto").strip().lower()
+    if mode == "auto":
+        return bool(sandbox_isolation())
+    return mode != "docker"
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Returns the process-wide pool configured by the CODE_INTERPRETER_* settings, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            preload = os.getenv("CODE_INTERPRETER_PRELOAD", DEFAULT_PRELOAD)
+            _pool = SandboxPool(
+                workers=int(os.getenv("CODE_INTERPRETER_WORKERS", DEFAULT_WORKERS)),
+                max_runs=int(os.getenv("CODE_INTERPRETER_MAX_RUNS", DEFAULT_MAX_RUNS)),
+                timeout=float(os.getenv("CODE_INTERPRETER_TIMEOUT", DEFAULT_TIMEOUT)),
+                cpu_seconds=int(os.getenv("CODE_INTERPRETER_CPU_SECONDS", DEFAULT_CPU_SECONDS)),
+                memory_mb=int(os.getenv("CODE_INTERPRETER_MEMORY_MB", DEFAULT_MEMORY_MB)),
+                preload=[name.strip() for name in preload.split(",") if name.strip()],
+            ).start()
+        return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Code interpreter worker (started by SandboxPool).")
+    parser.add_argument("--worker", type=int, required=True, help="File descriptor of the connection to the pool.")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+    preload = [name for name in args.preload.split(",") if name]
+    _worker_main(Connection(args.worker), preload, args.memory_mb)
+
+
+if __name__ == "__main__":
+    main()
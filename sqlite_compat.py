@@ -0,0 +1,14 @@
+import sys
+
+# This module ensures that 'pysqlite3' is used whenever 'sqlite3' is imported.
+# This is crucial for libraries like ChromaDB that might default to the built-in sqlite3,
+# which is too old on your system.
+# Import it before anything that pulls in chromadb (crewai, crewai_tools, ...).
+# Python caches the module, so importing it from several entry points is safe.
+try:
+    __import__("pysqlite3")
+    sys.modules["sqlite3"] = sys.modules.pop("pysqlite3")
+except ImportError:
+    # If pysqlite3-binary somehow isn't available, fall back to the standard sqlite3.
+    # (Note: if this happens, ChromaDB will likely still fail due to old version).
+    pass
@@ -0,0 +1,200 @@
+"""
+Startup profiling: how long each imported module takes and how much memory it adds.
+
+Every new replica of the app pays for its imports before it can serve a page, so it
+matters which modules are loaded at startup. The profiler wraps 'builtins.__import__',
+and for each module imported for the first time it records:
+
+    cumulative ms    wall time of the import, including the modules it imported
+    self ms          the same minus the time spent importing other new modules
+    rss kb           growth of the resident set size during the import (and 'self rss kb')
+
+Two ways to use it:
+
+    STARTUP_PROFILE=1 streamlit run main.py
+        Profiles main.py's first run (its imports and setup). The slowest modules and
+        the totals per top-level package are printed to the console, and the full
+        report is written to 'traces/startup_profile.json'.
+
+    python -m startup_profile jobs ingest [--top 30] [--sort self]
+        Imports the given modules in this fresh interpreter and prints the same report.
+
+This module only imports the standard library, so it can be loaded before anything else.
+"""
+import argparse
+import builtins
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+
+REPORT_PATH = os.path.join("traces", "startup_profile.json")
+
+
+def rss_kb() -> int:
+    """Current resident set size in KiB (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KiB on Linux
+
+
+class ImportProfiler:
+    """Records the first import of every module while installed."""
+
+    def __init__(self):
+        self.records = {}
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.started = None
+        self.rss_start = None
+        self.wall_ms = None
+        self.rss_end = None
+
+    def _resolve(self, name: str, globals_, level: int) -> str:
+        if level == 0:
+            return name
+        package = (globals_ or {}).get("__package__") or (globals_ or {}).get("__name__", "")
+        try:
+            return importlib.util.resolve_name("." * level + name, package)
+        except (ImportError, ValueError):
+            return name
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = self._resolve(name, globals, level)
+        if module in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault("stack", [])
+        frame = {"ms": 0.0, "rss": 0}
+        stack.append(frame)
+        started, rss_before = time.perf_counter(), rss_kb()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            grown = rss_kb() - rss_before
+            stack.pop()
+            if stack:
+                stack[-1]["ms"] += elapsed
+                stack[-1]["rss"] += grown
+            if module in sys.modules:  # Failed imports (optional dependencies) aren't counted
+                with self._lock:
+                    self.records.setdefault(module, {
+                        "module": module,
+                        "cumulative ms": round(elapsed, 2),
+                        "self ms": round(elapsed - frame["ms"], 2),
+                        "rss kb": grown,
+                        "self rss kb": grown - frame["rss"],
+                        "depth": len(stack),
+                    })
+
+    def start(self):
+        self.started, self.rss_start = time.perf_counter(), rss_kb()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def stop(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+            self.wall_ms = round((time.perf_counter() - self.started) * 1000, 1)
+            self.rss_end = rss_kb()
+        return self
+
+    def top(self, limit: int = 25, sort: str = "cumulative") -> list:
+        key = "self ms" if sort == "self" else "cumulative ms"
+        return sorted(self.records.values(), key=lambda record: record[key], reverse=True)[:limit]
+
+    def by_package(self) -> list:
+        """Self time and memory summed per top-level package, largest first."""
+        totals = {}
+        for record in self.records.values():
+            package = record["module"].split(".")[0]
+            total = totals.setdefault(package, {"package": package, "modules": 0, "self ms": 0.0, "self rss kb": 0})
+            total["modules"] += 1
+            total["self ms"] = round(total["self ms"] + record["self ms"], 2)
+            total["self rss kb"] += record["self rss kb"]
+        return sorted(totals.values(), key=lambda total: total["self ms"], reverse=True)
+
+    def report(self, label: str = "") -> dict:
+        return {
+            "label": label,
+            "wall ms": self.wall_ms,
+            "rss start kb": self.rss_start,
+            "rss end kb": self.rss_end,
+            "modules": len(self.records),
+            "packages": self.by_package(),
+            "records": self.top(limit=len(self.records)),
+        }
+
+
+def format_report(profiler: ImportProfiler, label: str = "", limit: int = 25, sort: str = "cumulative") -> str:
+    lines = [
+        f"Startup profile{f' ({label})' if label else ''}: {profiler.wall_ms:.0f} ms, {len(profiler.records)} modules, "
+        f"RSS {profiler.rss_start / 1024:.0f} -> {profiler.rss_end / 1024:.0f} MB",
+        f"{'package':<32} {'modules':>8} {'self ms':>10} {'self MB':>9}",
+    ]
+    for total in profiler.by_package()[:15]:
+        lines.append(f"{total['package']:<32} {total['modules']:>8} {total['self ms']:>10.1f} {total['self rss kb'] / 1024:>9.1f}")
+    lines.append(f"\n{'module':<48} {'cumul ms':>10} {'self ms':>10} {'MB':>7}")
+    for record in profiler.top(limit, sort):
+        lines.append(f"{record['module']:<48} {record['cumulative ms']:>10.1f} {record['self ms']:>10.1f} "
+                     f"{record['rss kb'] / 1024:>7.1f}")
+    return "\n".join(lines)
+
+
+_app_profiler = None
+
+
+def start_if_enabled():
+    """Starts profiling when STARTUP_PROFILE=1; only on the first call in a process (Streamlit reruns main.py)."""
+    global _app_profiler
+    if _app_profiler is None and os.getenv("STARTUP_PROFILE") == "1":
+        _app_profiler = ImportProfiler().start()
+
+
+def finish_if_enabled(label: str = "main", path: str = REPORT_PATH):
+    """Stops the profiler started by 'start_if_enabled()', then prints and saves its report (once)."""
+    if _app_profiler is None or _app_profiler._original_import is None:
+        return
+    _app_profiler.stop()
+    print(format_report(_app_profiler, label), flush=True)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(_app_profiler.report(label), f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the import time and memory of modules.")
+    parser.add_argument("modules", nargs="+", help="Modules to import, in order (e.g. 'jobs ingest').")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+    parser.add_argument("--json", help="Also write the full report to this file.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    profiler = ImportProfiler().start()
+    try:
+        for module in args.modules:
+            importlib.import_module(module)
+    finally:
+        profiler.stop()
+    print(format_report(profiler, " ".join(args.modules), args.top, args.sort))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(profiler.report(" ".join(args.modules)), f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import stat
+import zipfile
+
+import pytest
+
+import archive
+from archive import UnsafeArchiveError, safe_extract, write_zip
+
+
+def make_zip(path, members):
+    """Writes 'members' ({name or ZipInfo: bytes}) to a deflated archive at 'path'."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    return str(path)
+
+
+def test_extracts_regular_members(tmp_path):
+    archive = make_zip(tmp_path / "site.zip", {"index.html": b"<h1>hi</h1>", "css/style.css": b"body{}"})
+    assert safe_extract(archive, str(tmp_path / "out")) == {"files": 2, "bytes": 17}
+    assert (tmp_path / "out" / "css" / "style.css").read_bytes() == b"body{}"
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "a/../../evil.txt", "/etc/evil.txt", "..\\evil.txt", "C:/evil.txt"])
+def test_rejects_paths_escaping_the_target(tmp_path, name):
+    archive = make_zip(tmp_path / "evil.zip", {name: b"x"})
+    with pytest.raises(UnsafeArchiveError, match="escapes"):
+        safe_extract(archive, str(tmp_path / "out"))
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_rejects_symlinks(tmp_path):
+    link = zipfile.ZipInfo("link")
+    link.external_attr = (stat.S_IFLNK | 0o777) << 16
+    archive = make_zip(tmp_path / "link.zip", {link: b"/etc/passwd"})
+    with pytest.raises(UnsafeArchiveError, match="symlink"):
+        safe_extract(archive, str(tmp_path / "out"))
+
+
+def test_rejects_too_many_members(tmp_path):
+    archive = make_zip(tmp_path / "many.zip", {f"f{index}.txt": b"x" for index in range(5)})
+    with pytest.raises(UnsafeArchiveError, match="members"):
+        safe_extract(archive, str(tmp_path / "out"), max_members=4)
+
+
+def test_rejects_archives_over_the_size_limit(tmp_path):
+    archive = make_zip(tmp_path / "big.zip", {"a.bin": os.urandom(600), "b.bin": os.urandom(600)})
+    with pytest.raises(UnsafeArchiveError, match="byte limit"):
+        safe_extract(archive, str(tmp_path / "out"), max_total_bytes=1000)
+
+
+def test_rejects_zip_bombs(tmp_path):
+    archive = make_zip(tmp_path / "bomb.zip", {"bomb.txt": b"\0" * (8 * 1024 * 1024)})
+    with pytest.raises(UnsafeArchiveError, match="compression ratio"):
+        safe_extract(archive, str(tmp_path / "out"))
+
+
+def test_forged_header_sizes_dont_inflate_past_the_declared_size(tmp_path):
+    archive = make_zip(tmp_path / "forged.zip", {"bomb.txt": b"\0" * (8 * 1024 * 1024)})
+    # Shrink the declared size in the central directory so the header checks pass.
+    data = bytearray(open(archive, "rb").read())
+    central = data.rfind(b"PK\x01\x02")
+    data[central + 24:central + 28] = (1024).to_bytes(4, "little")
+    open(archive, "wb").write(bytes(data))
+    with pytest.raises((UnsafeArchiveError, zipfile.BadZipFile)):
+        safe_extract(archive, str(tmp_path / "out"))
+    assert os.path.getsize(tmp_path / "out" / "bomb.txt") <= 1024
+
+
+def test_round_trip_with_write_zip(tmp_path):
+    source = tmp_path / "site"
+    (source / "img").mkdir(parents=True)
+    (source / "index.html").write_text("<p>" + "hello " * 1000 + "</p>")
+    (source / "img" / "logo.png").write_bytes(os.urandom(2048))
+    archive = tmp_path / "site.zip"
+    write_zip(str(source), str(archive))
+    with zipfile.ZipFile(archive) as zipf:
+        assert zipf.testzip() is None
+    safe_extract(str(archive), str(tmp_path / "out"))
+    # Members keep the directory's own name as their top-level folder.
+    assert (tmp_path / "out" / "site" / "img" / "logo.png").read_bytes() == (source / "img" / "logo.png").read_bytes()
+
+
+@pytest.fixture
+def zip64_fallback(tmp_path, monkeypatch):
+    """A site that takes the ZIP64 fallback (as if it were over 4 GiB), read in 4 KiB pieces."""
+    monkeypatch.setattr(archive, "_needs_zip64", lambda members: True)
+    monkeypatch.setattr(archive, "READ_CHUNK_SIZE", 4096)
+    source = tmp_path / "site"
+    source.mkdir()
+    (source / "index.html").write_text("<p>hello</p>" * 5000)
+    (source / "photo.jpg").write_bytes(os.urandom(64 * 1024))
+    return source
+
+
+def test_zip64_fallback_streams_in_small_chunks(zip64_fallback, tmp_path):
+    chunks = list(archive.stream_zip(str(zip64_fallback)))
+
+    assert len(chunks) > 10 and max(len(chunk) for chunk in chunks) < 16 * 1024
+    (tmp_path / "site.zip").write_bytes(b"".join(chunks))
+    with zipfile.ZipFile(tmp_path / "site.zip") as zipf:
+        assert zipf.testzip() is None
+        assert zipf.getinfo("site/photo.jpg").compress_type == zipfile.ZIP_STORED
+        assert zipf.read("site/index.html") == (zip64_fallback / "index.html").read_bytes()
+
+
+def test_zip64_fallback_writes_straight_to_the_file(zip64_fallback, tmp_path):
+    size = write_zip(str(zip64_fallback), str(tmp_path / "site.zip"))
+
+    assert size == os.path.getsize(tmp_path / "site.zip")
+    safe_extract(str(tmp_path / "site.zip"), str(tmp_path / "out"))
+    assert (tmp_path / "out" / "site" / "photo.jpg").read_bytes() == (zip64_fallback / "photo.jpg").read_bytes()
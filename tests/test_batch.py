@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+
+import pytest
+
+import batch
+
+builder = pytest.importorskip("builder")
+crew = pytest.importorskip("crew")
+
+
+def test_concurrent_builds_never_share_a_registry(tmp_path, monkeypatch):
+    created, lock = [], threading.Lock()
+    in_use = {}
+
+    def new_registry():
+        registry = object()
+        with lock:
+            created.append(registry)
+        return registry
+
+    def run_website_build(prompt, output_dir, bus, registry, resume_key):
+        with lock:
+            assert id(registry) not in in_use, "two running builds got the same registry"
+            in_use[id(registry)] = prompt
+        time.sleep(0.05)
+        with lock:
+            del in_use[id(registry)]
+        os.makedirs(output_dir, exist_ok=True)
+        return {"prompt": prompt}
+
+    monkeypatch.setattr(crew, "new_registry", new_registry)
+    monkeypatch.setattr(builder, "run_website_build", run_website_build)
+    entries = [{"id": f"site-{index}", "prompt": f"site {index}"} for index in range(6)]
+
+    counts = batch.run_batch(entries, str(tmp_path), concurrency=3, log=lambda line: None)
+
+    assert counts == {"succeeded": 6, "failed": 0, "skipped": 0}
+    assert 1 <= len(created) <= 3  # One per build thread, reused by its later builds
@@ -0,0 +1,113 @@
+import threading
+from collections import Counter
+
+import pytest
+
+import cache
+from cache import CacheMissError, ResultCache, counted_execute, is_cacheable, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_keys_are_normalized():
+    assert make_key("scrape", url="HTTPS://Example.com/a/#top") == make_key("scrape", url="https://example.com/a")
+    assert make_key("search", query="  web   design ") == make_key("search", query="web design")
+    assert make_key("search", query="a", page=None) == make_key("search", query="a")
+    assert make_key("search", query="a") != make_key("scrape", query="a")
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    store.set("k", {"value": 1})
+    clock[0] += 59
+    assert store.get("k") == {"value": 1}
+    clock[0] += 2
+    assert store.get("k") is None
+    assert store.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for key in ("a", "b"):
+        store.set(key, key)
+        clock[0] += 1
+    store.get("a")  # 'b' is now the least recently used
+    clock[0] += 1
+    store.set("c", "c")
+    assert [store.get(key) for key in ("a", "b", "c")] == ["a", None, "c"]
+
+
+def test_size_budget_evicts(tmp_path, clock):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=250)
+    for index in range(5):
+        store.set(f"k{index}", "x" * 100)
+        clock[0] += 1
+    stats = store.stats()
+    assert stats["bytes"] <= 250
+    assert store.get("k4") is not None and store.get("k0") is None
+
+
+def test_get_or_compute_counts_hits_and_misses(tmp_path):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"))
+    calls = []
+
+    def compute(query):
+        calls.append(query)
+        return f"results for {query}"
+
+    assert store.get_or_compute("search", compute, query="a") == "results for a"
+    assert store.get_or_compute("search", compute, query=" a ") == "results for a"
+    assert calls == ["a"]
+    assert store.stats()["by_namespace"]["search"] == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.parametrize("value", [None, "", "  ", [], {}, "Error: rate limited", "error while fetching",
+                                   "An error occurred: timeout", "Failed to scrape the page",
+                                   "Traceback (most recent call last):\n ..."])
+def test_errors_and_empty_results_are_not_cached(tmp_path, value):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"))
+    assert not is_cacheable(value)
+    assert store.get_or_compute("search", lambda: value) == value
+    assert store.stats()["entries"] == 0
+
+
+def test_results_mentioning_errors_are_cached():
+    assert is_cacheable("Common errors in web design: ...")
+    assert is_cacheable({"results": []})
+
+
+def test_offline_miss_raises(tmp_path):
+    store = ResultCache(path=str(tmp_path / "cache.sqlite3"), offline=True)
+    with pytest.raises(CacheMissError):
+        store.get_or_compute("search", lambda: "fresh", query="a")
+
+
+def test_concurrent_builds_count_only_their_own_hits(tmp_path):
+    web_cache, llm_cache = ResultCache(str(tmp_path / "web.sqlite3")), ResultCache(str(tmp_path / "llm.sqlite3"))
+    web_cache.set(make_key("search", query="bakeries"), "cached", "search")
+    both_started = threading.Barrier(2)
+
+    def task(lookups):
+        both_started.wait()  # The builds run at the same time, on different threads
+        for query in lookups:
+            web_cache.get_or_compute("search", lambda query: f"fresh {query}", query=query)
+            llm_cache.get("prompt", "llm")
+        return "done"
+
+    builds = {"first": (Counter(), ["bakeries", "bakeries"]), "second": (Counter(), ["gyms"])}
+    threads = [threading.Thread(target=counted_execute(web_cache, counts, lambda task_, context: task_(context)),
+                                args=(task, lookups))
+               for counts, lookups in builds.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds["first"][0] == {"hits": 2}
+    assert builds["second"][0] == {"misses": 1}
+    assert web_cache.stats()["hits"] == 2 and web_cache.stats()["misses"] == 1  # Process-wide totals
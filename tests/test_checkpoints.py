@@ -0,0 +1,48 @@
+from cache import ResultCache
+from checkpoints import Checkpointer, checkpoint_keys
+from pipeline import TaskNode, run_task_dag
+
+
+class StubTask:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.description = f"do {name}"
+        self.fail = fail
+        self.runs = 0
+
+
+def execute(task, context):
+    task.runs += 1
+    if task.fail:
+        raise RuntimeError(f"{task.name} failed")
+    return f"out:{task.name}"
+
+
+def build(store, tasks, resume_key):
+    nodes = [
+        TaskNode("briefing", tasks["briefing"]),
+        TaskNode("designer", tasks["designer"], depends_on=("briefing",)),
+        TaskNode("developer", tasks["developer"], depends_on=("designer",), checkpoint=False),
+    ]
+    checkpointer = Checkpointer(store, checkpoint_keys(nodes, "a bakery site", resume_key=resume_key))
+    run_task_dag(nodes, execute=checkpointer.wrap(execute))
+    return checkpointer
+
+
+def test_retry_resumes_but_a_new_build_starts_fresh(tmp_path):
+    store = ResultCache(path=str(tmp_path / "checkpoints.sqlite3"))
+    tasks = {name: StubTask(name) for name in ("briefing", "designer", "developer")}
+    tasks["developer"].fail = True
+    try:
+        build(store, tasks, "job:1")
+    except RuntimeError:
+        pass
+
+    tasks["developer"].fail = False
+    retried = build(store, tasks, "job:1")
+    assert sorted(retried.resumed) == ["briefing", "designer"]
+    assert tasks["briefing"].runs == 1 and tasks["developer"].runs == 2
+
+    fresh = build(store, tasks, "job:2")  # Same prompt, different job
+    assert fresh.resumed == []
+    assert tasks["briefing"].runs == 2
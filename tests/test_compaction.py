@@ -0,0 +1,94 @@
+import json
+
+from compaction import MIN_INPUT_BUDGET, ContextCompactor, count_tokens, extract_artifact
+from pipeline import TaskNode
+
+
+def test_section_copy_is_never_trimmed():
+    copy = {"sections": {f"section{index}": {"headline": f"Headline {index}", "body": "word " * 80}
+                         for index in range(12)}}
+    design = {"colors": {"primary": "#123456"}, "style_notes": "calm and airy " * 200}
+    outputs = {
+        "designer": json.dumps(design),
+        "copywriter": "Here is the copy:\n" + json.dumps(copy, indent=2),
+        "analyst": "insight " * 1000,
+    }
+    compactor = ContextCompactor(budgets={"developer": 1000})
+
+    context = compactor.build_context(TaskNode("developer", None, ("designer", "copywriter", "analyst")), outputs)
+
+    parts = dict(part.split("\n", 1) for part in context.split("\n\n## "))
+    assert json.loads(parts["section_copy (from 'copywriter', JSON)"]) == extract_artifact("copywriter", outputs["copywriter"])
+    # The metadata inputs are still cut, to the per-input floor once the copy used up the budget.
+    assert count_tokens(parts["## design_tokens (from 'designer', JSON)"]) <= MIN_INPUT_BUDGET
+    assert count_tokens(parts["Output of 'analyst'"]) <= MIN_INPUT_BUDGET
+    assert compactor.rows()[0]["saved"] > 0
+
+
+# Shapes seen in real agent answers: numbers, nested objects, feature lists, prose around the JSON.
+DESIGNER_OUTPUT = """Here are the design tokens for the bakery:
+```json
+{
+  "colors": {"primary": "#8B4513", "accent": {"hex": "#F4A460", "usage": "buttons"}},
+  "fonts": {"heading": {"family": "Playfair Display", "weight": 700}, "body": "Lato"},
+  "spacing": {"section": 96, "gap": "1.5rem", "scale": [4, 8, 16, 32]},
+  "sections": [{"name": "hero", "layout": "split"}, {"name": "menu", "columns": 3}, "footer"],
+  "style_notes": ["warm", "rustic", "generous whitespace"]
+}
+```"""
+
+COPYWRITER_OUTPUT = json.dumps({"sections": [
+    {"name": "hero", "headline": "Bread worth waking up for", "cta": "See the menu"},
+    {"name": "features", "headline": "Why us", "items": ["Sourdough since 1982", "Organic flour"], "count": 2},
+]})
+
+
+def test_realistic_design_tokens_keep_every_field():
+    tokens = extract_artifact("designer", DESIGNER_OUTPUT)
+
+    assert tokens["spacing"] == {"section": 96, "gap": "1.5rem", "scale": [4, 8, 16, 32]}
+    assert tokens["colors"]["accent"] == {"hex": "#F4A460", "usage": "buttons"}
+    assert tokens["fonts"]["heading"] == {"family": "Playfair Display", "weight": 700}
+    assert tokens["sections"] == ["hero", "menu", "footer"]
+    assert tokens["style_notes"] == "warm; rustic; generous whitespace"
+
+
+def test_section_copy_given_as_a_list_is_keyed_by_section():
+    copy = extract_artifact("copywriter", COPYWRITER_OUTPUT)
+
+    assert copy["sections"]["hero"] == {"headline": "Bread worth waking up for", "cta": "See the menu"}
+    assert copy["sections"]["features"]["items"] == ["Sourdough since 1982", "Organic flour"]
+
+
+def test_brand_brief_prose_fields_accept_lists_and_objects():
+    brief = extract_artifact("briefing", json.dumps({
+        "brand_name": "Crumb & Co",
+        "audience": ["young families", "commuters"],
+        "tone": {"voice": "friendly", "formality": "low"},
+        "key_messages": "Baked fresh every morning",
+        "competitors": [{"name": "Loaf", "strength": "price"}],
+    }))
+
+    assert brief == {
+        "brand_name": "Crumb & Co",
+        "audience": "young families; commuters",
+        "tone": "voice: friendly; formality: low",
+        "key_messages": ["Baked fresh every morning"],
+        "competitors": ["name: Loaf; strength: price"],
+    }
+
+
+def test_a_field_that_does_not_fit_is_dropped_alone():
+    tokens = extract_artifact("designer", json.dumps({"colors": ["#fff", "#000"], "fonts": {"body": "Lato"}}))
+
+    assert tokens == {"fonts": {"body": "Lato"}}
+    assert extract_artifact("designer", json.dumps({"colors": ["#fff"]})) is None
+
+
+def test_developer_gets_the_design_tokens_of_a_realistic_designer_answer():
+    outputs = {"designer": DESIGNER_OUTPUT, "copywriter": COPYWRITER_OUTPUT, "analyst": "insight " * 1000}
+
+    context = ContextCompactor().build_context(TaskNode("developer", None, ("designer", "copywriter", "analyst")), outputs)
+
+    assert "## design_tokens (from 'designer', JSON)" in context
+    assert '"section":96' in context and "Playfair Display" in context
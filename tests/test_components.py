@@ -0,0 +1,64 @@
+import pytest
+
+import components
+import ingest
+from compaction import count_tokens
+
+
+class FakeCollection:
+    """In-memory stand-in for the Chroma collection (the default embedding needs a download)."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def count(self):
+        return len(self.entries)
+
+    def get(self, ids, include=()):
+        return {"ids": [entry_id for entry_id in ids if entry_id in self.entries]}
+
+    def add(self, ids, documents, metadatas):
+        self.entries.update(zip(ids, metadatas))
+
+    def query(self, query_texts, n_results, where):
+        matches = [(entry_id, metadata) for entry_id, metadata in self.entries.items()
+                   if metadata["section_type"] == where["section_type"]][:n_results]
+        return {"ids": [[entry_id for entry_id, _ in matches]], "metadatas": [[metadata for _, metadata in matches]]}
+
+
+@pytest.fixture
+def collection(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingest, "CHROMA_PATH", str(tmp_path))  # Where chroma_lock() keeps its lock file
+    collection = FakeCollection()
+    monkeypatch.setattr(components, "get_components_collection", lambda: collection)
+    return collection
+
+
+def test_harvest_repairs_fragments_before_splitting_sections(collection):
+    page = (
+        "<style>.hero h1 { color: red } footer p { margin: 0 }</style>"
+        "<section class='hero'><h1>Fresh bread every morning</h1><p>Baked in small batches since 1982.</p></section>"
+        "<footer><p>Contact us at the corner of Main Street and Elm Avenue.</p></footer>"
+    )
+
+    assert components.harvest_sections(page) == 2
+    by_type = {metadata["section_type"]: metadata for metadata in collection.entries.values()}
+    assert by_type["hero"]["css"] == ".hero h1{color:red}"
+    assert by_type["footer"]["css"] == "footer p{margin:0}"
+    assert components.harvest_sections(page) == 0  # Identical sections are stored once
+
+
+def test_references_are_whole_sections_within_budget(collection):
+    big_hero = "<section class='hero'>" + "<p>long hero copy</p>" * 300 + "</section>"
+    footer = "<footer><p>Small footer</p></footer>"
+    collection.add(ids=["hero:1", "footer:1"], documents=["", ""], metadatas=[
+        {"section_type": "hero", "html": big_hero, "css": ""},
+        {"section_type": "footer", "html": footer, "css": "footer{padding:1rem}"},
+    ])
+
+    references = components.find_references({"sections": ["hero", "footer"]}, budget=200)
+
+    assert count_tokens(big_hero) > 200
+    assert [(reference["id"], reference["html"], reference["css"]) for reference in references] == [
+        ("footer:1", footer, "footer{padding:1rem}")
+    ]
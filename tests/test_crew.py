@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import crew
+import environment
+
+NAMES = ("CREW_TEST_KEPT", "CREW_TEST_DELETED", "CREW_TEST_REAL")
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    for name in NAMES + (environment.LOADED_KEYS_VARIABLE,):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(crew, "_env_file_digest", None)
+    path = tmp_path / ".env"
+    path.write_text("CREW_TEST_KEPT=1\nCREW_TEST_DELETED=2\nCREW_TEST_REAL=from-file\n")
+    return path
+
+
+def test_key_deleted_from_env_file_is_unset_after_startup_load(env_file, monkeypatch):
+    monkeypatch.setenv("CREW_TEST_REAL", "from-environment")
+    environment.load_environment(str(env_file))  # What main.py and the workers do at startup
+    crew._refresh_environment(str(env_file))
+    assert os.environ["CREW_TEST_DELETED"] == "2"
+
+    env_file.write_text("CREW_TEST_KEPT=changed\n")
+    crew._refresh_environment(str(env_file))
+
+    assert "CREW_TEST_DELETED" not in os.environ
+    assert os.environ["CREW_TEST_KEPT"] == "changed"
+    assert os.environ["CREW_TEST_REAL"] == "from-environment"  # The real environment is never touched
+
+
+def test_spawned_worker_knows_which_keys_came_from_env_file(env_file, monkeypatch):
+    environment.load_environment(str(env_file))
+    inherited = dict(os.environ)  # A spawned worker starts with the parent's environment
+    monkeypatch.setattr(os, "environ", inherited)
+
+    env_file.write_text("CREW_TEST_KEPT=1\n")
+    environment.load_environment(str(env_file))
+
+    assert "CREW_TEST_DELETED" not in inherited
+    assert "CREW_TEST_REAL" not in inherited
+
+
+def test_fingerprint_changes_when_an_api_key_is_removed(env_file, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    env_file.write_text("OPENAI_API_KEY=sk-test\n")
+    before = crew.config_fingerprint(str(env_file))
+    env_file.write_text("")
+    after = crew.config_fingerprint(str(env_file))
+
+    assert before != after
+    assert "OPENAI_API_KEY" not in os.environ
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from feedback import FeedbackStore, _update_then_insert, topic_counts
+
+ROWS = [
+    {"kind": "request", "category": "features", "topic": "dark mode", "text": "Dark mode please", "created_at": 10.0},
+    {"kind": "request", "category": "features", "topic": "dark mode", "text": "Need dark mode", "created_at": 30.0},
+    {"kind": "complaint", "category": "pricing", "topic": "too expensive", "text": "Too expensive", "created_at": 20.0},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeedbackStore(f"sqlite:///{tmp_path / 'feedback.sqlite3'}")
+    store.add_feedback(ROWS)
+    return store
+
+
+def test_read_only_query_returns_rows(store):
+    rows = store.read_only_query("SELECT topic, count FROM feedback_topic_counts ORDER BY count DESC;", limit=1)
+    assert rows == [{"topic": "dark mode", "count": 2}]
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM user_feedback",
+    "SELECT 1; DELETE FROM user_feedback",
+    "UPDATE feedback_topic_counts SET count = 0",
+])
+def test_read_only_query_rejects_statements_other_than_select(store, sql):
+    with pytest.raises(ValueError):
+        store.read_only_query(sql)
+
+
+def test_read_only_query_is_enforced_by_the_database(store):
+    # Passes the SELECT/WITH check, but writes; the read-only connection refuses it.
+    with pytest.raises(OperationalError):
+        store.read_only_query("WITH doomed AS (SELECT id FROM user_feedback) DELETE FROM user_feedback")
+    assert store.count() == 3
+    assert len(store.read_only_query("SELECT id FROM user_feedback")) == 3
+
+
+def test_in_memory_store_stays_writable_after_a_query():
+    store = FeedbackStore("sqlite://")
+    store.add_feedback(ROWS[:1])
+    store.read_only_query("SELECT * FROM user_feedback")
+    store.add_feedback(ROWS[1:])
+    assert store.count() == 3
+
+
+def test_portable_upsert_adds_counts_and_keeps_the_latest(store):
+    with store.engine.begin() as connection:
+        _update_then_insert(connection, topic_counts, [
+            {"kind": "request", "category": "features", "topic": "dark mode", "count": 3, "last_seen": 5.0},
+            {"kind": "praise", "category": "design", "topic": "clean layout", "count": 1, "last_seen": 40.0},
+        ], ("kind", "category", "topic"), ("count",), ("last_seen",))
+
+    with store.engine.connect() as connection:
+        rows = {row.topic: (row.count, row.last_seen) for row in connection.execute(select(topic_counts))}
+    assert rows == {"dark mode": (5, 30.0), "too expensive": (1, 20.0), "clean layout": (1, 40.0)}
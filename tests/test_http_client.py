@@ -0,0 +1,172 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+from http_client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    # path -> list of statuses to answer in turn (the last one repeats)
+    script = {}
+    hits = {}
+    lock = threading.Lock()
+
+    def _answer(self):
+        if self.path.startswith("/page"):
+            body = b"<html><body><p>Fresh bread every morning</p></body></html>"
+            with self.lock:
+                self.hits["/page"] = self.hits.get("/page", 0) + 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = self.path.split("?")[0]
+        with self.lock:
+            count = self.hits[path] = self.hits.get(path, 0) + 1
+        statuses = self.script.get(path, [200])
+        status = statuses[min(count, len(statuses)) - 1]
+        if path == "/slow":
+            time.sleep(0.3)
+        body = f"{self.path} #{count}".encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.script, Handler.hits = {}, {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(max_retries=2, backoff_base=0.01, host_apis={})
+    yield client
+    client.close()
+
+
+def test_get_is_retried_on_5xx(server, client):
+    Handler.script["/flaky"] = [503, 503, 200]
+
+    response = client.request("GET", server + "/flaky")
+
+    assert response.status_code == 200
+    assert Handler.hits["/flaky"] == 3
+    assert client.stats["retries"] == 2
+
+
+def test_post_is_sent_once(server, client):
+    Handler.script["/jobs"] = [503, 200]
+
+    response = client.request("POST", server + "/jobs", json={"url": "https://example.com"})
+
+    assert response.status_code == 503
+    assert Handler.hits["/jobs"] == 1
+    assert client.stats["retries"] == 0
+
+
+def test_lookup_post_is_retried(server, client, monkeypatch):
+    monkeypatch.setattr(http_client, "COALESCE_POST_HOSTS", {"127.0.0.1"})
+    Handler.script["/search"] = [429, 200]
+
+    response = client.request("POST", server + "/search", json={"q": "gyms"})
+
+    assert response.status_code == 200
+    assert Handler.hits["/search"] == 2
+
+
+def test_identical_concurrent_gets_share_one_round_trip(server, client):
+    responses = [None] * 4
+
+    def fetch(index):
+        responses[index] = client.request("GET", server + "/slow", params={"q": "a"})
+
+    threads = [threading.Thread(target=fetch, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)  # All start while the first one is still in flight
+    for thread in threads:
+        thread.join()
+
+    assert Handler.hits["/slow"] == 1
+    assert client.stats == {"requests": 1, "coalesced": 3, "retries": 0}
+    assert {response.text for response in responses} == {"/slow?q=a #1"}
+    # Every caller gets its own Response object
+    assert len({id(response) for response in responses}) == 4
+    responses[0].headers["X-Mutated"] = "1"
+    assert all("X-Mutated" not in response.headers for response in responses[1:])
+
+
+def test_install_routes_module_level_requests_through_the_client(server, client):
+    try:
+        assert http_client.install(client) is client
+        assert requests.api.request == client.request
+        response = requests.get(server + "/plain")
+    finally:
+        http_client.uninstall()
+
+    assert response.status_code == 200
+    assert client.stats["requests"] == 1
+    assert requests.api.request is http_client._original_request
+    assert requests.request is http_client._original_request
+    assert requests.Session.request is http_client._original_session_request
+
+
+def test_install_routes_requests_on_other_sessions_through_the_client(server, client):
+    Handler.script["/flaky"] = [503, 200]
+    session = requests.Session()
+    session.headers["X-Api-Key"] = "secret"
+    try:
+        http_client.install(client)
+        response = session.get(server + "/flaky", timeout=5)
+    finally:
+        http_client.uninstall()
+        session.close()
+
+    assert response.status_code == 200
+    assert client.stats == {"requests": 1, "coalesced": 0, "retries": 1}
+
+
+def test_scrape_website_tool_goes_through_the_client(server, client, monkeypatch):
+    crewai_tools = pytest.importorskip("crewai_tools")
+    # safe_get() refuses private addresses such as the local test server otherwise.
+    monkeypatch.setenv("CREWAI_TOOLS_ALLOW_UNSAFE_PATHS", "true")
+    try:
+        http_client.install(client)
+        text = crewai_tools.ScrapeWebsiteTool().run(website_url=server + "/page")
+    finally:
+        http_client.uninstall()
+
+    assert "Fresh bread every morning" in text
+    assert Handler.hits["/page"] == 1
+    assert client.stats["requests"] == 1
+
+
+def test_install_respects_opt_out(client, monkeypatch):
+    monkeypatch.setenv("HTTP_SHARED_CLIENT", "0")
+
+    http_client.install(client)
+
+    assert requests.api.request is http_client._original_request
+    assert requests.Session.request is http_client._original_session_request
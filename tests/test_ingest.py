@@ -0,0 +1,77 @@
+import hashlib
+
+import pytest
+
+import ingest
+
+chromadb = pytest.importorskip("chromadb")
+
+
+class HashEmbedding(chromadb.EmbeddingFunction):
+    """Deterministic offline embedding (Chroma's default one needs a model download)."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[byte / 255 for byte in hashlib.sha256(text.encode()).digest()[:8]] for text in input]
+
+    @staticmethod
+    def name():
+        return "test-hash"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding()
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CHROMA_PATH", str(tmp_path / "db"))
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection(
+        ingest.UPLOADS_COLLECTION, embedding_function=HashEmbedding(), metadata={"hnsw:space": "cosine"})
+    monkeypatch.setattr(ingest, "get_uploads_collection", lambda: collection)
+    return collection
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_same_bytes_are_ingested_once(collection, tmp_path):
+    text = "Opening hours: 7am to 3pm.\n" * 100
+
+    first = ingest.ingest_upload(write(tmp_path / "menu.txt", text))
+    count = collection.count()
+    again = ingest.ingest_upload(write(tmp_path / "renamed.txt", text))
+
+    assert first["skipped"] is False and first["chunks"] > 1
+    assert again == {"content_hash": first["content_hash"], "chunks": 0, "skipped": True}
+    assert collection.count() == count
+
+
+def test_empty_csv_is_recorded_once_and_never_searched(collection, tmp_path):
+    empty = ingest.ingest_upload(write(tmp_path / "empty.csv", ""))
+    ingest.ingest_upload(write(tmp_path / "prices.csv", "item,price\nbread,3\ncroissant,2\n"))
+
+    assert empty["chunks"] == 0 and not empty["skipped"]
+    assert ingest.ingest_upload(write(tmp_path / "empty-again.csv", ""))["skipped"]
+    assert collection.get(where={"content_hash": empty["content_hash"]})["ids"] == [f"{empty['content_hash']}:empty"]
+    for where in (ingest.search_filter((".csv",)), ingest.search_filter(),
+                  ingest.search_filter(content_hash=empty["content_hash"])):
+        found = collection.query(query_texts=["(no text) empty.csv"], n_results=10, where=where)
+        assert all(metadata["chunk"] >= 0 for metadata in found["metadatas"][0])
+        assert "empty.csv" not in {metadata["source"] for metadata in found["metadatas"][0]}
+    assert empty["content_hash"] not in ingest.indexed_content_hashes()
+
+
+def test_indexed_hashes_are_read_page_by_page(collection, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "PAGE_SIZE", 2)
+    hashes = [ingest.ingest_upload(write(tmp_path / f"notes-{index}.txt", f"note number {index}"))["content_hash"]
+              for index in range(5)]
+
+    assert ingest.indexed_content_hashes() == sorted(hashes)
@@ -0,0 +1,116 @@
+import json
+import uuid
+
+import pytest
+from langchain_core.outputs import LLMResult
+
+from instrumentation import (
+    InstrumentationCallbackHandler,
+    RunTrace,
+    annotate,
+    instrumented_execute,
+    record_tool_call,
+)
+from pipeline import TaskNode, run_task_dag
+
+
+class Agent:
+    def __init__(self, role):
+        self.role = role
+
+
+class FakeTask:
+    """Stand-in for a crewai task: one LLM completion and 'searches' tool calls."""
+
+    def __init__(self, role, searches=1, error=None):
+        self.agent = Agent(role)
+        self.searches = searches
+        self.error = error
+
+    def run(self, llm_handler):
+        run_id = uuid.uuid4()
+        llm_handler.on_chat_model_start({}, [[]], run_id=run_id)
+        llm_handler.on_llm_end(
+            LLMResult(generations=[[]], llm_output={"token_usage": {"prompt_tokens": 1000, "completion_tokens": 200}}),
+            run_id=run_id,
+        )
+        for _ in range(self.searches):
+            with record_tool_call("Search the internet"):
+                annotate(bytes=512, retries=1)
+        if self.error is not None:
+            with record_tool_call("Scrape website"):
+                raise self.error
+        return f"done by {self.agent.role}"
+
+
+@pytest.fixture
+def run():
+    handler = InstrumentationCallbackHandler(model_name="gpt-4o")
+    trace = RunTrace(run_id="run-1")
+    nodes = [TaskNode("briefing", FakeTask("Brand strategist", searches=2)),
+             TaskNode("developer", FakeTask("Web developer", searches=1), depends_on=("briefing",))]
+    run_task_dag(nodes, execute=instrumented_execute(trace, lambda task, context: task.run(handler)))
+    return trace
+
+
+def test_records_are_attributed_to_task_and_agent(run):
+    by_key = {}
+    for record in run.records:
+        by_key.setdefault((record["task"], record["type"]), []).append(record)
+
+    assert sorted(by_key) == [("briefing", "llm"), ("briefing", "task"), ("briefing", "tool"),
+                              ("developer", "llm"), ("developer", "task"), ("developer", "tool")]
+    assert {record["agent"] for record in by_key["briefing", "tool"]} == {"Brand strategist"}
+    assert len(by_key["briefing", "tool"]) == 2
+    llm = by_key["developer", "llm"][0]
+    assert (llm["tokens_in"], llm["tokens_out"], llm["cost_usd"]) == (1000, 200, 0.0045)
+    assert all(record["run_id"] == "run-1" and record["wall_ms"] >= 0 for record in run.records)
+    task = by_key["developer", "task"][0]
+    assert task["start_ms"] >= by_key["briefing", "task"][0]["start_ms"] + by_key["briefing", "task"][0]["wall_ms"]
+
+
+def test_summary_rows_and_timeline(run):
+    rows = run.summary_rows()
+    search = next(row for row in rows if row["task"] == "briefing" and row["type"] == "tool")
+
+    assert len(rows) == 6
+    assert [row["wall_ms"] for row in rows] == sorted((row["wall_ms"] for row in rows), reverse=True)
+    assert {key: search[key] for key in ("name", "agent", "calls", "bytes", "retries", "errors")} == {
+        "name": "Search the internet", "agent": "Brand strategist", "calls": 2, "bytes": 1024, "retries": 2, "errors": 0,
+    }
+    timeline = run.timeline()
+    assert len(timeline) == len(run.records)
+    assert set(timeline[0]) == {"lane", "name", "start_ms", "end_ms"}
+    assert {row["lane"] for row in timeline} == {"briefing", "developer"}
+    assert "tool: Search the internet" in {row["name"] for row in timeline}
+    assert all(row["end_ms"] >= row["start_ms"] for row in timeline)
+
+
+def test_trace_is_appended_as_jsonl(run, tmp_path):
+    path = tmp_path / "traces" / "runs.jsonl"
+
+    run.write_jsonl(str(path))
+    run.write_jsonl(str(path))
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2 * len(run.records)
+    assert json.loads(lines[0]).keys() == run.records[0].keys()
+    assert json.loads(lines[-1]) == run.records[-1]
+
+
+def test_failed_tool_and_task_record_the_error():
+    trace = RunTrace()
+    handler = InstrumentationCallbackHandler()
+    nodes = [TaskNode("developer", FakeTask("Web developer", searches=0, error=TimeoutError("read timed out")))]
+
+    with pytest.raises(TimeoutError):
+        run_task_dag(nodes, execute=instrumented_execute(trace, lambda task, context: task.run(handler)))
+
+    errors = {record["type"]: record["error"] for record in trace.records if record["error"]}
+    assert errors == {"tool": "TimeoutError: read timed out", "task": "TimeoutError: read timed out"}
+
+
+def test_calls_outside_a_build_are_not_recorded():
+    with record_tool_call("Search the internet") as record:
+        annotate(bytes=10)
+    assert record is None
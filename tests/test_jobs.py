@@ -0,0 +1,89 @@
+import os
+import signal
+import time
+
+from jobs import JobStore, WorkerPool
+from progress import ProgressEvent
+
+
+def test_identical_prompts_are_deduplicated(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id, deduplicated = store.submit("A bakery  website")
+    assert not deduplicated
+    assert store.submit(" A bakery website ") == (job_id, True)
+
+
+def test_events_of_finished_jobs_are_pruned(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    finished, _ = store.submit("finished build")
+    running, _ = store.submit("running build")
+    for job_id in (finished, running):
+        store.append_events(job_id, [ProgressEvent("step", "briefing", "thinking")] * 3)
+    store.finish(finished, "succeeded", result={})
+
+    assert store.prune_events(retention_seconds=3600) == 0  # Still within the retention period
+    assert store.prune_events(retention_seconds=0) == 3
+    assert store.events_since(finished) == []
+    assert len(store.events_since(running)) == 3
+    assert store.get(finished)["status"] == "succeeded"
+
+
+def test_only_failed_or_cancelled_jobs_are_retried(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id, _ = store.submit("flaky build")
+    assert not store.retry(job_id)  # Still queued
+
+    store.request_cancel(job_id)
+    store.append_events(job_id, [ProgressEvent("step", "briefing", "thinking")])
+    assert store.retry(job_id)
+
+    job = store.get(job_id)
+    assert (job["status"], job["cancel_requested"], job["finished"]) == ("queued", 0, None)
+    assert store.events_since(job_id) == []
+    assert store.claim()["id"] == job_id
+
+
+def claim_and_hang(db_path):
+    """Worker target standing in for a build that never finishes on its own."""
+    store = JobStore(db_path)
+    while store.claim() is None:
+        time.sleep(0.05)
+    time.sleep(60)
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_dead_worker_is_replaced_and_its_job_requeued(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db_path)
+    job_id, _ = store.submit("a build that crashes its worker")
+    pool = WorkerPool(workers=1, db_path=db_path, monitor_interval=0.1, target=claim_and_hang).start()
+    try:
+        wait_for(lambda: store.get(job_id)["status"] == "running")
+        crashed_pid = store.get(job_id)["worker_pid"]
+        os.kill(crashed_pid, signal.SIGKILL)  # As the OOM killer would
+
+        # The replacement worker picks the requeued job up again.
+        wait_for(lambda: store.get(job_id)["worker_pid"] not in (None, crashed_pid))
+        assert store.get(job_id)["status"] == "running"
+        assert pool.alive() == 1 and pool.processes[0].pid != crashed_pid
+        assert store.submit("a build that crashes its worker") == (job_id, True)
+    finally:
+        pool.stop()
+
+
+def test_orphaned_job_with_a_cancel_request_is_cancelled(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id, _ = store.submit("cancelled before its worker died")
+    store.claim()
+    store.request_cancel(job_id)
+    with store._connect() as connection:
+        connection.execute("UPDATE jobs SET worker_pid = 0 WHERE id = ?", (job_id,))  # No such process
+
+    assert store.requeue_orphans() == 1
+    assert store.get(job_id)["status"] == "cancelled"
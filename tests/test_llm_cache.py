@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+crewai = pytest.importorskip("crewai")
+
+from cache import CacheMissError  # noqa: E402
+from instrumentation import InstrumentationCallbackHandler, RunTrace, StreamingCallbackHandler, instrumented_execute  # noqa: E402
+from llm_cache import ChatModelLLM, build_completion_cache, build_llm  # noqa: E402
+from pipeline import TaskNode, run_task_dag  # noqa: E402
+from progress import ProgressBus, tracked_execute  # noqa: E402
+from rate_limits import get_rate_limiter  # noqa: E402
+
+LLM_CONFIG = {"model": "gpt-4o", "temperature": 0.7}
+
+
+@pytest.fixture
+def fake_llm_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("LLM_CACHE_MODE", "read_write")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.delenv("LLM_CACHE_SEMANTIC", raising=False)
+
+
+def make_agent(llm):
+    return crewai.Agent(role="Copywriter", goal="Write copy", backstory="Writes short copy.",
+                        llm=llm, allow_delegation=False, verbose=False)
+
+
+def run_build(agent, bus, trace):
+    task = crewai.Task(description="Write a hero title for a bakery.", expected_output="One line.", agent=agent)
+    execute = lambda task, context: task.agent.execute_task(task)  # noqa: E731
+    result = run_task_dag([TaskNode("copywriter", task)], execute=tracked_execute(bus, instrumented_execute(trace, execute)))
+    return result.outputs["copywriter"]
+
+
+def test_agents_keep_the_llm(fake_llm_env):
+    llm = build_llm(LLM_CONFIG, build_completion_cache())
+    assert isinstance(llm, ChatModelLLM)
+    assert make_agent(llm).llm is llm
+    assert llm.chat_model.rate_limiter is get_rate_limiter("openai")
+
+
+def test_agent_completions_use_cache_and_callbacks(fake_llm_env):
+    completion_cache = build_completion_cache()
+    llm = build_llm(LLM_CONFIG, completion_cache,
+                    callbacks=[StreamingCallbackHandler(), InstrumentationCallbackHandler(LLM_CONFIG["model"])])
+    agent = make_agent(llm)
+
+    first_bus, first_trace = ProgressBus(), RunTrace()
+    first = run_build(agent, first_bus, first_trace)
+    second_bus, second_trace = ProgressBus(), RunTrace()
+    second = run_build(agent, second_bus, second_trace)
+
+    assert first == second and first.startswith("Fake completion for")
+    assert completion_cache.stats() == {"exact_hits": 1, "semantic_hits": 0, "misses": 1}
+
+    # Instrumentation: one LLM record per build, the second served from cache.
+    llm_records = [[record for record in trace.records if record["type"] == "llm"] for trace in (first_trace, second_trace)]
+    assert [[record["cache_hit"] for record in records] for records in llm_records] == [[False], [True]]
+    assert llm_records[0][0]["task"] == "copywriter" and llm_records[0][0]["agent"] == "Copywriter"
+
+    # Streaming: tokens of the real completion reached the build's bus.
+    tokens = [event.text for event in first_bus.drain() if event.kind == "token"]
+    assert "".join(tokens).startswith("Thought: I now know the final answer")
+
+
+def test_replay_mode_raises_on_miss(fake_llm_env, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+    llm = build_llm(LLM_CONFIG, build_completion_cache())
+    with pytest.raises(CacheMissError):
+        llm.call([{"role": "user", "content": "never seen before"}])
+
+
+def test_stop_words_are_applied(fake_llm_env):
+    llm = build_llm(LLM_CONFIG, None)
+    llm.stop = ["Final Answer:"]
+    assert llm.call("hello") == "Thought: I now know the final answer"
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+
+import pytest
+
+import ingest
+import maintenance
+
+chromadb = pytest.importorskip("chromadb")
+
+
+def test_rebuild_waits_for_readers(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CHROMA_PATH", str(tmp_path))
+    order = []
+    release = threading.Event()
+
+    def reader():
+        with ingest.chroma_lock():
+            order.append("reading")
+            release.wait(5)
+            order.append("read")
+
+    def rebuild():
+        with ingest.chroma_lock(exclusive=True):
+            order.append("rebuilding")
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    while not order:
+        time.sleep(0.01)
+    with ingest.chroma_lock():  # Shared locks don't exclude each other
+        pass
+    rebuilder = threading.Thread(target=rebuild)
+    rebuilder.start()
+    time.sleep(0.2)
+    assert order == ["reading"]
+    release.set()
+    thread.join()
+    rebuilder.join()
+    assert order == ["reading", "read", "rebuilding"]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CHROMA_PATH", str(tmp_path))
+    monkeypatch.setattr(ingest, "_collection", None)
+    monkeypatch.setenv("CHROMA_UPLOAD_TTL", "30")
+    now, old = time.time(), time.time() - 90 * 86400
+    with ingest.chroma_lock():
+        ingest.get_uploads_collection().add(
+            ids=[f"file:{index}" for index in range(6)],
+            embeddings=[[1.0, float(index), 0.5] for index in range(6)],
+            documents=[f"chunk {index}" for index in range(6)],
+            metadatas=[{"content_hash": "file", "chunk": index, "ingested_at": old if index < 4 else now}
+                       for index in range(6)],
+        )
+    return str(tmp_path)
+
+
+def test_rebuild_makes_every_process_reopen_the_collection(store):
+    stale = ingest.get_uploads_collection()
+
+    report = maintenance.run_maintenance(store, log=lambda line: None)
+
+    assert report["evicted"][ingest.UPLOADS_COLLECTION] == 4
+    assert report["rebuilt"] == [ingest.UPLOADS_COLLECTION]
+    assert ingest.collection_generation(store) == 1
+    fresh = ingest.get_uploads_collection()
+    assert fresh is not stale and fresh.id != stale.id
+    assert sorted(fresh.get()["ids"]) == ["file:4", "file:5"]
+
+
+def test_only_one_process_runs_the_scheduled_maintenance(store, monkeypatch):
+    import fcntl
+
+    monkeypatch.setenv("CHROMA_MAINTENANCE_INTERVAL", "24")
+    with open(f"{store}/{maintenance.RUN_LOCK_FILE}", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # Another worker is running it
+        assert maintenance.maybe_run_maintenance(store) is None
+
+    assert maintenance.maybe_run_maintenance(store)["evicted"][ingest.UPLOADS_COLLECTION] == 4
+    assert maintenance.maybe_run_maintenance(store) is None  # Not due again for a day
+
+
+def hold_lock(exclusive, path, release, held):
+    with ingest.chroma_lock(exclusive=exclusive, path=path):
+        held.set()
+        release.wait(5)
+
+
+def test_eviction_waits_for_a_rebuild_in_another_process(store):
+    release, held = threading.Event(), threading.Event()
+    rebuild = threading.Thread(target=hold_lock, args=(True, store, release, held))
+    rebuild.start()
+    held.wait(5)
+    result = {}
+    evictor = threading.Thread(target=lambda: result.update(maintenance.evict_expired(maintenance._client(store), path=store)))
+    evictor.start()
+    time.sleep(0.2)
+
+    assert result == {}  # Still waiting for the exclusive lock
+    release.set()
+    rebuild.join()
+    evictor.join()
+    assert result[ingest.UPLOADS_COLLECTION] == 4
+
+
+def test_orphans_are_removed_only_while_nobody_uses_the_store(store, monkeypatch):
+    calls = []
+    monkeypatch.setattr(maintenance, "remove_orphaned_segments", lambda path: calls.append(time.time()) or 0)
+    release, held = threading.Event(), threading.Event()
+    reader = threading.Thread(target=hold_lock, args=(False, store, release, held))
+    reader.start()
+    held.wait(5)
+    threading.Timer(0.3, release.set).start()
+    released_after = time.time() + 0.3
+
+    maintenance.run_maintenance(store, log=lambda line: None)
+    reader.join()
+
+    assert calls and calls[0] >= released_after - 0.05
+
+
+def test_only_stale_unreferenced_segments_are_orphans(store):
+    segment = os.path.join(store, "0" * 8 + "-0000-0000-0000-" + "0" * 12)
+    os.makedirs(segment)
+    with open(os.path.join(segment, "header.bin"), "wb") as f:
+        f.write(b"x" * 100)
+
+    assert maintenance.remove_orphaned_segments(store) == 0  # Just created: may belong to a new collection
+    assert os.path.isdir(segment)
+    assert maintenance.remove_orphaned_segments(store, grace_seconds=0) >= 100
+    assert not os.path.exists(segment)
+
+
+def test_failed_scheduled_run_is_logged(store, monkeypatch, caplog):
+    monkeypatch.setenv("CHROMA_MAINTENANCE_INTERVAL", "24")
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(maintenance, "run_maintenance", broken)
+
+    assert maintenance.maybe_run_maintenance(store) is None
+    assert "Chroma maintenance failed" in caplog.text and "disk full" in caplog.text
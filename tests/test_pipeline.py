@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from pipeline import TaskNode, current_task_name, run_task_dag, topological_order
+
+
+class StubTask:
+    """Stand-in for crewai.Task: records its context and sleeps for 'delay' seconds."""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.context = None
+        self.task_name = None
+
+    def run(self, context):
+        self.context = context
+        self.task_name = current_task_name.get()
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"out:{self.name}"
+
+
+def execute(task, context):
+    return task.run(context)
+
+
+def graph(**delays):
+    tasks = {name: StubTask(name, delay) for name, delay in delays.items()}
+    nodes = [
+        TaskNode("briefing", tasks["briefing"]),
+        TaskNode("designer", tasks["designer"], depends_on=("briefing",)),
+        TaskNode("copywriter", tasks["copywriter"], depends_on=("briefing",)),
+        TaskNode("analyst", tasks["analyst"]),
+        TaskNode("developer", tasks["developer"], depends_on=("designer", "copywriter", "analyst")),
+    ]
+    return nodes, tasks
+
+
+def test_topological_order_respects_dependencies():
+    nodes, _ = graph(briefing=0, designer=0, copywriter=0, analyst=0, developer=0)
+    order = topological_order(nodes)
+    for node in nodes:
+        for dependency in node.depends_on:
+            assert order.index(dependency) < order.index(node.name)
+
+
+@pytest.mark.parametrize("nodes, message", [
+    ([TaskNode("a", None), TaskNode("a", None)], "Duplicate"),
+    ([TaskNode("a", None, depends_on=("missing",))], "unknown"),
+    ([TaskNode("a", None, depends_on=("b",)), TaskNode("b", None, depends_on=("a",))], "cycle"),
+])
+def test_invalid_graphs_are_rejected(nodes, message):
+    with pytest.raises(ValueError, match=message):
+        run_task_dag(nodes, execute=execute)
+
+
+def test_outputs_context_and_task_names():
+    nodes, tasks = graph(briefing=0, designer=0, copywriter=0, analyst=0, developer=0)
+    result = run_task_dag(nodes, execute=execute)
+
+    assert result.outputs == {name: f"out:{name}" for name in tasks}
+    assert tasks["briefing"].context == ""
+    assert "out:briefing" in tasks["designer"].context
+    for dependency in ("designer", "copywriter", "analyst"):
+        assert f"## Output of '{dependency}'\nout:{dependency}" in tasks["developer"].context
+    assert {name: task.task_name for name, task in tasks.items()} == {name: name for name in tasks}
+    assert result.order[-1] == "developer"
+
+
+def test_independent_branches_run_concurrently():
+    nodes, _ = graph(briefing=0.1, designer=0.2, copywriter=0.2, analyst=0.3, developer=0.1)
+    result = run_task_dag(nodes, execute=execute)
+
+    # Sequentially this would take 0.9s; the critical path (0.4s) is briefing -> designer/copywriter -> developer.
+    assert result.wall_time < 0.9
+    timings = result.timings
+    assert timings["analyst"].started < timings["briefing"].finished
+    assert timings["designer"].started < timings["copywriter"].finished
+    assert timings["developer"].started >= max(timings[name].finished for name in ("designer", "copywriter", "analyst"))
+    assert result.critical_path[0] == "briefing" and result.critical_path[-1] == "developer"
+
+
+def test_failure_propagates_and_skips_dependents():
+    nodes = [
+        TaskNode("first", StubTask("first", error=RuntimeError("boom"))),
+        TaskNode("second", StubTask("second"), depends_on=("first",)),
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_task_dag(nodes, execute=execute)
+    assert nodes[1].task.context is None  # Never ran
+
+
+def test_custom_context_builder():
+    nodes = [TaskNode("a", StubTask("a")), TaskNode("b", StubTask("b"), depends_on=("a",))]
+    run_task_dag(nodes, execute=execute, build_context=lambda node, outputs: "|".join(outputs[d] for d in node.depends_on))
+    assert nodes[1].task.context == "out:a"
@@ -0,0 +1,64 @@
+import os
+import time
+
+from PIL import Image
+
+from postprocess import evict_site_cache, minify_css, optimize_site, split_rules
+
+
+def test_minify_css_collapses_whitespace_and_comments():
+    css = """
+    /* header */
+    .nav  a:hover ,  .nav a:focus {
+        color : #fff ;
+        margin : 0  auto ;
+    }
+    """
+    assert minify_css(css) == ".nav a:hover,.nav a:focus{color:#fff;margin:0 auto}"
+
+
+def test_minify_css_keeps_strings_and_urls_verbatim():
+    css = """
+    .quote::before { content: "  a ; b } /* not a comment */  "; }
+    .tag::after { content: 'x  :  y'; }
+    .hero { background: url( images/hero  banner.png ); }
+    .icon { background-image: url("data:image/svg+xml;utf8,<svg a='1'>  </svg>"); }
+    """
+    minified = minify_css(css)
+
+    assert '"  a ; b } /* not a comment */  "' in minified
+    assert "'x  :  y'" in minified
+    assert "url(\"data:image/svg+xml;utf8,<svg a='1'>  </svg>\")" in minified
+    assert split_rules(minified)[0] == '.quote::before{content:"  a ; b } /* not a comment */  "}'
+    assert len(split_rules(minified)) == 4
+
+
+def _write_site(site_dir, css):
+    os.makedirs(site_dir)
+    Image.new("RGB", (40, 20), "red").save(os.path.join(site_dir, "photo.png"))
+    with open(os.path.join(site_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"<html><head><style>{css}</style></head><body><h1>Hi</h1><img src='photo.png'></body></html>")
+
+
+def test_image_dimensions_only_when_css_keeps_the_aspect_ratio(tmp_path):
+    _write_site(tmp_path / "stretched", "img { max-width: 100%; }")
+    _write_site(tmp_path / "scaled", ".card img { max-width: 100%; height: auto; }")
+
+    optimize_site(str(tmp_path / "stretched"), cache_dir=None)
+    optimize_site(str(tmp_path / "scaled"), cache_dir=None)
+
+    assert 'height="20"' not in (tmp_path / "stretched" / "index.html").read_text()
+    scaled = (tmp_path / "scaled" / "index.html").read_text()
+    assert 'width="40"' in scaled and 'height="20"' in scaled
+
+
+def test_site_cache_evicts_least_recently_used(tmp_path):
+    cache_dir = tmp_path / "site_cache"
+    for index in range(4):
+        entry = cache_dir / f"entry{index}"
+        entry.mkdir(parents=True)
+        os.utime(entry, (time.time() - 100 + index, time.time() - 100 + index))
+    (cache_dir / "entry9.tmp").mkdir()  # A copy in progress is never evicted
+
+    assert evict_site_cache(str(cache_dir), max_entries=2) == 2
+    assert sorted(os.listdir(cache_dir)) == ["entry2", "entry3", "entry9.tmp"]
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+import progress
+from pipeline import TaskNode, run_task_dag
+from progress import BuildCancelled, ProgressBus, tracked_execute
+
+
+class EmittingTask:
+    """Stand-in for a crewai task whose agent reports 'steps' steps, 'delay' seconds apart."""
+
+    def __init__(self, steps=1, delay=0.0):
+        self.steps = steps
+        self.delay = delay
+        self.ran_steps = 0
+
+    def run(self, context):
+        for index in range(self.steps):
+            progress.step_callback(f"step {index}")  # What crewai calls after every agent step
+            self.ran_steps += 1
+            time.sleep(self.delay)
+        progress.emit_tool_output("done")
+        return f"output after {self.steps} steps"
+
+
+def execute(task, context):
+    return task.run(context)
+
+
+def drain_all(bus):
+    events = []
+    while True:
+        drained = bus.drain(timeout=0.01)
+        if not drained:
+            return events
+        events.extend(drained)
+
+
+def test_events_are_tagged_and_ordered_per_task():
+    bus = ProgressBus()
+    nodes = [TaskNode("briefing", EmittingTask(steps=2)),
+             TaskNode("developer", EmittingTask(steps=1), depends_on=("briefing",))]
+
+    run_task_dag(nodes, execute=tracked_execute(bus, execute))
+
+    events = [(event.kind, event.task, event.text) for event in drain_all(bus)]
+    assert events == [
+        ("task_start", "briefing", ""),
+        ("step", "briefing", "step 0"),
+        ("step", "briefing", "step 1"),
+        ("tool_output", "briefing", "done"),
+        ("task_end", "briefing", "output after 2 steps"),
+        ("task_start", "developer", ""),
+        ("step", "developer", "step 0"),
+        ("tool_output", "developer", "done"),
+        ("task_end", "developer", "output after 1 steps"),
+    ]
+
+
+def test_emitting_outside_a_tracked_build_is_ignored():
+    progress.step_callback("nobody is listening")
+    progress.emit_tool_output("nor here")
+
+
+def test_cancelling_stops_the_running_task_and_skips_the_rest():
+    bus = ProgressBus()
+    slow, last = EmittingTask(steps=200, delay=0.01), EmittingTask()
+    nodes = [TaskNode("briefing", EmittingTask()),
+             TaskNode("designer", slow, depends_on=("briefing",)),
+             TaskNode("developer", last, depends_on=("designer",))]
+    seen = []
+
+    def watch():
+        while not any(event.kind == "step" and event.task == "designer" for event in seen):
+            seen.extend(bus.drain())
+        bus.cancel()
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    started = time.perf_counter()
+    with pytest.raises(BuildCancelled):
+        run_task_dag(nodes, execute=tracked_execute(bus, execute))
+    watcher.join()
+
+    assert time.perf_counter() - started < 1.0  # Uncancelled, 'designer' alone takes 2s
+    assert 0 < slow.ran_steps < 200 and last.ran_steps == 0
+    events = seen + drain_all(bus)
+    assert ("task_end", "briefing") in [(event.kind, event.task) for event in events]
+    assert not any(event.task == "designer" and event.kind == "task_end" for event in events)
+    assert not any(event.task == "developer" for event in events)
+
+
+def test_cancelled_bus_refuses_to_start_a_task():
+    bus = ProgressBus()
+    bus.cancel()
+    task = EmittingTask()
+
+    with pytest.raises(BuildCancelled):
+        tracked_execute(bus, execute)(task, "")
+
+    assert task.ran_steps == 0 and drain_all(bus) == []
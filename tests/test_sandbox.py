@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import sandbox
+from sandbox import SandboxPool, with_site_dir
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(workers=1, preload=[], timeout=20, isolation="").start()
+    yield pool
+    pool.close()
+
+
+def test_code_runs_in_a_scratch_directory_and_writes_only_the_site(pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("jobs/abc/autosite")
+    with open("jobs/abc/autosite/logo.svg", "w") as f:
+        f.write("<svg/>")
+
+    result = pool.run(
+        "import os\n"
+        "print(os.getcwd() != %r, os.listdir('jobs/abc/autosite'))\n"
+        "open('jobs/abc/autosite/index.html', 'w').write('<h1>Hi</h1>')\n"
+        "open('stray.txt', 'w').write('left behind')\n"
+        "os.symlink('/etc/passwd', 'jobs/abc/autosite/passwd')" % str(tmp_path),
+        site_dir="jobs/abc/autosite",
+    )
+
+    assert result.ok, result.as_text()
+    assert result.output.strip() == "True ['logo.svg']"
+    assert (tmp_path / "jobs/abc/autosite/index.html").read_text() == "<h1>Hi</h1>"
+    assert sorted(os.listdir(tmp_path)) == ["jobs"]
+    assert sorted(os.listdir(tmp_path / "jobs/abc/autosite")) == ["index.html", "logo.svg"]
+
+    # The next call starts with an empty scratch directory.
+    assert pool.run("import os; print(sorted(os.listdir('.')))").output.strip() == "[]"
+
+
+def test_site_dir_comes_from_the_running_build(pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    execute = with_site_dir("autosite", lambda code, context: pool.run(code))
+
+    result = execute("open('autosite/index.html', 'w').write('ok')", "")
+
+    assert result.ok, result.as_text()
+    assert (tmp_path / "autosite/index.html").read_text() == "ok"
+
+
+@pytest.mark.parametrize("mode, isolation, enabled", [
+    ("", "", False),  # Default 'auto' without isolation: crewai's Docker tool
+    ("", "user", True),
+    ("auto", "namespace", True),
+    ("pool", "", True),
+    ("docker", "namespace", False),
+])
+def test_pool_is_only_the_default_where_workers_are_isolated(monkeypatch, mode, isolation, enabled):
+    if mode:
+        monkeypatch.setenv("CODE_INTERPRETER_MODE", mode)
+    else:
+        monkeypatch.delenv("CODE_INTERPRETER_MODE", raising=False)
+    monkeypatch.setattr(sandbox, "_isolation", isolation)
+
+    assert sandbox.pool_enabled() is enabled
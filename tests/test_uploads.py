@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import threading
+import zipfile
+
+import pytest
+
+from archive import UnsafeArchiveError, safe_extract
+from uploads import MANIFEST_NAME, UploadTooLargeError, save_upload_stream, submit_extraction
+
+
+class CountingStream(io.BytesIO):
+    """Records how many bytes were read, to check that an oversized upload isn't read to the end."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def stored_files(upload_dir):
+    return sorted(name for name in os.listdir(upload_dir) if name != MANIFEST_NAME)
+
+
+def test_oversized_upload_is_rejected_without_reading_the_rest(tmp_path):
+    stream = CountingStream(b"x" * 10_000)
+
+    with pytest.raises(UploadTooLargeError, match="limit"):
+        save_upload_stream(stream, "big.csv", upload_dir=str(tmp_path), chunk_size=1000, max_bytes=2500)
+
+    assert stream.bytes_read == 3000
+    assert stored_files(tmp_path) == []  # The partial temp file is removed
+
+
+def test_size_limit_comes_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_MAX_MB", "0.001")  # 1048 bytes
+
+    save_upload_stream(io.BytesIO(b"x" * 1000), "small.txt", upload_dir=str(tmp_path))
+    with pytest.raises(UploadTooLargeError):
+        save_upload_stream(io.BytesIO(b"x" * 2000), "large.txt", upload_dir=str(tmp_path))
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    first = save_upload_stream(io.BytesIO(b"a,b\n1,2\n"), "data.csv", upload_dir=str(tmp_path), chunk_size=3)
+    again = save_upload_stream(io.BytesIO(b"a,b\n1,2\n"), "copy.csv", upload_dir=str(tmp_path))
+    other = save_upload_stream(io.BytesIO(b"a,b\n3,4\n"), "data.csv", upload_dir=str(tmp_path))
+
+    assert not first["duplicate"] and again["duplicate"] and not other["duplicate"]
+    assert again["path"] == first["path"] and again["content_hash"] == first["content_hash"]
+    assert other["path"] != first["path"]  # Same name, different content: stored next to it
+    assert stored_files(tmp_path) == sorted(os.path.basename(path) for path in (first["path"], other["path"]))
+    with open(tmp_path / MANIFEST_NAME) as f:
+        assert json.load(f) == {first["content_hash"]: first["path"], other["content_hash"]: other["path"]}
+
+
+def test_deleted_upload_is_stored_again(tmp_path):
+    first = save_upload_stream(io.BytesIO(b"hello"), "hello.txt", upload_dir=str(tmp_path))
+    os.remove(first["path"])
+
+    again = save_upload_stream(io.BytesIO(b"hello"), "hello.txt", upload_dir=str(tmp_path))
+
+    assert not again["duplicate"] and os.path.exists(again["path"])
+
+
+def test_extraction_runs_in_the_background_then_hands_off(tmp_path):
+    zip_path = tmp_path / "site.zip"
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        zipf.writestr("notes.txt", "hello")
+    calls = []
+
+    def after(extract_to):
+        calls.append((threading.current_thread().name, sorted(os.listdir(extract_to))))
+        return "indexed"
+
+    future = submit_extraction(safe_extract, str(zip_path), str(tmp_path / "out"), after=after)
+
+    assert future.result(timeout=10) == ({"files": 1, "bytes": 5}, "indexed")
+    assert calls[0][0].startswith("zip-extract") and calls[0][1] == ["notes.txt"]
+
+
+def test_extraction_errors_reach_the_caller_and_skip_the_handoff(tmp_path):
+    zip_path = tmp_path / "evil.zip"
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        zipf.writestr("../evil.txt", "x")
+    calls = []
+
+    future = submit_extraction(safe_extract, str(zip_path), str(tmp_path / "out"), after=calls.append)
+
+    with pytest.raises(UnsafeArchiveError):
+        future.result(timeout=10)
+    assert calls == []
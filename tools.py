@@ -1,27 +1,30 @@
 import os
+import threading
 import zipfile
-from dotenv import load_dotenv
+from typing import Callable, List, Optional, Type
+
+from archive import UnsafeArchiveError, safe_extract, write_zip
+from cache import get_web_cache
+from environment import load_environment
+from feedback import QUERY_ROW_LIMIT, get_feedback_store
+from ingest import SUPPORTED_EXTENSIONS, chroma_lock, get_uploads_collection, ingest_upload, search_filter
+from instrumentation import annotate, record_tool_call
+from http_client import install as install_http_client
+from progress import emit_tool_output
+from sandbox import get_sandbox_pool, pool_enabled
 
 # Load environment variables from .env file at the very beginning
 # Ensure your .env file is in the root directory of your project
 # and contains all necessary API keys (e.g., COMPOSIO_API_KEY, EXA_API_KEY, etc.)
-load_dotenv()
-
-# --- Langchain Tools (Fixing Deprecation Warnings) ---
-# These imports are now updated to use langchain_community as per deprecation warnings.
-# They are included if you intend to use them, even if not directly wrapped as CrewAI tools.
-from langchain_community.utilities import SerpAPIWrapper
-from langchain_community.utilities import SQLDatabase
-from langchain_community.tools import QuerySQLDataBaseTool
-from langchain_community.tools import ReadFileTool as LangchainReadFileTool # Renamed to avoid conflict
-from langchain_community.tools import WriteFileTool as LangchainWriteFileTool # Renamed to avoid conflict
+load_environment()
 
 # --- Composio Toolset Import ---
 # Used for integrating with Composio for various app actions (e.g., GitHub).
-from composio_crewai import ComposioToolSet, App, Action
+# Imported inside '_build_composio_tools()' so it is only loaded when the toolset is requested.
 
 # NEW: Import the 'tool' decorator directly from crewai.tools
-from crewai.tools import tool
+from crewai.tools import BaseTool, tool
+from pydantic import BaseModel, Field, PrivateAttr
 
 # --- CrewAI Tools Imports ---
 # These are the core tools from crewai_tools that will be instantiated.
@@ -29,7 +32,6 @@ from crewai.tools import tool
 from crewai_tools import (
     CodeDocsSearchTool,
     CodeInterpreterTool,
-    CSVSearchTool,
     EXASearchTool,
     FileReadTool,
     FirecrawlSearchTool,
@@ -37,10 +39,7 @@ from crewai_tools import (
     FirecrawlScrapeWebsiteTool,
     GithubSearchTool,
     SerperDevTool,
-    TXTSearchTool,
-    JSONSearchTool,
     MDXSearchTool,
-    PDFSearchTool,
     RagTool,
     ScrapeElementFromWebsiteTool,
     ScrapeWebsiteTool,
@@ -63,22 +62,14 @@ def create_zip_archive_tool_function(source_path: str, output_zip_file: str) ->
     Returns:
         str: A message indicating success or failure.
     """
+    # Members are compressed in parallel, and images/fonts are stored as-is (see archive.py).
     try:
-        if os.path.isfile(source_path):
-            with zipfile.ZipFile(output_zip_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.write(source_path, os.path.basename(source_path))
-            return f"Successfully created zip archive '{output_zip_file}' from file '{source_path}'."
-        elif os.path.isdir(source_path):
-            with zipfile.ZipFile(output_zip_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(source_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # arcname is the name of the file inside the zip, relative to the source_path
-                        arcname = os.path.relpath(file_path, os.path.dirname(source_path) if os.path.dirname(source_path) else '.')
-                        zipf.write(file_path, arcname)
-            return f"Successfully created zip archive '{output_zip_file}' from directory '{source_path}'."
-        else:
-            return f"Error: Source path '{source_path}' does not exist or is not a file/directory."
+        kind = "file" if os.path.isfile(source_path) else "directory"
+        with record_tool_call("Zip Creator"):
+            annotate(bytes=write_zip(source_path, output_zip_file))
+        return f"Successfully created zip archive '{output_zip_file}' from {kind} '{source_path}'."
+    except FileNotFoundError:
+        return f"Error: Source path '{source_path}' does not exist or is not a file/directory."
     except Exception as e:
         return f"Error creating zip archive: {e}"
 
@@ -98,133 +89,405 @@ def extract_zip_archive_tool_function(zip_file_path: str, extract_to_path: str)
         if not os.path.exists(zip_file_path):
             return f"Error: Zip file '{zip_file_path}' not found."
 
-        os.makedirs(extract_to_path, exist_ok=True) # Create target directory if it doesn't exist
-
-        with zipfile.ZipFile(zip_file_path, 'r') as zipf:
-            zipf.extractall(extract_to_path)
-        return f"Successfully extracted contents of '{zip_file_path}' to '{extract_to_path}'."
+        # Extracted member by member with path-traversal and zip-bomb limits (see archive.py).
+        # The target directory is created if it doesn't exist.
+        with record_tool_call("Zip Extractor"):
+            extracted = safe_extract(zip_file_path, extract_to_path)
+            annotate(bytes=extracted["bytes"])
+        return (f"Successfully extracted {extracted['files']} files from '{zip_file_path}' "
+                f"to '{extract_to_path}'.")
+    except UnsafeArchiveError as e:
+        return f"Error: refused to extract '{zip_file_path}': {e}"
     except zipfile.BadZipFile:
         return f"Error: '{zip_file_path}' is not a valid zip file."
     except Exception as e:
         return f"Error extracting zip archive: {e}"
 
 
-# --- Tool Instantiation ---
-# Most of these are fine as they are standard crewai_tools.
+# --- Lazy Tool Construction ---
+# Building a tool can be expensive: the RAG tools open an embedchain app backed by Chroma,
+# Composio talks to its API, and some constructors validate API keys.
+# Every exported tool below is a LazyTool proxy. It carries the real tool's name, description
+# and argument schema (so agents can be configured with it right away), but the real tool is
+# only built the first time an agent actually runs it. Missing API keys are therefore
+# reported when the tool is used, not when this module is imported.
+# Network-bound search/scrape tools are created with 'cached=True' so identical queries
+# are answered from the persistent result cache in 'db/' (see cache.py).
+# The requests they do make go through the shared HTTP client (pooled connections, per-host
+# and per-API limits, retries, coalescing of identical concurrent requests; see http_client.py).
+install_http_client()
+
+def _field_default(tool_class, field_name: str):
+    """Reads a pydantic field default from a tool class without instantiating it."""
+    model_field = tool_class.model_fields.get(field_name)
+    return model_field.default if model_field is not None else None
+
+
+class LazyTool(BaseTool):
+    """
+    Proxy for a crewai tool that is constructed on first use.
+
+    Use 'lazy_tool()' to create one; 'materialize()' returns (and if needed builds) the real tool.
+    """
+    _factory: Callable[[], BaseTool] = PrivateAttr()
+    _instance: Optional[BaseTool] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _cached: bool = PrivateAttr(default=False)
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._instance is not None
+
+    def materialize(self) -> BaseTool:
+        """Builds the real tool once (thread-safe) and returns it."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def _run(self, *args, **kwargs):
+        # Wall time, result size and cache hits are recorded on the running build's trace (see instrumentation.py).
+        with record_tool_call(self.name):
+            if not self._cached:
+                result = self.materialize().run(*args, **kwargs)
+                annotate(bytes=len(str(result).encode("utf-8")))
+                return result
+
+            computed = []
+
+            def compute(*call_args, **call_kwargs):
+                computed.append(True)
+                fetched = self.materialize().run(*call_args, **call_kwargs)
+                annotate(bytes=len(str(fetched).encode("utf-8")))
+                return fetched
+
+            # Served from the persistent web cache (see cache.py) when the same
+            # normalized arguments were used before; the real tool isn't even built on a hit.
+            result = get_web_cache().get_or_compute(self.name, compute, *args, **kwargs)
+            annotate(cache_hit=not computed)
+            return result
+
+
+def lazy_tool(tool_class, factory: Callable[[], BaseTool] = None, cached: bool = False) -> LazyTool:
+    """
+    Creates a LazyTool for 'tool_class'.
+
+    Args:
+        tool_class: The crewai_tools class being proxied (used for name, description and args schema).
+        factory: Zero-argument callable that builds the real tool. Defaults to 'tool_class()'.
+        cached (bool): Serve repeated calls from the persistent web cache (for network-bound tools).
+    Returns:
+        LazyTool: A proxy that agents can use like the real tool.
+    """
+    fields = {
+        "name": _field_default(tool_class, "name") or tool_class.__name__,
+        "description": _field_default(tool_class, "description") or (tool_class.__doc__ or tool_class.__name__),
+    }
+    args_schema = _field_default(tool_class, "args_schema")
+    if isinstance(args_schema, type):
+        fields["args_schema"] = args_schema
+    proxy = LazyTool(**fields)
+    proxy._factory = factory or tool_class
+    proxy._cached = cached
+    return proxy
+
+
+def _require_env(name: str, tool_name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"{name} is not set in .env file. {tool_name} requires it.")
+    return value
+
 
 # CodeDocsSearchTool: This tool searches within a LOCAL directory.
 # It requires the 'directory' parameter to be set to a valid path containing your documentation files.
 # Agents should provide a 'query' (e.g., "how to use functionX") to this tool, NOT a URL.
-code_docs_search_tool = CodeDocsSearchTool(directory='./docs') # Ensure './docs' directory exists and contains your docs.
+code_docs_search_tool = lazy_tool(
+    CodeDocsSearchTool,
+    lambda: CodeDocsSearchTool(directory='./docs'), # Ensure './docs' directory exists and contains your docs.
+)
 
 # Code Interpreter Tool: Allows agents to execute and interpret code.
-code_interpreter_tool = CodeInterpreterTool()
-
-# Composio Toolset: Integrates with various applications via Composio.
-# Ensure COMPOSIO_API_KEY is set in your .env file.
-composio_key = os.getenv("COMPOSIO_API_KEY")
-if not composio_key:
-    raise ValueError("COMPOSIO_API_KEY is missing in .env file. Please set it.")
-composio_toolset = ComposioToolSet(api_key=composio_key) # Pass the key during instantiation
-# Get specific tools from Composio, e.g., GitHub actions.
-composio_tools = composio_toolset.get_tools(apps=[App.GITHUB])
-
+# Where the workers can be isolated, the code runs on a pool of pre-warmed, resource-limited
+# worker processes (see sandbox.py) instead of a new Docker container per call, and can
+# only write to the build's site directory. Its output is streamed to the build's progress
+# panel. Otherwise (or with CODE_INTERPRETER_MODE=docker) crewai's tool is used.
+class CodeInterpreterSchema(BaseModel):
+    code: str = Field(
+        ...,
+        description="Python3 code used to be interpreted. ALWAYS PRINT the final result and the output of the code",
+    )
+    libraries_used: List[str] = Field(
+        [],
+        description="List of libraries used in the code. Only installed libraries are available; nothing is installed on demand.",
+    )
+
+
+class PooledCodeInterpreterTool(BaseTool):
+    """Drop-in replacement for crewai's CodeInterpreterTool backed by the sandbox worker pool."""
+    name: str = "Code Interpreter"
+    description: str = "Interprets Python3 code strings with a final print statement."
+    args_schema: Type[BaseModel] = CodeInterpreterSchema
+
+    def _run(self, code: str, libraries_used: List[str] = None, **kwargs) -> str:
+        with record_tool_call(self.name):
+            result = get_sandbox_pool().run(code, on_output=emit_tool_output)
+            text = result.as_text()
+            annotate(bytes=len(text.encode("utf-8")))
+            return text
+
+
+code_interpreter_tool = PooledCodeInterpreterTool() if pool_enabled() else lazy_tool(CodeInterpreterTool)
+
+
+# Upload Search Tools (CSV/TXT/JSON/PDF): these used to be CSVSearchTool, TXTSearchTool, JSONSearchTool
+# and PDFSearchTool, each embedding a file again the first time an agent pointed it at one.
+# They now all query the shared uploads collection in 'db/' that main.py fills at upload time
+# (see ingest.py). 'file_path' is optional; without it the tool searches all uploads of its type.
+
+class UploadSearchSchema(BaseModel):
+    search_query: str = Field(..., description="What to look for in the uploaded file(s).")
+    file_path: Optional[str] = Field(
+        None, description="Optional path of one uploaded file to search; searches all uploads of this type if omitted."
+    )
+
+
+class UploadSearchTool(BaseTool):
+    """
+    Semantic search over the shared uploads collection.
 
-# CSV Search Tool: Searches within a CSV file.
-# Agents will need to specify the 'file_path' when using this tool if not set here.
-csv_search_tool = CSVSearchTool() # Can take file_path='./data.csv' if always same
+    Replaces the per-tool embedchain indexes of CSVSearchTool, TXTSearchTool, PDFSearchTool
+    and JSONSearchTool: files are embedded once and every instance queries the same collection.
+    """
+    name: str = "Search uploaded files"
+    description: str = "Semantic search over the content of uploaded files."
+    args_schema: Type[BaseModel] = UploadSearchSchema
+    file_types: tuple = SUPPORTED_EXTENSIONS
+    n_results: int = 5
+
+    def _where(self, file_path: Optional[str]) -> dict:
+        if file_path:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File '{file_path}' not found.")
+            # A file that wasn't uploaded through the UI is indexed on first search (once).
+            return search_filter(content_hash=ingest_upload(file_path)["content_hash"])
+        return search_filter(self.file_types)
+
+    def _run(self, search_query: str, file_path: Optional[str] = None, **kwargs) -> str:
+        with record_tool_call(self.name):
+            where = self._where(file_path)
+            with chroma_lock():  # The collection may be rebuilt by maintenance.py meanwhile
+                collection = get_uploads_collection()
+                if collection.count() == 0:
+                    return "No uploaded files have been indexed yet."
+                found = collection.query(query_texts=[search_query], n_results=self.n_results, where=where)
+            documents = found["documents"][0] if found["documents"] else []
+            if not documents:
+                return "No relevant content found in the uploaded files."
+            metadatas = found["metadatas"][0]
+            result = "\n\n".join(
+                f"[{metadata['source']} #{metadata['chunk']}]\n{document}"
+                for document, metadata in zip(documents, metadatas)
+            )
+            annotate(bytes=len(result.encode("utf-8")))
+            return result
+
+
+# CSV Search Tool: Searches within uploaded CSV files.
+csv_search_tool = UploadSearchTool(
+    name="Search a CSV's content",
+    description="A tool that can be used to semantic search a query from uploaded CSV files.",
+    file_types=(".csv",),
+)
 
 # EXA Search Tool: For general web search via EXA API.
 # Ensure EXA_API_KEY is set in your .env file.
-exa_api_key = os.getenv("EXA_API_KEY")
-if not exa_api_key:
-    raise ValueError("EXA_API_KEY is not set in .env file. EXASearchTool requires it.")
-exa_search_tool = EXASearchTool(api_key=exa_api_key) # Pass the API key to the constructor
+exa_search_tool = lazy_tool(
+    EXASearchTool,
+    lambda: EXASearchTool(api_key=_require_env("EXA_API_KEY", "EXASearchTool")), # Pass the API key to the constructor
+    cached=True,
+)
 
 # File Read Tool: Reads content from a specified file.
 # Agents will need to specify the 'file_path' when using this tool.
-file_read_tool = FileReadTool() # Can take file_path='./my_file.txt' if always same
+file_read_tool = lazy_tool(FileReadTool) # Can take file_path='./my_file.txt' if always same
 
 # Firecrawl Search Tools: For web crawling and scraping via Firecrawl.
 # Ensure FIRECRAWL_API_KEY is set in your .env file if required.
-firecrawl_api_key = os.getenv("FIRECRAWL_API_KEY")
-# Pass the API key to the constructors if it's available.
-firecrawl_search_tool = FirecrawlSearchTool(api_key=firecrawl_api_key) if firecrawl_api_key else FirecrawlSearchTool()
-firecrawl_crawl_website_tool = FirecrawlCrawlWebsiteTool(api_key=firecrawl_api_key) if firecrawl_api_key else FirecrawlCrawlWebsiteTool()
-firecrawl_scrape_website_tool = FirecrawlScrapeWebsiteTool(api_key=firecrawl_api_key) if firecrawl_api_key else FirecrawlScrapeWebsiteTool()
+def _firecrawl_factory(tool_class):
+    def build():
+        firecrawl_api_key = os.getenv("FIRECRAWL_API_KEY")
+        # Pass the API key to the constructors if it's available.
+        return tool_class(api_key=firecrawl_api_key) if firecrawl_api_key else tool_class()
+    return build
 
+firecrawl_search_tool = lazy_tool(FirecrawlSearchTool, _firecrawl_factory(FirecrawlSearchTool), cached=True)
+firecrawl_crawl_website_tool = lazy_tool(FirecrawlCrawlWebsiteTool, _firecrawl_factory(FirecrawlCrawlWebsiteTool), cached=True)
+firecrawl_scrape_website_tool = lazy_tool(FirecrawlScrapeWebsiteTool, _firecrawl_factory(FirecrawlScrapeWebsiteTool), cached=True)
 
 # GitHub Search Tool: Searches GitHub repositories.
 # Ensure GITHUB_TOKEN is set in your .env file.
-github_token = os.getenv("GITHUB_TOKEN")
-if not github_token:
-    raise ValueError("GITHUB_TOKEN is not set in .env file. GithubSearchTool requires it.")
-github_search_tool = GithubSearchTool(
-    gh_token=github_token,
-    # You can set a default repo_url here if most searches are for one repo:
-    # repo_url='https://github.com/crewAI/crewAI'
+github_search_tool = lazy_tool(
+    GithubSearchTool,
+    lambda: GithubSearchTool(
+        gh_token=_require_env("GITHUB_TOKEN", "GithubSearchTool"),
+        # You can set a default repo_url here if most searches are for one repo:
+        # repo_url='https://github.com/crewAI/crewAI'
+    ),
 )
 
 # Serper Dev Tool: Provides structured search results from Google via Serper API.
 # Ensure SERPER_API_KEY is set in your .env file.
-serper_api_key = os.getenv("SERPER_API_KEY")
-if not serper_api_key:
-    raise ValueError("SERPER_API_KEY is not set in .env file. SerperDevTool requires it.")
-serper_dev_tool = SerperDevTool() # Pass the API key to the constructor
+def _build_serper_dev_tool():
+    _require_env("SERPER_API_KEY", "SerperDevTool") # SerperDevTool reads the key from the environment itself
+    return SerperDevTool()
 
+serper_dev_tool = lazy_tool(SerperDevTool, _build_serper_dev_tool, cached=True)
 
-# TXT Search Tool: Searches within a plain text file.
-# Agents will need to specify the 'file_path' when using this tool.
-txt_search_tool = TXTSearchTool() # Can take file_path='./notes.txt' if always same
+# TXT Search Tool: Searches within uploaded plain text files.
+txt_search_tool = UploadSearchTool(
+    name="Search a txt's content",
+    description="A tool that can be used to semantic search a query from uploaded txt files.",
+    file_types=(".txt", ".md"),
+)
+
+# JSON Search Tool: Searches within uploaded JSON files.
+json_search_tool = UploadSearchTool(
+    name="Search a JSON's content",
+    description="A tool that can be used to semantic search a query from uploaded JSON files.",
+    file_types=(".json",),
+)
 
-# JSON Search Tool: Searches within a JSON file.
-# Agents will need to specify the 'file_path' when using this tool.
-json_search_tool = JSONSearchTool() # Can take file_path='./data.json' if always same
+
+# Feedback Query Tool: Read-only access to the 'user_feedback' store (DATABASE_URL).
+# Common questions are answered from pre-aggregated tables instead of scanning raw rows.
+class FeedbackQuerySchema(BaseModel):
+    question: str = Field(
+        "top_requests",
+        description="One of 'top_requests', 'top_complaints', 'top_praise', 'category_breakdown', or 'sql'.",
+    )
+    category: Optional[str] = Field(None, description="Optional category filter, e.g. 'pricing' or 'mobile'.")
+    limit: int = Field(10, description="Maximum number of rows to return.")
+    sql: Optional[str] = Field(
+        None,
+        description="For question='sql': a read-only SELECT over user_feedback, feedback_category_counts "
+                    "or feedback_topic_counts. Prefer the aggregate tables; the raw table is large.",
+    )
+
+
+class FeedbackQueryTool(BaseTool):
+    """Read-only access to the 'user_feedback' store, answered from pre-aggregated tables."""
+    name: str = "Query user feedback database"
+    description: str = (
+        "Answers questions about the 'user_feedback' table: the most common feature requests, complaints "
+        "or praise (optionally per category), feedback counts per category, or a custom read-only SQL SELECT."
+    )
+    args_schema: Type[BaseModel] = FeedbackQuerySchema
+
+    def _run(self, question: str = "top_requests", category: Optional[str] = None, limit: int = 10,
+             sql: Optional[str] = None, **kwargs) -> str:
+        with record_tool_call(self.name):
+            store = get_feedback_store()
+            limit = max(1, min(int(limit), QUERY_ROW_LIMIT))
+            if question in ("top_requests", "top_complaints", "top_praise"):
+                kind = {"top_requests": "request", "top_complaints": "complaint", "top_praise": "praise"}[question]
+                rows = store.top_topics(kind, category, limit)
+            elif question == "category_breakdown":
+                rows = store.category_breakdown()[:limit]
+            elif question == "sql":
+                if not sql:
+                    return "Error: question='sql' needs a SELECT statement in 'sql'."
+                try:
+                    rows = store.read_only_query(sql, limit)
+                except Exception as e:
+                    return f"Error running query: {e}"
+            else:
+                return f"Error: unknown question '{question}'."
+            if not rows:
+                return "No feedback found." if store.count() == 0 else "No matching rows."
+            columns = list(rows[0])
+            result = "\n".join([" | ".join(columns)] + [" | ".join(str(row[column]) for column in columns) for row in rows])
+            annotate(bytes=len(result.encode("utf-8")))
+            return result
+
+
+feedback_query_tool = FeedbackQueryTool()
 
 # MDX Search Tool: Searches within an MDX file.
 # Agents will need to specify the 'file_path' when using this tool.
-mdx_search_tool = MDXSearchTool() # Can take file_path='./readme.mdx' if always same
+mdx_search_tool = lazy_tool(MDXSearchTool) # Can take file_path='./readme.mdx' if always same
 
-# PDF Search Tool: Searches within a PDF file.
-# Agents will need to specify the 'file_path' when using this tool.
-pdf_search_tool = PDFSearchTool() # Can take file_path='./report.pdf' if always same
+# PDF Search Tool: Searches within uploaded PDF files.
+pdf_search_tool = UploadSearchTool(
+    name="Search a PDF's content",
+    description="A tool that can be used to semantic search a query from uploaded PDF files.",
+    file_types=(".pdf",),
+)
 
 # RAG Tool: Retrieval-Augmented Generation tool.
 # This typically requires configuration for a knowledge base or retriever to be effective.
 # You might need to specify a 'knowledge_base_path' or a 'retriever' here.
-# Example: rag_tool = RagTool(knowledge_base_path='./my_knowledge_base_folder')
-rag_tool = RagTool()
+# Example: lazy_tool(RagTool, lambda: RagTool(knowledge_base_path='./my_knowledge_base_folder'))
+rag_tool = lazy_tool(RagTool)
 
 # Web Scraping Tools: For extracting content from websites.
 # IMPORTANT: ScrapeElementFromWebsiteTool REQUIRES 'css_element' in addition to 'website_url'
 # when called by an agent. For example: tool.run(website_url='...', css_element='h1')
-scrape_element_from_website_tool = ScrapeElementFromWebsiteTool()
-scrape_website_tool = ScrapeWebsiteTool() # This tool scrapes the entire page, only needs 'website_url'.
+scrape_element_from_website_tool = lazy_tool(ScrapeElementFromWebsiteTool)
+scrape_website_tool = lazy_tool(ScrapeWebsiteTool, cached=True) # This tool scrapes the entire page, only needs 'website_url'.
 
 # Website Search Tool: A general tool for searching a specific website.
 # Agents will need to specify the 'website_url' when using this tool.
-website_search_tool = WebsiteSearchTool() # Can take website_url='https://example.com' if always same
+website_search_tool = lazy_tool(WebsiteSearchTool, cached=True) # Can take website_url='https://example.com' if always same
 
 # XML Search Tool: Searches within an XML file.
 # Agents will need to specify the 'file_path' when using this tool.
-xml_search_tool = XMLSearchTool() # Can take file_path='./config.xml' if always same
+xml_search_tool = lazy_tool(XMLSearchTool) # Can take file_path='./config.xml' if always same
 
 # Youtube Tools: For searching YouTube channels and videos.
 # Ensure YOUTUBE_API_KEY is set in your .env file if using the full API.
-youtube_api_key = os.getenv("YOUTUBE_API_KEY") # Get YouTube API key
-
 # Agents will need to specify channel_id/video_id/search_query when using these tools.
-youtube_channel_search_tool = YoutubeChannelSearchTool(youtube_api_key=youtube_api_key) if youtube_api_key else YoutubeChannelSearchTool()
-youtube_video_search_tool = YoutubeVideoSearchTool(youtube_api_key=youtube_api_key) if youtube_api_key else YoutubeVideoSearchTool()
+def _youtube_factory(tool_class):
+    def build():
+        youtube_api_key = os.getenv("YOUTUBE_API_KEY") # Get YouTube API key
+        return tool_class(youtube_api_key=youtube_api_key) if youtube_api_key else tool_class()
+    return build
+
+youtube_channel_search_tool = lazy_tool(YoutubeChannelSearchTool, _youtube_factory(YoutubeChannelSearchTool))
+youtube_video_search_tool = lazy_tool(YoutubeVideoSearchTool, _youtube_factory(YoutubeVideoSearchTool))
+
+
+# Composio Toolset: Integrates with various applications via Composio.
+# 'composio_tools' is a list rather than a single tool, so it is built on first attribute
+# access through the module-level __getattr__ below instead of being wrapped in a LazyTool.
+# Ensure COMPOSIO_API_KEY is set in your .env file.
+def _build_composio_tools():
+    from composio_crewai import ComposioToolSet, App
+
+    composio_key = os.getenv("COMPOSIO_API_KEY")
+    if not composio_key:
+        raise ValueError("COMPOSIO_API_KEY is missing in .env file. Please set it.")
+    composio_toolset = ComposioToolSet(api_key=composio_key) # Pass the key during instantiation
+    # Get specific tools from Composio, e.g., GitHub actions.
+    return composio_toolset.get_tools(apps=[App.GITHUB])
+
+
+def __getattr__(name):
+    if name == "composio_tools":
+        value = globals()["composio_tools"] = _build_composio_tools()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Exporting Tools ---
 # The __all__ list defines what gets imported when someone does 'from tools import *'
 # It's good practice to include all public objects you want to expose.
+# 'composio_tools' is left out: it only exists once accessed as 'tools.composio_tools'
+# (see '__getattr__'), and a star import shouldn't connect to Composio.
 __all__ = [
     "code_docs_search_tool",
     "code_interpreter_tool",
-    "composio_tools",
     "csv_search_tool",
     "exa_search_tool",
     "file_read_tool",
@@ -246,4 +509,6 @@ __all__ = [
     "youtube_video_search_tool",
     "create_zip_archive_tool_function",
     "extract_zip_archive_tool_function",
+    "LazyTool",
+    "lazy_tool",
 ]
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Streaming, content-addressed upload handling.
+
+The upload handler used to do 'f.write(uploaded_file.read())', which copies the whole
+upload into one bytes object before it reaches disk, and then extracted ZIPs synchronously
+on the Streamlit script thread. Here uploads are:
+
+    - copied to disk in fixed-size chunks (peak memory stays at one chunk),
+    - hashed while they stream, so identical content is stored only once
+      (a re-upload returns the existing file instead of writing a second copy),
+    - rejected once they exceed UPLOAD_MAX_MB, without writing the rest,
+    - extracted (for ZIPs) on a background worker so the session stays responsive.
+
+Stored files are tracked in 'uploads/.manifest.json' (content hash -> stored path).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+UPLOAD_DIR = "uploads"
+MANIFEST_NAME = ".manifest.json"
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_UPLOAD_MB = 200
+
+_manifest_lock = threading.Lock()
+_extraction_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zip-extract")
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+def max_upload_bytes() -> int:
+    return int(float(os.getenv("UPLOAD_MAX_MB", DEFAULT_MAX_UPLOAD_MB)) * 1024 * 1024)
+
+
+def _manifest_path(upload_dir: str) -> str:
+    return os.path.join(upload_dir, MANIFEST_NAME)
+
+
+def _load_manifest(upload_dir: str) -> dict:
+    try:
+        with open(_manifest_path(upload_dir), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(upload_dir: str, manifest: dict):
+    # Write-then-rename so a crash never leaves a truncated manifest behind.
+    temp_path = _manifest_path(upload_dir) + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, _manifest_path(upload_dir))
+
+
+def _target_path(upload_dir: str, filename: str, content_hash: str) -> str:
+    """Keeps the original name unless a different file already uses it."""
+    filename = os.path.basename(filename) or content_hash
+    path = os.path.join(upload_dir, filename)
+    if not os.path.exists(path):
+        return path
+    stem, extension = os.path.splitext(filename)
+    return os.path.join(upload_dir, f"{stem}-{content_hash[:8]}{extension}")
+
+
+def save_upload_stream(stream, filename: str, upload_dir: str = UPLOAD_DIR,
+                       chunk_size: int = CHUNK_SIZE, max_bytes: int = None) -> dict:
+    """
+    Streams a file-like object to disk in chunks, hashing it on the way.
+
+    Args:
+        stream: Readable binary file-like object (e.g. a Streamlit UploadedFile).
+        filename (str): Original file name; only its basename is used.
+        upload_dir (str): Directory to store uploads in.
+        chunk_size (int): Bytes read and written per step.
+        max_bytes (int): Size limit; defaults to UPLOAD_MAX_MB from .env.
+    Returns:
+        dict: {'path', 'content_hash', 'size', 'duplicate'}. For a duplicate, 'path' is the
+              previously stored copy and nothing new is written.
+    Raises:
+        UploadTooLargeError: If the stream is larger than 'max_bytes'.
+    """
+    max_bytes = max_upload_bytes() if max_bytes is None else max_bytes
+    os.makedirs(upload_dir, exist_ok=True)
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+
+    hasher = hashlib.sha256()
+    size = 0
+    # The temp file lives in the upload dir so the final rename never crosses filesystems.
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"Upload '{filename}' exceeds the {max_bytes / (1024 * 1024):.0f} MB limit."
+                    )
+                hasher.update(chunk)
+                f.write(chunk)
+        content_hash = hasher.hexdigest()
+
+        with _manifest_lock:
+            manifest = _load_manifest(upload_dir)
+            existing = manifest.get(content_hash)
+            if existing and os.path.exists(existing):
+                os.remove(temp_path)
+                return {"path": existing, "content_hash": content_hash, "size": size, "duplicate": True}
+            path = _target_path(upload_dir, filename, content_hash)
+            os.replace(temp_path, path)
+            manifest[content_hash] = path
+            _save_manifest(upload_dir, manifest)
+        return {"path": path, "content_hash": content_hash, "size": size, "duplicate": False}
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def submit_extraction(extract, zip_path: str, extract_to: str, after=None):
+    """
+    Runs 'extract(zip_path, extract_to)' on the background extraction worker.
+
+    Args:
+        extract: Callable performing the extraction (e.g. archive.safe_extract).
+        zip_path (str): Archive to extract.
+        extract_to (str): Destination directory.
+        after: Optional callable '(extract_to) -> any' run on the worker once extraction
+               finished (e.g. indexing the extracted files).
+    Returns:
+        concurrent.futures.Future: Resolves to '(extract_result, after_result)'.
+    """
+    def job():
+        result = extract(zip_path, extract_to)
+        return result, (after(extract_to) if after is not None else None)
+
+    return _extraction_pool.submit(job)